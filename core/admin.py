@@ -1,5 +1,10 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from core.models import *
+from core.utils.customer_import import read_rows, import_customers
 
 class StaffProfileInline(admin.TabularInline):  # or admin.StackedInline for different display
     model = StaffProfile.daycares.through
@@ -30,10 +35,20 @@ class StaffProfileAdmin(admin.ModelAdmin):
     daycares_names.short_description = 'Daycares'  # Optional: Add a short description for the column
 
 
+class CustomerImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV or JSON, see core/utils/customer_import.py for the columns.')
+    hash_passwords = forms.BooleanField(
+        required=False,
+        help_text='Leave unticked to give imported customers unusable passwords (much faster, they reset on first login).',
+    )
+    dry_run = forms.BooleanField(required=False, help_text='Only validate the rows.')
+
+
 @admin.register(CustomerProfile)
 class CustomerProfileAdmin(admin.ModelAdmin):
     list_display = ('user_full_name', 'user_username', 'phone')
     search_fields = ('user__first_name', 'user__last_name', 'user__username', 'phone')
+    change_list_template = 'admin/core/customerprofile/change_list.html'
 
     def user_full_name(self, obj):
         return obj.user.get_full_name()
@@ -43,6 +58,48 @@ class CustomerProfileAdmin(admin.ModelAdmin):
         return obj.user.username
     user_username.short_description = 'Username'  # Customize column header
 
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_customers_view), name='core_customerprofile_import'),
+        ]
+        return urls + super().get_urls()
+
+    def import_customers_view(self, request):
+        """Bulk import customers and pets from an uploaded CSV/JSON file."""
+        if not self.has_add_permission(request):
+            return redirect('admin:core_customerprofile_changelist')
+
+        result = None
+        form = CustomerImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            file_format = 'json' if upload.name.lower().endswith('.json') else 'csv'
+            try:
+                rows = read_rows(upload, file_format)
+            except ValueError as e:
+                messages.error(request, f"Could not read {upload.name}: {e}")
+            else:
+                result = import_customers(
+                    rows,
+                    hash_passwords=form.cleaned_data['hash_passwords'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+                verb = 'Validated' if form.cleaned_data['dry_run'] else 'Imported'
+                messages.success(
+                    request,
+                    f"{verb} {result.customers_created} customers and {result.pets_created} pets, "
+                    f"{len(result.errors)} rows with errors.",
+                )
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import customers',
+            'form': form,
+            'result': result,
+        }
+        return TemplateResponse(request, 'admin/core/customerprofile/import_customers.html', context)
+
 class OpeningHoursInline(admin.TabularInline):
     model = OpeningHours
     extra = 1
@@ -157,4 +214,64 @@ class WaitlistAdmin(admin.ModelAdmin):
     raw_id_fields = ('booking',)  # Useful for ForeignKey fields if you have a lot of bookings
 
 # Register the Waitlist model with the WaitlistAdmin class
-admin.site.register(Waitlist, WaitlistAdmin)
\ No newline at end of file
+admin.site.register(Waitlist, WaitlistAdmin)
+
+class PostcodeCentroidAdmin(admin.ModelAdmin):
+    list_display = ('postcode', 'suburb', 'state', 'latitude', 'longitude')
+    list_filter = ('state',)
+    search_fields = ('postcode', 'suburb')
+
+admin.site.register(PostcodeCentroid, PostcodeCentroidAdmin)
+
+
+class PetPhotoAdmin(admin.ModelAdmin):
+    list_display = ('pet', 'status', 'uploaded_at', 'is_active')
+    list_filter = ('status', 'is_active')
+    search_fields = ('pet__pet_name', 'content_hash')
+    raw_id_fields = ('pet', 'uploaded_by')
+
+admin.site.register(PetPhoto, PetPhotoAdmin)
+
+
+class InvoiceLineItemInline(admin.TabularInline):
+    model = InvoiceLineItem
+    fields = ('kind', 'description', 'quantity', 'unit_price', 'amount')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+class InvoiceAdmin(admin.ModelAdmin):
+    """Invoices are immutable, the admin is read only."""
+    list_display = ('id', 'customer', 'daycare__daycare_name', 'period_start', 'total', 'created_at')
+    list_filter = ('daycare', 'period_start')
+    search_fields = ('customer__user__first_name', 'customer__user__last_name')
+    raw_id_fields = ('customer', 'daycare')
+    inlines = [InvoiceLineItemInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+admin.site.register(Invoice, InvoiceAdmin)
+
+
+class DaycareDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('daycare', 'date', 'bookings_accepted', 'bookings_waitlisted', 'bookings_cancelled',
+                    'active_bookings', 'peak_occupancy', 'product_revenue')
+    list_filter = ('daycare',)
+    date_hierarchy = 'date'
+
+admin.site.register(DaycareDailyStats, DaycareDailyStatsAdmin)
+
+
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'to_email', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('to_email', 'dedupe_key')
+    raw_id_fields = ('booking',)
+    readonly_fields = ('last_error',)
+
+admin.site.register(Notification, NotificationAdmin)
@@ -0,0 +1,76 @@
+"""
+JSON renderer and parser backed by orjson, a drop-in for DRF's JSONRenderer/JSONParser.
+
+Output is byte for byte what JSONRenderer would send: datetimes, dates, Decimals, UUIDs etc. still go
+through DRF's JSONEncoder.default, and anything orjson writes differently (exponent floats, non-str
+dict keys, ints over 64 bits, indented or ascii-only output) is handed back to the stdlib renderer,
+and the parser leaves long numbers to the stdlib too.
+The one difference is NaN/Infinity, which orjson writes as null where JSONRenderer raises.
+
+Opt in with FAST_JSON = True in settings. orjson is optional (pip install orjson), without it both classes
+are plain JSONRenderer/JSONParser.
+"""
+import io
+import re
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson writes 1e16 and 1e-7 where the stdlib writes 1e+16 and 1e-07. Starting the pattern with the
+# literal e is several times quicker than [0-9]e, the digit before it is checked in _has_exponent_float
+_EXPONENT = re.compile(rb'e-?[0-9]+(?:[,}\]]|$)')
+
+# orjson reads integers past 64 bits as floats, so bodies with 19+ digit runs go to the stdlib.
+# Mapping every digit to 0 and searching for a run of zeros is far quicker than a [0-9]{19} regex.
+_DIGITS_TO_ZERO = bytes.maketrans(b'123456789', b'000000000')
+_LONG_NUMBER = b'0' * 19
+
+
+def _has_exponent_float(ret):
+    return any(match.start() and ret[match.start() - 1] in b'0123456789' for match in _EXPONENT.finditer(ret))
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except orjson.JSONEncodeError:
+            # Non-str keys, huge ints or something DRF's encoder rejects, let JSONRenderer deal with it
+            return super().render(data, accepted_media_type, renderer_context)
+        if _has_exponent_float(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if _LONG_NUMBER in body.translate(_DIGITS_TO_ZERO):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # The stdlib parser gives the usual error message, and accepts the odd thing orjson won't (lone surrogates)
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.testcases import LiveServerThread, _StaticFilesHandler
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core.utils.benchmark import (
+    SCENARIOS, ClientTransport, HttpTransport, build_context, compare_results, run_benchmark, throwaway_database,
+)
+from core.utils.seed_data import SeedConfig, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and measure p50/p95/p99 latency, throughput and queries per request "
+        "of the main endpoints. Never touches the real database."
+    )
+
+    def add_arguments(self, parser):
+        dataset = parser.add_argument_group('dataset')
+        dataset.add_argument('--daycares', type=int, default=2)
+        dataset.add_argument('--staff', type=int, default=4, help="Staff per daycare, including the owner.")
+        dataset.add_argument('--customers', type=int, default=50, help="Customers per daycare.")
+        dataset.add_argument('--pets-per-customer', type=float, default=2)
+        dataset.add_argument('--years', type=float, default=1, help="Years of bookings and rosters.")
+        dataset.add_argument('--bookings-per-month', type=float, default=4, help="Bookings per pet per month.")
+        dataset.add_argument('--seed', type=int, default=0)
+
+        run = parser.add_argument_group('run')
+        run.add_argument('--requests', type=int, default=100, help="Requests per scenario.")
+        run.add_argument('--concurrency', type=int, default=8)
+        run.add_argument('--scenario', action='append', choices=[s.name for s in SCENARIOS],
+                         help="Only run these scenarios (repeatable).")
+        run.add_argument('--server', action='store_true',
+                         help="Go through a local HTTP server instead of the in-process test client.")
+        run.add_argument('--output', help="Write the results to this JSON file.")
+        run.add_argument('--baseline', help="A previous --output file to compare p95 latency against.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            path = Path(options['baseline'])
+            if not path.exists():
+                raise CommandError(f"Baseline file not found: {path}")
+            baseline = json.loads(path.read_text())['results']
+
+        scenarios = [s for s in SCENARIOS if not options['scenario'] or s.name in options['scenario']]
+        config = SeedConfig(
+            daycares=max(options['daycares'], 1),
+            staff_per_daycare=max(options['staff'], 2),
+            customers_per_daycare=max(options['customers'], 1),
+            pets_per_customer=options['pets_per_customer'],
+            years=options['years'],
+            bookings_per_pet_per_month=options['bookings_per_month'],
+            seed=options['seed'],
+        )
+
+        with throwaway_database():
+            results = self._run(config, scenarios, options)
+
+        report = {
+            'meta': {
+                'ran_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'transport': 'server' if options['server'] else 'client',
+                'dataset': vars(config),
+            },
+            'results': results,
+        }
+        self._print(results, compare_results(baseline, results) if baseline else None)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"Wrote {options['output']}")
+
+    def _run(self, config, scenarios, options):
+        self.stdout.write("Seeding...")
+        counts = seed_dataset(config)
+        self.stdout.write(', '.join(f"{count} {name}" for name, count in counts.items()))
+        context = build_context()
+
+        # Query counts come from Server-Timing, N+1 logging would only be noise here
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['*'], SQL_SERVER_TIMING=True,
+                               SQL_LOG_SAMPLE_RATE=0, SQL_REPEATED_QUERY_LIMIT=None):
+            if not options['server']:
+                return run_benchmark(context, ClientTransport(), options['requests'], options['concurrency'], scenarios)
+
+            server = LiveServerThread('localhost', _StaticFilesHandler)
+            server.daemon = True
+            server.start()
+            server.is_ready.wait()
+            if server.error:
+                raise CommandError(f"Benchmark server failed to start: {server.error}")
+            try:
+                transport = HttpTransport(f'http://localhost:{server.port}')
+                return run_benchmark(context, transport, options['requests'], options['concurrency'], scenarios)
+            finally:
+                server.terminate()
+
+    def _print(self, results, comparison):
+        columns = ['p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'queries_per_request', 'errors']
+        self.stdout.write(f"{'scenario':<16}" + ''.join(f"{column:>20}" for column in columns))
+        for name, stats in results.items():
+            self.stdout.write(f"{name:<16}" + ''.join(f"{str(stats[column]):>20}" for column in columns))
+
+        if comparison:
+            self.stdout.write("\np95 against baseline:")
+            for name, (before, after, change) in comparison.items():
+                line = f"  {name:<16} {before:>10} -> {after:<10} ({change:+}%)"
+                self.stdout.write(self.style.ERROR(line) if change > 10 else line)
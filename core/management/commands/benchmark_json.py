@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from core import fast_json
+from core.utils.benchmark import build_context, compare_json_codecs, throwaway_database
+from core.utils.seed_data import SeedConfig, seed_dataset
+
+PAYLOADS = [
+    # (name, path, benchmark context attribute holding the token)
+    ('booking_list', '/api/booking/', 'staff'),
+    ('daycare_list', '/api/daycare/', 'customer'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time DRF's JSON renderer and parser against core.fast_json on large booking and daycare list "
+        "payloads from a seeded throwaway database, and check the output is identical."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--daycares', type=int, default=10)
+        parser.add_argument('--staff', type=int, default=6, help="Staff per daycare, including the owner.")
+        parser.add_argument('--customers', type=int, default=100, help="Customers per daycare.")
+        parser.add_argument('--years', type=float, default=0.5, help="Years of bookings.")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per payload, the median is reported.")
+
+    def handle(self, *args, **options):
+        if fast_json.orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed, the fast classes fall back to the stdlib."))
+
+        config = SeedConfig(
+            daycares=max(options['daycares'], 1),
+            staff_per_daycare=max(options['staff'], 2),
+            customers_per_daycare=max(options['customers'], 1),
+            years=options['years'],
+        )
+        with throwaway_database():
+            self.stdout.write("Seeding...")
+            seed_dataset(config)
+            context = build_context()
+            client = Client()
+            results = {}
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['*'], SQL_LOG_SAMPLE_RATE=0, SQL_REPEATED_QUERY_LIMIT=None):
+                for name, path, user in PAYLOADS:
+                    response = client.get(path, HTTP_AUTHORIZATION=f'Token {getattr(context, user)}')
+                    results[name] = compare_json_codecs(response.data, options['repeat'])
+
+        self.stdout.write(f"{'payload':<14}{'KB':>8}{'render ms':>12}{'fast':>8}{'speedup':>9}"
+                          f"{'parse ms':>10}{'fast':>8}{'speedup':>9}  identical")
+        for name, stats in results.items():
+            line = (
+                f"{name:<14}{stats['bytes'] / 1024:>8.0f}"
+                f"{stats['render_ms']:>12}{stats['fast_render_ms']:>8}{_speedup(stats['render_ms'], stats['fast_render_ms']):>9}"
+                f"{stats['parse_ms']:>10}{stats['fast_parse_ms']:>8}{_speedup(stats['parse_ms'], stats['fast_parse_ms']):>9}"
+                f"  {stats['identical']}"
+            )
+            self.stdout.write(line if stats['identical'] else self.style.ERROR(line))
+
+
+def _speedup(before, after):
+    return f"{before / after:.1f}x" if after else '-'
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from django.utils import timezone
+
+from core.models import Daycare
+from core.utils.invoicing import generate_invoices
+
+
+class Command(BaseCommand):
+    help = "Generate monthly invoices for every customer of a daycare (or all active daycares). Safe to re-run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help="Month to invoice as YYYY-MM, defaults to last month.")
+        parser.add_argument('--daycare', type=int, help="Daycare ID, defaults to all active daycares.")
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                year, month = (int(part) for part in options['month'].split('-'))
+                if not 1 <= month <= 12:
+                    raise ValueError
+            except ValueError:
+                raise CommandError("--month must look like 2024-10.")
+        else:
+            today = timezone.localdate()
+            year, month = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+
+        daycares = Daycare.objects.filter(is_active=True)
+        if options['daycare']:
+            daycares = Daycare.objects.filter(id=options['daycare'])
+            if not daycares.exists():
+                raise CommandError(f"Daycare {options['daycare']} not found.")
+
+        for daycare in daycares:
+            try:
+                created, skipped = generate_invoices(daycare, year, month)
+            except IntegrityError:
+                self.stderr.write(f"{daycare.daycare_name}: another run is invoicing {year}-{month:02d}, skipped.")
+                continue
+            self.stdout.write(
+                f"{daycare.daycare_name}: {created} invoices created, {skipped} already invoiced for {year}-{month:02d}."
+            )
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.customer_import import read_rows, import_customers, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Bulk import customers and their pets from a CSV or JSON file (see core/utils/customer_import.py for the format)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON file to import.")
+        parser.add_argument('--format', choices=['csv', 'json'], help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument(
+            '--hash-passwords',
+            action='store_true',
+            help="Hash the password column. By default imported customers get unusable passwords and reset them.",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Validate rows without writing anything.")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in ('csv', 'json'):
+            raise CommandError("Could not tell the file format, pass --format csv or --format json.")
+
+        with path.open('rb') as f:
+            try:
+                rows = read_rows(f, file_format)
+            except ValueError as e:
+                raise CommandError(f"Could not read {path}: {e}")
+
+        result = import_customers(
+            rows,
+            chunk_size=options['chunk_size'],
+            hash_passwords=options['hash_passwords'],
+            dry_run=options['dry_run'],
+        )
+
+        for row_number, message in result.errors:
+            self.stderr.write(f"Row {row_number}: {message}")
+
+        verb = "Validated" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result.customers_created} customers and {result.pets_created} pets, "
+            f"{len(result.errors)} rows with errors."
+        ))
@@ -0,0 +1,104 @@
+import csv
+from collections import defaultdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Daycare, PostcodeCentroid
+
+# Approximate centroids for the capital cities and major regional centres, so nearby search works offline
+DEFAULT_FILE = Path(__file__).resolve().parent.parent.parent / 'data' / 'au_postcode_centroids.csv'
+
+# Accepted header names, so published postcode tables load without editing
+COLUMNS = {
+    'postcode': ('postcode', 'poa_code'),
+    'suburb': ('suburb', 'locality'),
+    'state': ('state',),
+    'latitude': ('latitude', 'lat'),
+    'longitude': ('longitude', 'long', 'lon', 'lng'),
+}
+
+
+def read_column(row, field):
+    for name in COLUMNS[field]:
+        if row.get(name):
+            return row[name].strip()
+    return ''
+
+
+class Command(BaseCommand):
+    help = (
+        "Load Australian postcode centroids from a CSV and refresh cached daycare coordinates. Defaults to the bundled "
+        "table of capital cities and major regional centres, pass a full postcode table (e.g the ABS postal areas or a "
+        "locality list with coordinates) to cover every postcode. Columns: postcode, suburb (or locality), state, "
+        "latitude (or lat), longitude (or long/lon). Postcodes listed on several rows, one per locality, are placed "
+        "at the average of their coordinates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file',
+            nargs='?',
+            default=str(DEFAULT_FILE),
+            help="CSV of postcodes with coordinates (defaults to the bundled table).",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['file'])
+        if not path.exists():
+            raise CommandError(f"Postcode file not found: {path}")
+
+        rows = defaultdict(list)
+        skipped = 0
+        with path.open(newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+            for row in reader:
+                postcode = read_column(row, 'postcode')
+                try:
+                    latitude, longitude = float(read_column(row, 'latitude')), float(read_column(row, 'longitude'))
+                except ValueError:
+                    skipped += 1
+                    continue
+                # PO boxes and the like are often listed at 0, 0
+                if not postcode.isdigit() or len(postcode) > 4 or (latitude == 0 and longitude == 0):
+                    skipped += 1
+                    continue
+                rows[postcode.zfill(4)].append((read_column(row, 'suburb'), read_column(row, 'state').upper(), latitude, longitude))
+        if not rows:
+            raise CommandError(f"No postcodes with coordinates in {path}, check the column names.")
+
+        centroids = []
+        for postcode, places in rows.items():
+            suburb, state, _, _ = places[0]
+            centroids.append(PostcodeCentroid(
+                postcode=postcode,
+                suburb=suburb[:100],
+                state=state[:3],
+                latitude=sum(place[2] for place in places) / len(places),
+                longitude=sum(place[3] for place in places) / len(places),
+            ))
+
+        with transaction.atomic():
+            PostcodeCentroid.objects.bulk_create(
+                centroids,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['postcode'],
+                update_fields=['suburb', 'state', 'latitude', 'longitude'],
+            )
+
+            # Refresh cached coordinates on every daycare in one pass
+            lookup = {c.postcode: c for c in centroids}
+            daycares = list(Daycare.objects.all())
+            for daycare in daycares:
+                centroid = lookup.get(daycare.postcode)
+                if centroid:
+                    daycare.latitude = centroid.latitude
+                    daycare.longitude = centroid.longitude
+            Daycare.objects.bulk_update(daycares, ['latitude', 'longitude'], batch_size=500)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {len(centroids)} postcodes ({skipped} rows skipped) and refreshed {len(daycares)} daycares."
+        ))
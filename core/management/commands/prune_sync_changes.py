@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.sync import RETENTION_DAYS, prune
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete tablet sync changes older than --days. Tablets whose cursor is older than that "
+        "get a full snapshot on their next sync instead of a delta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1.")
+        deleted = prune(options['days'])
+        self.stdout.write(f"Deleted {deleted} sync changes older than {options['days']} days.")
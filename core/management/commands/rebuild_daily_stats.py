@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.models import Daycare
+from core.utils.rollups import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily booking rollups (DaycareDailyStats) from bookings, for backfills and repairs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--daycare', type=int, action='append', help="Daycare id, repeatable (defaults to all).")
+        parser.add_argument('--since', help="First day to rebuild, YYYY-MM-DD.")
+        parser.add_argument('--until', help="Last day to rebuild, YYYY-MM-DD.")
+
+    def handle(self, *args, **options):
+        dates = {}
+        for option in ('since', 'until'):
+            value = options[option]
+            try:
+                dates[option] = parse_date(value) if value else None
+            except ValueError:
+                dates[option] = None
+            if value and dates[option] is None:
+                raise CommandError(f"--{option} must look like 2024-10-01.")
+
+        daycare_ids = options['daycare'] or list(Daycare.objects.values_list('id', flat=True))
+        # One daycare per transaction keeps locks short on big tables
+        total = 0
+        for daycare_id in daycare_ids:
+            total += rebuild_daily_stats([daycare_id], dates['since'], dates['until'])
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} daily rows for {len(daycare_ids)} daycares."))
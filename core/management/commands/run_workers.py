@@ -0,0 +1,68 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs (core/tasks.py) until stopped with Ctrl-C or SIGTERM, finishing the jobs in hand. "
+        "Several copies, on one box or several, can share the queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help="Worker threads per process.")
+        parser.add_argument(
+            '--processes', type=int, default=0,
+            help="Spawn this many worker processes, each with --threads threads, for CPU heavy tasks. 0 runs the threads here.",
+        )
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds an idle worker waits before looking again.")
+        parser.add_argument('--burst', action='store_true', help="Exit once nothing is due, e.g from cron or a deploy hook.")
+
+    def handle(self, *args, **options):
+        from core.utils.jobs import run_threads
+
+        if options['threads'] < 1 or options['processes'] < 0:
+            raise CommandError("--threads must be at least 1 and --processes can't be negative.")
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping once the running jobs finish...")
+            stop.set()
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        if not options['processes']:
+            self.stdout.write(f"Running {options['threads']} worker threads.")
+            run_threads(options['threads'], stop, options['poll'], options['burst'])
+            return
+
+        # spawn rather than fork, so workers don't inherit this process's DB connections
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(target=_process_main, args=(index, options['threads'], options['poll'], options['burst']))
+            for index in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Running {len(processes)} worker processes of {options['threads']} threads.")
+        while any(process.is_alive() for process in processes) and not stop.is_set():
+            stop.wait(1)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()  # SIGTERM, the process finishes its jobs in hand
+        for process in processes:
+            process.join()
+
+
+def _process_main(index, threads, poll_interval, burst):
+    # Spawned processes start from scratch, Django has to be set up before anything touches models
+    import django
+    django.setup()
+    from core.utils.jobs import run_threads
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    run_threads(threads, stop, poll_interval, burst, first_index=index * threads)
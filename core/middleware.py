@@ -0,0 +1,65 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from .utils.sql_instrumentation import QueryRecorder, RepeatedQueryError
+
+logger = logging.getLogger('core.sql')
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Counts and times the SQL run by each request.
+
+    - Server-Timing header (SQL_SERVER_TIMING) so the browser dev tools show db time per request
+    - a JSON log line on core.sql for a sample of requests (SQL_LOG_SAMPLE_RATE), and always a warning
+      when one query shape repeats more than SQL_REPEATED_QUERY_LIMIT times
+    - with SQL_RAISE_ON_REPEATED_QUERIES (tests) that warning becomes a RepeatedQueryError
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        limit = getattr(settings, 'SQL_REPEATED_QUERY_LIMIT', None)
+        repeated = recorder.repeated_over(limit) if limit else []
+        if repeated and getattr(settings, 'SQL_RAISE_ON_REPEATED_QUERIES', False):
+            shape, count = repeated[0]
+            raise RepeatedQueryError(
+                f"{request.method} {request.path} ran the same query {count} times (limit {limit}): {shape}"
+            )
+
+        if getattr(settings, 'SQL_SERVER_TIMING', False):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={recorder.total_ms:.1f};desc="{recorder.query_count} queries"',
+                f'app;dur={duration_ms - recorder.total_ms:.1f}',
+            ])
+
+        sampled = random.random() < getattr(settings, 'SQL_LOG_SAMPLE_RATE', 0)
+        if repeated or sampled:
+            record = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 1),
+                'query_count': recorder.query_count,
+                'sql_ms': round(recorder.total_ms, 1),
+                'top_repeated': [
+                    {'shape': shape, 'count': count}
+                    for shape, count in recorder.top_shapes(getattr(settings, 'SQL_TOP_QUERY_SHAPES', 3))
+                ],
+            }
+            if repeated:
+                logger.warning(json.dumps(record))
+            else:
+                logger.info(json.dumps(record))
+
+        return response
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:22
+
+from django.db import migrations, models
+
+
+def remove_duplicate_opening_hours(apps, schema_editor):
+    # Keep the most recently created row for each (daycare, day) before adding the constraint
+    OpeningHours = apps.get_model('core', 'OpeningHours')
+    seen = set()
+    duplicate_ids = []
+    for oh in OpeningHours.objects.order_by('daycare_id', 'day', '-id').only('id', 'daycare_id', 'day'):
+        key = (oh.daycare_id, oh.day)
+        if key in seen:
+            duplicate_ids.append(oh.id)
+        else:
+            seen.add(key)
+    OpeningHours.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_daycare_coordinates_postcodecentroid'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_opening_hours, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='openinghours',
+            constraint=models.UniqueConstraint(fields=('daycare', 'day'), name='unique_opening_hours_per_day'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:22
+
+from django.db import migrations, models
+
+from core.utils.pet_types import pet_types_to_mask
+
+
+def backfill_pet_types_mask(apps, schema_editor):
+    for model_name in ('Daycare', 'Pet'):
+        model = apps.get_model('core', model_name)
+        rows = list(model.objects.only('id', 'pet_types'))
+        for row in rows:
+            row.pet_types_mask = pet_types_to_mask(row.pet_types)
+        model.objects.bulk_update(rows, ['pet_types_mask'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_openinghours_unique_daycare_day'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='daycare',
+            name='pet_types_mask',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='pet_types_mask',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_pet_types_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:23
+
+from django.db import migrations, models
+
+from core.utils.search import customer_search_fields, normalize_search_text
+
+
+def backfill_search_fields(apps, schema_editor):
+    CustomerProfile = apps.get_model('core', 'CustomerProfile')
+    Pet = apps.get_model('core', 'Pet')
+
+    customers = list(CustomerProfile.objects.select_related('user'))
+    for customer in customers:
+        for attr, value in customer_search_fields(customer.user, customer.phone).items():
+            setattr(customer, attr, value)
+    CustomerProfile.objects.bulk_update(customers, ['search_name', 'search_name_reversed', 'search_phone'], batch_size=1000)
+
+    pets = list(Pet.objects.only('id', 'pet_name'))
+    for pet in pets:
+        pet.search_name = normalize_search_text(pet.pet_name)
+    Pet.objects.bulk_update(pets, ['search_name'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_pet_types_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerprofile',
+            name='search_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=301),
+        ),
+        migrations.AddField(
+            model_name='customerprofile',
+            name='search_name_reversed',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=301),
+        ),
+        migrations.AddField(
+            model_name='customerprofile',
+            name='search_phone',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='search_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=50),
+        ),
+        migrations.RunPython(backfill_search_fields, migrations.RunPython.noop),
+    ]
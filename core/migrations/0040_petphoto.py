@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_search_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PetPhoto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original', models.FileField(upload_to='pet_photos/originals/')),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('thumbnails', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('pet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='core.pet')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pet_photos', to='core.customerprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('pet', 'content_hash'), name='unique_pet_photo_content')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_petphoto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PetOwnershipEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('added', 'Added'), ('removed', 'Removed')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='petnote',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['pet', 'start_time'], name='booking_pet_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='petnote',
+            index=models.Index(fields=['pet', 'created_at'], name='petnote_pet_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='petownershipevent',
+            name='customer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ownership_events', to='core.customerprofile'),
+        ),
+        migrations.AddField(
+            model_name='petownershipevent',
+            name='pet',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ownership_events', to='core.pet'),
+        ),
+        migrations.AddIndex(
+            model_name='petownershipevent',
+            index=models.Index(fields=['pet', 'created_at'], name='ownership_pet_created_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_pet_timeline'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='petnote',
+            index=models.Index(fields=['created_at', 'id'], name='petnote_created_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:29
+
+import django.db.models.deletion
+from collections import Counter
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_product_usage(apps, schema_editor):
+    Booking = apps.get_model('core', 'Booking')
+    ProductDailyUsage = apps.get_model('core', 'ProductDailyUsage')
+
+    counts = Counter()
+    bookings = Booking.objects.filter(is_active=True, is_waitlist=False).prefetch_related('products')
+    for booking in bookings.iterator(chunk_size=1000):
+        product_ids = [product.id for product in booking.products.all()]
+        day = booking.start_time.date()
+        while day <= booking.end_time.date():
+            for product_id in product_ids:
+                counts[(product_id, day)] += 1
+            day += timedelta(days=1)
+
+    ProductDailyUsage.objects.bulk_create(
+        [ProductDailyUsage(product_id=product_id, date=day, count=count) for (product_id, day), count in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_petnote_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_usage', to='core.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'date'), name='unique_product_usage_per_day')],
+            },
+        ),
+        migrations.RunPython(backfill_product_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_invoices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DaycareDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bookings_accepted', models.PositiveIntegerField(default=0)),
+                ('bookings_waitlisted', models.PositiveIntegerField(default=0)),
+                ('waitlist_converted', models.PositiveIntegerField(default=0)),
+                ('bookings_cancelled', models.PositiveIntegerField(default=0)),
+                ('checked_in', models.PositiveIntegerField(default=0)),
+                ('active_bookings', models.PositiveIntegerField(default=0)),
+                ('peak_occupancy', models.PositiveIntegerField(default=0)),
+                ('product_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('daycare', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.daycare')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('daycare', 'date'), name='unique_daycare_stats_per_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('booking', 'Booking'), ('pet', 'Pet'), ('waitlist', 'Waitlist'), ('roster', 'Roster'), ('blacklist', 'Blacklisted pet')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('daycare', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sync_changes', to='core.daycare')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['daycare', 'id'], name='syncchange_daycare_seq_idx'), models.Index(fields=['created_at'], name='syncchange_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.utils.search import note_terms
+
+NOTE_FTS_INDEX = 'petnote_note_fts_idx'
+
+
+def backfill_note_terms(apps, schema_editor):
+    PetNote = apps.get_model('core', 'PetNote')
+    PetNoteTerm = apps.get_model('core', 'PetNoteTerm')
+
+    for note in PetNote.objects.only('id', 'note').iterator(chunk_size=1000):
+        PetNoteTerm.objects.bulk_create([PetNoteTerm(note_id=note.id, term=term) for term in note_terms(note.note)])
+
+
+def note_fts_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    # Same expression search_notes queries with, so the planner can use it
+    return GinIndex(SearchVector('note', config='english'), name=NOTE_FTS_INDEX)
+
+
+def add_note_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('core', 'PetNote'), note_fts_index())
+
+
+def remove_note_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('core', 'PetNote'), note_fts_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0050_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PetNoteTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50)),
+                ('note', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='core.petnote')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'note'], name='petnoteterm_term_idx')],
+                'constraints': [models.UniqueConstraint(fields=('note', 'term'), name='unique_petnote_term')],
+            },
+        ),
+        migrations.RunPython(backfill_note_terms, migrations.RunPython.noop),
+        # PostgreSQL only, other backends search PetNoteTerm
+        migrations.RunPython(add_note_fts_index, remove_note_fts_index),
+    ]
@@ -1,9 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User, AbstractUser
 from rest_framework.authtoken.models import Token
-from .utils.pet_types import PET_TYPES
+from .utils.pet_types import PET_TYPES, pet_types_to_mask
+from .utils.search import normalize_search_text, customer_search_fields
 from django.core.exceptions import ValidationError
 from django.utils.crypto import get_random_string
+from django.utils import timezone
 
 
 # Create your models here.
@@ -18,6 +20,8 @@ class StaffProfile(models.Model):
     phone = models.CharField(max_length=15)
     is_active = models.BooleanField(default=True)
     daycares = models.ManyToManyField('Daycare', blank=True)
+    # Moves on every save, conditional GET fingerprints are built from it (see utils/conditional.py)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.user.username}) - Role: {self.get_role_display()}"
@@ -35,6 +39,19 @@ class CustomerProfile(models.Model):
     # Customer has Pet A, Pet B -> Pet A belongs to Customer A and Customer B, Pet B belongs to Customer A
     phone = models.CharField(max_length=15)  # Format: +61-123-234-234
     is_active = models.BooleanField(default=True)
+    # Normalized copies of the user's name and phone for indexed prefix autocomplete
+    search_name = models.CharField(max_length=301, blank=True, db_index=True, editable=False)  # "first last"
+    search_name_reversed = models.CharField(max_length=301, blank=True, db_index=True, editable=False)  # "last first"
+    search_phone = models.CharField(max_length=15, blank=True, db_index=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def update_search_fields(self):
+        for attr, value in customer_search_fields(self.user, self.phone).items():
+            setattr(self, attr, value)
+
+    def save(self, *args, **kwargs):
+        self.update_search_fields()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.user.username}) - Phone: {self.phone}"
@@ -64,13 +81,56 @@ class Daycare(models.Model):
     email = models.EmailField()
     is_active = models.BooleanField(default=True)
     capacity = models.PositiveIntegerField(default=0) 
+    daily_rate = models.DecimalField(max_digits=7, decimal_places=2, default=0)  # Base price per booked day, used for invoicing
     pet_types = models.JSONField(default=list)
     # Pet Types -> Dog, Cat, Bird, Fish, Reptile, etc.
+    # Indexed bitmask mirror of pet_types, kept in sync on save
+    pet_types_mask = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    # Cached from PostcodeCentroid so nearby searches don't need a join
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='daycare_lat_lng_idx'),
+        ]
 
     def get_pet_types_display(self):
         # Returns the display names of the pet types
         return [PET_TYPES[pet_type_id] for pet_type_id in self.pet_types]
 
+    def update_coordinates(self):
+        """Copy the centroid of the daycare's postcode onto latitude/longitude."""
+        centroid = PostcodeCentroid.objects.filter(postcode=self.postcode).first()
+        if centroid:
+            self.latitude = centroid.latitude
+            self.longitude = centroid.longitude
+        else:
+            self.latitude = None
+            self.longitude = None
+
+    def save(self, *args, **kwargs):
+        self.update_coordinates()
+        self.pet_types_mask = pet_types_to_mask(self.pet_types)
+        super().save(*args, **kwargs)
+
+
+class PostcodeCentroid(models.Model):
+    """
+    Offline Australian postcode centroids, loaded with `manage.py load_postcodes` from the bundled table
+    (core/data/au_postcode_centroids.csv) or a full postcode table passed as `load_postcodes <csv>`.
+    Nearby search only knows the postcodes loaded here
+    """
+    postcode = models.CharField(max_length=4, unique=True)
+    suburb = models.CharField(max_length=100, blank=True)
+    state = models.CharField(max_length=3, choices=Daycare.AUSTRALIAN_STATES)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    def __str__(self):
+        return f"{self.postcode} ({self.suburb}, {self.state})"
+
 
 class OpeningHours(models.Model):
     DAYS = [
@@ -89,6 +149,12 @@ class OpeningHours(models.Model):
     to_hour = models.TimeField(blank=True, null=True)
     closed = models.BooleanField(default=False)
     capacity = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['daycare', 'day'], name='unique_opening_hours_per_day'),
+        ]
 
     def clean(self):
         if self.closed:
@@ -115,18 +181,48 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=5, decimal_places=2)
     capacity = models.PositiveIntegerField(null=True, blank=True)  # Optional capacity
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} - {self.daycare.daycare_name}"
 
 
-class Roster(models.Model):
+class ProductDailyUsage(models.Model):
+    """
+    How many active, accepted bookings use a product on a day, kept in step with bookings
+    by utils/product_capacity.py so capacity can be checked without counting bookings
+    """
+    product = models.ForeignKey(Product, related_name='daily_usage', on_delete=models.CASCADE)
+    date = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='unique_product_usage_per_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} on {self.date}: {self.count}"
+
+
+class LoadedDaycareMixin:
+    """Remembers the daycare a row was loaded with, so a move to another daycare is synced to both (signals.py)"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_daycare_id = instance.__dict__.get('daycare_id')
+        return instance
+
+
+class Roster(LoadedDaycareMixin, models.Model):
     staff = models.ForeignKey(StaffProfile, related_name='roster', on_delete=models.CASCADE) 
     daycare = models.ForeignKey(Daycare, related_name='roster', on_delete=models.CASCADE)
     start_shift = models.DateTimeField()
     end_shift = models.DateTimeField()
     shift_day = models.DateField()
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.staff.user.get_full_name()} - {self.daycare.daycare_name} - {self.shift_day}"
@@ -149,6 +245,7 @@ class StaffUnavailability(models.Model):
     date = models.DateField(null=True, blank=True)
     is_recurring = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         if self.is_recurring:
@@ -161,12 +258,16 @@ class Pet(models.Model):
     pet_name = models.CharField(max_length=25)
     # pet_type = ...
     pet_types = models.JSONField(default=list)
+    # Indexed bitmask mirror of pet_types, kept in sync on save
+    pet_types_mask = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    search_name = models.CharField(max_length=50, blank=True, db_index=True, editable=False)
     pet_bio = models.TextField(blank=True)
-    # photo = ? might make a seperate photo model since we might need to make a class Photo model incase we reuse it in other instances?
+    # photos -> PetPhoto
     customers = models.ManyToManyField(CustomerProfile, related_name='pets')
     is_public = models.BooleanField(default=True) # Public or Private
     is_active = models.BooleanField(default=True)
     invite_token = models.CharField(max_length=255, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def generate_invite_token(self):
         self.invite_token = get_random_string(50)
@@ -179,20 +280,110 @@ class Pet(models.Model):
             return [PET_TYPES[self.pet_types]]
         return [PET_TYPES[pet_type_id] for pet_type_id in self.pet_types if pet_type_id in PET_TYPES]
 
+    def update_derived_fields(self):
+        """Sync the indexed mirrors of pet_types and pet_name, call before bulk_create."""
+        self.pet_types_mask = pet_types_to_mask(self.pet_types)
+        self.search_name = normalize_search_text(self.pet_name)
+
+    def save(self, *args, **kwargs):
+        self.update_derived_fields()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.pet_name
 
 
+class PetPhoto(models.Model):
+    """
+    Photos are stored once per content hash, thumbnails are rendered in the background (see utils/pet_photos.py)
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
+    pet = models.ForeignKey(Pet, related_name='photos', on_delete=models.CASCADE)
+    uploaded_by = models.ForeignKey(CustomerProfile, related_name='pet_photos', on_delete=models.SET_NULL, null=True, blank=True)
+    original = models.FileField(upload_to='pet_photos/originals/')
+    content_hash = models.CharField(max_length=64, db_index=True)  # sha256 of the original
+    thumbnails = models.JSONField(default=dict, blank=True)  # e.g {"small": "pet_photos/thumbnails/ab/abc_small.jpg"}
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['pet', 'content_hash'], name='unique_pet_photo_content'),
+        ]
+
+    def __str__(self):
+        return f"Photo of {self.pet} ({self.status})"
+
+
 class PetNote(models.Model):
     pet = models.ForeignKey(Pet, related_name='notes', on_delete=models.CASCADE) # e.g pet/1/
     employee = models.ForeignKey(StaffProfile, related_name='pet_notes', on_delete=models.CASCADE) # e.g staff-profile/1
     note = models.TextField() # Maybe a max char count? not really needed though
     is_private = models.BooleanField(default=False)  # True if the note is private -> private for employees only
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pet', 'created_at'], name='petnote_pet_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='petnote_created_idx'),
+            # PostgreSQL also gets a GIN index on the note's tsvector, added by migration 0051 for that backend only
+        ]
 
     def __str__(self):
         return f"Note for {self.pet.name} by {self.employee.user.get_full_name()}"
 
-class Booking(models.Model):
+
+class PetNoteTerm(models.Model):
+    """
+    Word index behind the pet-note search where there's no PostgreSQL full-text search (utils/search.py).
+    One row per distinct normalized word of a note, rewritten by signals.py when the note is saved.
+    """
+    note = models.ForeignKey(PetNote, related_name='terms', on_delete=models.CASCADE, db_index=False)
+    term = models.CharField(max_length=50)
+
+    class Meta:
+        constraints = [
+            # Also the index for a note's own terms (reindexing, cascade deletes)
+            models.UniqueConstraint(fields=['note', 'term'], name='unique_petnote_term'),
+        ]
+        indexes = [
+            # A search word is a prefix range over term, read straight off the index
+            models.Index(fields=['term', 'note'], name='petnoteterm_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} in note {self.note_id}"
+
+class PetOwnershipEvent(models.Model):
+    """
+    History of co-owners being added to / removed from a pet, recorded by a Pet.customers m2m_changed signal
+    """
+    class Action(models.TextChoices):
+        ADDED = 'added', 'Added'
+        REMOVED = 'removed', 'Removed'
+
+    pet = models.ForeignKey(Pet, related_name='ownership_events', on_delete=models.CASCADE)
+    customer = models.ForeignKey(CustomerProfile, related_name='ownership_events', on_delete=models.CASCADE)
+    action = models.CharField(max_length=10, choices=Action.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pet', 'created_at'], name='ownership_pet_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer} {self.action} as owner of {self.pet}"
+
+
+class Booking(LoadedDaycareMixin, models.Model):
     class Status(models.TextChoices):
         ACCEPTED = 'accepted', 'Accepted'
         WAITLISTED = 'waitlisted', 'Waitlisted'
@@ -210,6 +401,14 @@ class Booking(models.Model):
     products = models.ManyToManyField(Product, related_name='bookings')
     is_waitlist = models.BooleanField(default=False)  
     waitlist_accepted = models.BooleanField(default=False)
+    # When checked_in last changed, by the tablet's clock for offline check-ins. The latest change wins
+    check_in_changed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pet', 'start_time'], name='booking_pet_start_idx'),
+        ]
 
     def __str__(self):
         return f"Booking({self.customer}, {self.pet}, {self.daycare}, {self.start_time}, {self.end_time})"
@@ -222,12 +421,108 @@ class Booking(models.Model):
 
     
 
+class CheckInEvent(models.Model):
+    """
+    A check in/out made on a tablet, possibly offline, uploaded in batches (utils/check_in_events.py).
+    event_id is generated by the tablet so uploading the same batch twice is a no-op
+    """
+    class Action(models.TextChoices):
+        CHECK_IN = 'check_in', 'Check in'
+        CHECK_OUT = 'check_out', 'Check out'
+
+    event_id = models.UUIDField(unique=True)
+    booking = models.ForeignKey(Booking, related_name='check_in_events', on_delete=models.CASCADE)
+    staff = models.ForeignKey(StaffProfile, related_name='check_in_events', on_delete=models.SET_NULL, null=True)
+    action = models.CharField(max_length=10, choices=Action.choices)
+    occurred_at = models.DateTimeField()  # Tablet clock
+    received_at = models.DateTimeField(auto_now_add=True)
+    applied = models.BooleanField(default=False)  # False if a later change to the booking had already won
+
+    def __str__(self):
+        return f"{self.get_action_display()} of booking {self.booking_id} at {self.occurred_at}"
+
+
+class ImmutableModel(models.Model):
+    """Rows can be inserted but never changed afterwards (invoices)"""
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValidationError(f"{self._meta.verbose_name.capitalize()} records cannot be changed once written.")
+        super().save(*args, **kwargs)
+
+
+class Invoice(ImmutableModel):
+    """
+    Monthly invoice for a customer at a daycare, written by utils/invoicing.py
+    One per (daycare, customer, period) so re-running a month is a no-op
+    """
+    daycare = models.ForeignKey(Daycare, related_name='invoices', on_delete=models.PROTECT)
+    customer = models.ForeignKey(CustomerProfile, related_name='invoices', on_delete=models.PROTECT)
+    period_start = models.DateField()  # First day of the invoiced month
+    daily_rate = models.DecimalField(max_digits=7, decimal_places=2)  # Daycare rate at the time of invoicing
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['daycare', 'customer', 'period_start'], name='unique_invoice_per_period'),
+        ]
+
+    def __str__(self):
+        return f"Invoice {self.id} - {self.customer} - {self.period_start:%B %Y} - ${self.total}"
+
+
+class InvoiceLineItem(ImmutableModel):
+    class Kind(models.TextChoices):
+        DAYCARE = 'daycare', 'Daycare days'
+        PRODUCT = 'product', 'Product'
+
+    invoice = models.ForeignKey(Invoice, related_name='line_items', on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    product = models.ForeignKey(Product, null=True, blank=True, on_delete=models.PROTECT)
+    description = models.CharField(max_length=200)
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=7, decimal_places=2)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.description} x{self.quantity} = ${self.amount}"
+
+
+class DaycareDailyStats(models.Model):
+    """
+    Daily rollup of bookings per daycare for reporting, maintained incrementally by utils/rollups.py
+    (repair with `manage.py rebuild_daily_stats`). Dated by the booking's start day.
+    """
+    daycare = models.ForeignKey(Daycare, related_name='daily_stats', on_delete=models.CASCADE)
+    date = models.DateField()
+    bookings_accepted = models.PositiveIntegerField(default=0)  # Accepted bookings, including ones later cancelled
+    bookings_waitlisted = models.PositiveIntegerField(default=0)  # Bookings that went on the waitlist
+    waitlist_converted = models.PositiveIntegerField(default=0)  # Waitlisted bookings the customer then accepted
+    bookings_cancelled = models.PositiveIntegerField(default=0)
+    checked_in = models.PositiveIntegerField(default=0)
+    active_bookings = models.PositiveIntegerField(default=0)  # Accepted and not cancelled
+    peak_occupancy = models.PositiveIntegerField(default=0)  # Most active bookings overlapping at once
+    product_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['daycare', 'date'], name='unique_daycare_stats_per_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.daycare.daycare_name} - {self.date}"
+
+
 class BlacklistedPet(models.Model):
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE)
     daycare = models.ForeignKey(Daycare, on_delete=models.CASCADE)
     reason = models.TextField(blank=True, null=True)
     date_blacklisted = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.pet} is blacklisted from {self.daycare}"
@@ -239,11 +534,122 @@ class Waitlist(models.Model):
     waitlisted_at = models.DateTimeField(auto_now_add=True)
     customer_accepted = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Waitlist({self.booking}, notified: {self.customer_notified})"
     
 
+class SyncChange(models.Model):
+    """
+    Append-only log behind the staff tablet delta sync (utils/sync.py), written by signals.py.
+    The id is the change sequence: one row per daycare that can see a changed booking, pet, waitlist entry,
+    roster or blacklisting. Rows only say *what* changed, the current state is read when syncing.
+    """
+    class Kind(models.TextChoices):
+        BOOKING = 'booking', 'Booking'
+        PET = 'pet', 'Pet'
+        WAITLIST = 'waitlist', 'Waitlist'
+        ROSTER = 'roster', 'Roster'
+        BLACKLIST = 'blacklist', 'Blacklisted pet'
+
+    daycare = models.ForeignKey(Daycare, related_name='sync_changes', on_delete=models.CASCADE, db_index=False)
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # "What changed at these daycares after cursor N" is a range scan per daycare
+            models.Index(fields=['daycare', 'id'], name='syncchange_daycare_seq_idx'),
+            models.Index(fields=['created_at'], name='syncchange_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} {self.object_id} at daycare {self.daycare_id}"
+
+
+class Job(models.Model):
+    """
+    Deferred and periodic work, run by `manage.py run_workers` (utils/jobs.py, tasks in tasks.py).
+    The table is the queue, so nothing but the database is needed
+    """
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    name = models.CharField(max_length=100)  # Registered task name
+    payload = models.JSONField(default=dict, blank=True)  # Keyword arguments for the task
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # At most one queued job per key, e.g one occupancy refresh per daycare day however many bookings changed
+    key = models.CharField(max_length=200, null=True, blank=True)
+    periodic = models.BooleanField(default=False)  # Queued by the cron schedule rather than by code
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=models.Q(status='queued'), name='unique_queued_job_key'),
+            # Every worker schedules the next cron run, only the first insert counts
+            models.UniqueConstraint(fields=['name', 'run_at'], condition=models.Q(periodic=True), name='unique_periodic_job_run'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
+class Notification(models.Model):
+    """
+    Outbox of customer emails. Written in the same transaction as the change it is about and sent
+    afterwards in batches by a background job (utils/notifications.py), so requests never wait on the mail server
+    """
+    class Kind(models.TextChoices):
+        WAITLIST_OFFER = 'waitlist_offer', 'Waitlist offer'
+        BOOKING_ACCEPTED = 'booking_accepted', 'Booking accepted'
+        BOOKING_CANCELLED = 'booking_cancelled', 'Booking cancelled'
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENDING = 'sending', 'Sending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    # Names the event, e.g booking_cancelled:12, so the same event can't queue two emails
+    dedupe_key = models.CharField(max_length=200, unique=True)
+    booking = models.ForeignKey(Booking, related_name='notifications', on_delete=models.SET_NULL, null=True, blank=True)
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} to {self.to_email} ({self.status})"
+
+
 # class Post(models.Model):
 #     class Status(models.TextChoices):
 #         PUBLIC = 'public', 'Public'
@@ -70,7 +70,23 @@ class IsCustomer(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Allow any authenticated wholesaler to perform any action
         return True
-    
+
+
+# 5. IsPetStaff
+class IsPetStaff(permissions.BasePermission):
+    """
+    Allows access only to staff at a daycare the object's pet has been booked at (e.g pet notes).
+    """
+    def has_permission(self, request, view):
+        return request.user and request.user.is_authenticated and hasattr(request.user, 'staffprofile')
+
+    def has_object_permission(self, request, view, obj):
+        return staff_can_see_pet(request.user.staffprofile, obj.pet_id)
+
+
+def staff_can_see_pet(staff, pet_id):
+    return Booking.objects.filter(pet_id=pet_id, daycare__in=staff.daycares.all()).exists()
+
 
 # Check Staff works for Daycare
 def check_daycare_association(user, daycare):
@@ -4,9 +4,87 @@ from rest_framework.authtoken.models import Token
 from .models import *
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
-
-
-class UserSerializer(serializers.ModelSerializer):
+from django.db import transaction
+from django.core.files.storage import default_storage
+from .utils.daycare_cache import bump_daycare_version
+from .utils.pet_types import accepts_pet_types
+from .utils.sparse_fields import EVERYTHING, FIELDSET_CONTEXT_KEY, Fieldset
+from .utils.check_in_events import MAX_BATCH_SIZE as CHECK_IN_BATCH_SIZE
+
+
+class BulkPrimaryKeyRelatedField(serializers.ManyRelatedField):
+    """
+    A many=True PrimaryKeyRelatedField that looks every id up in one query instead of one per id.
+    e.g products = BulkPrimaryKeyRelatedField(queryset=Product.objects.all(), required=False)
+    """
+
+    def __init__(self, queryset, **kwargs):
+        super().__init__(child_relation=serializers.PrimaryKeyRelatedField(queryset=queryset), **kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        ids = []
+        for pk in data:
+            try:
+                if isinstance(pk, bool):
+                    raise TypeError
+                ids.append(int(pk))
+            except (TypeError, ValueError):
+                child.fail('incorrect_type', data_type=type(pk).__name__)
+
+        found = child.get_queryset().in_bulk(ids)
+        for pk in ids:
+            if pk not in found:
+                child.fail('does_not_exist', pk_value=pk)
+        return [found[pk] for pk in ids]
+
+
+class SparseFieldsetMixin:
+    """
+    Honors ?fields= and ?omit= (see utils/sparse_fields.py) when rendering. Writes still see every field,
+    and dropped SerializerMethodFields are never called. Nested serializers get their part of the paths;
+    ones built inside a method field need context=self.nested_context(name) for that.
+    """
+    fieldset = None  # Set by the parent on nested serializers
+    _sparse_readable_fields = None
+
+    def get_fieldset(self):
+        if self.fieldset is not None:
+            return self.fieldset
+        if FIELDSET_CONTEXT_KEY in self.context:
+            return self.context[FIELDSET_CONTEXT_KEY]
+        request = self.context.get('request')
+        parent = self.parent
+        is_root = parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+        if request is None or not is_root:
+            return EVERYTHING
+        return Fieldset.from_request(request)
+
+    def nested_context(self, field_name):
+        return {**self.context, FIELDSET_CONTEXT_KEY: self.get_fieldset().child(field_name)}
+
+    @property
+    def _readable_fields(self):
+        if self._sparse_readable_fields is None:
+            fieldset = self.get_fieldset()
+            readable = []
+            for name, field in self.fields.items():
+                if field.write_only or not fieldset.keeps(name):
+                    continue
+                nested = field.child if isinstance(field, serializers.ListSerializer) else field
+                if isinstance(nested, SparseFieldsetMixin):
+                    nested.fieldset = fieldset.child(name)
+                readable.append(field)
+            self._sparse_readable_fields = readable
+        return self._sparse_readable_fields
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     token = serializers.SerializerMethodField()
     account_type = serializers.SerializerMethodField()
 
@@ -20,6 +98,10 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
     def get_token(self, obj):
+        # Only ever hand out the requesting user's own token, nested staff/co-owner users get None
+        request = self.context.get('request')
+        if request is not None and request.user.pk != obj.pk:
+            return None
         token, created = Token.objects.get_or_create(user=obj)
         return token.key
     
@@ -35,13 +117,13 @@ class UserLoginSerializer(serializers.Serializer):
     password = serializers.CharField()
 
 
-class BasicStaffUserSerializer(serializers.ModelSerializer):
+class BasicStaffUserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['first_name', 'last_name']
 
 
-class BasicStaffProfileSerializer(serializers.ModelSerializer):
+class BasicStaffProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer()
 
     class Meta:
@@ -49,7 +131,7 @@ class BasicStaffProfileSerializer(serializers.ModelSerializer):
         fields = ['id','user', 'role', 'phone', 'is_active']
 
 
-class StaffProfileSerializer(serializers.ModelSerializer):
+class StaffProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer()
     daycares = serializers.PrimaryKeyRelatedField(
         queryset=Daycare.objects.all(),
@@ -96,17 +178,17 @@ class StaffProfileSerializer(serializers.ModelSerializer):
 
         return staff_profile
 
-class BasicDaycareSerializerStaff(serializers.ModelSerializer):
+class BasicDaycareSerializerStaff(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Daycare
         fields = ['id', 'daycare_name']
 
-class BasicUserSerializer(serializers.ModelSerializer):
+class BasicUserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['first_name', 'last_name']
 
-class BasicRosterStaffProfileSerializer(serializers.ModelSerializer):
+class BasicRosterStaffProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     first_name = serializers.CharField(source='user.first_name')
     last_name = serializers.CharField(source='user.last_name')
 
@@ -118,7 +200,7 @@ class BasicRosterStaffProfileSerializer(serializers.ModelSerializer):
         representation = super().to_representation(instance)
         return representation
 
-class BasicPetSerializer(serializers.ModelSerializer):
+class BasicPetSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     pet_types_display = serializers.SerializerMethodField()
     customers = serializers.SerializerMethodField() 
 
@@ -130,16 +212,16 @@ class BasicPetSerializer(serializers.ModelSerializer):
         return obj.get_pet_types_display()  
 
     def get_customers(self, obj):
-        return CustomerBasicProfileSerializer(obj.customers.all(), many=True).data 
+        return CustomerBasicProfileSerializer(obj.customers.all(), many=True, context=self.nested_context('customers')).data 
     
 
-class BasicPetNameSerializer(serializers.ModelSerializer):
+class BasicPetNameSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Pet
         fields = ['id', 'pet_name']
 
 
-class CustomerProfileSerializer(serializers.ModelSerializer):
+class CustomerProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer()
     pets = serializers.SerializerMethodField()
     # Serializer Classes here need to be added
@@ -149,7 +231,7 @@ class CustomerProfileSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'phone', 'pets', 'is_active']
 
     def get_pets(self, obj):
-        return BasicPetSerializer(obj.pets.all(), many=True).data 
+        return BasicPetSerializer(obj.pets.prefetch_related('customers__user'), many=True, context=self.nested_context('pets')).data 
 
     def create(self, validated_data):
         user_data = validated_data.pop('user')
@@ -159,7 +241,27 @@ class CustomerProfileSerializer(serializers.ModelSerializer):
         return customer_profile
 
 
-class CustomerBasicProfileSerializer(serializers.ModelSerializer):
+class CustomerDirectoryUserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'email']
+
+
+class CustomerDirectorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Staff customer directory, rendered entirely from select_related/prefetched rows
+    (see CustomerProfileViewSet.get_directory_queryset), unlike CustomerProfileSerializer which
+    looks up tokens and pets per customer.
+    """
+    user = CustomerDirectoryUserSerializer(read_only=True)
+    pets = BasicPetSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = CustomerProfile
+        fields = ['id', 'user', 'phone', 'pets', 'is_active']
+
+
+class CustomerBasicProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField() 
     class Meta:
         model = CustomerProfile
@@ -169,18 +271,21 @@ class CustomerBasicProfileSerializer(serializers.ModelSerializer):
         return f"{obj.user.first_name} {obj.user.last_name}" 
     
 
-class OpeningHoursSerializer(serializers.ModelSerializer):
+OPENING_HOURS_FIELDS = ['from_hour', 'to_hour', 'closed', 'capacity']
+
+
+class OpeningHoursSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     day_name = serializers.SerializerMethodField()
 
     class Meta:
         model = OpeningHours
-        fields = ['day', 'day_name', 'from_hour', 'to_hour', 'closed', 'capacity']
+        fields = ['day', 'day_name'] + OPENING_HOURS_FIELDS
 
     def get_day_name(self, obj):
         return obj.get_day_display()
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     daycare_name = serializers.ReadOnlyField(source='daycare.daycare_name')
 
     class Meta:
@@ -188,7 +293,7 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'price', 'capacity', 'daycare', 'daycare_name', 'is_active']
 
 
-class DaycareSerializer(serializers.ModelSerializer):
+class DaycareSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     staff = serializers.SerializerMethodField()
     opening_hours = OpeningHoursSerializer(many=True)
     products = ProductSerializer(many=True, read_only=True)
@@ -196,7 +301,7 @@ class DaycareSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Daycare
-        fields = ['id', 'daycare_name', 'street_address', 'suburb', 'state', 'postcode', 'phone', 'email', 'staff', 'is_active', 'capacity', 'opening_hours', 'products', 'pet_types' ,'pet_types_display']
+        fields = ['id', 'daycare_name', 'street_address', 'suburb', 'state', 'postcode', 'phone', 'email', 'staff', 'is_active', 'capacity', 'daily_rate', 'opening_hours', 'products', 'pet_types' ,'pet_types_display']
 
     def get_pet_types_display(self, obj):
         return obj.get_pet_types_display()
@@ -206,11 +311,13 @@ class DaycareSerializer(serializers.ModelSerializer):
         if not request:
             return []
         role = request.query_params.get('role')
+        # DaycareViewSet prefetches staff with their users, otherwise fall back to a query
+        staff = getattr(obj, 'prefetched_staff', None)
+        if staff is None:
+            staff = StaffProfile.objects.filter(daycares=obj).select_related('user')
         if role and role in ['O', 'E']:
-            staff = StaffProfile.objects.filter(daycares=obj, role=role)
-        else:
-            staff = StaffProfile.objects.filter(daycares=obj)
-        return BasicStaffProfileSerializer(staff, many=True).data
+            staff = [profile for profile in staff if profile.role == role]
+        return BasicStaffProfileSerializer(staff, many=True, context=self.nested_context('staff')).data
 
     def create(self, validated_data):
         opening_hours_data = validated_data.pop('opening_hours', [])
@@ -223,30 +330,71 @@ class DaycareSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Only Owners can create Daycare entries.")
         except StaffProfile.DoesNotExist:
             raise serializers.ValidationError("Only Owners can create Daycare entries.")
-        daycare = Daycare.objects.create(**validated_data)
-        creator_profile.daycares.add(daycare)
-        for oh_data in opening_hours_data:
-            OpeningHours.objects.create(daycare=daycare, **oh_data)
+        with transaction.atomic():
+            daycare = Daycare.objects.create(**validated_data)
+            creator_profile.daycares.add(daycare)
+            OpeningHours.objects.bulk_create([
+                OpeningHours(daycare=daycare, **oh_data) for oh_data in opening_hours_data
+            ])
         return daycare
 
     def update(self, instance, validated_data):
         opening_hours_data = validated_data.pop('opening_hours', [])
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
 
-        if opening_hours_data:
-            # Remove existing opening hours if any
-            instance.opening_hours.all().delete()
-            # Add new opening hours
-            for oh_data in opening_hours_data:
-                OpeningHours.objects.create(daycare=instance, **oh_data)
+            if opening_hours_data:
+                self.upsert_opening_hours(instance, opening_hours_data)
 
         return instance
 
+    def validate_opening_hours(self, value):
+        days = [oh_data['day'] for oh_data in value]
+        if len(days) != len(set(days)):
+            raise serializers.ValidationError("Each day can only have one set of opening hours.")
+        return value
+
+    def upsert_opening_hours(self, daycare, opening_hours_data):
+        """
+        Reconcile opening hours by (daycare, day): unchanged days are left alone,
+        changed days are bulk updated, new days bulk created and days no longer sent are removed.
+        """
+        existing = {oh.day: oh for oh in daycare.opening_hours.all()}
+        to_create = []
+        to_update = []
 
-class CustomerDaycareSerializer(serializers.ModelSerializer):
+        for oh_data in opening_hours_data:
+            current = existing.pop(oh_data['day'], None)
+            if current is None:
+                to_create.append(OpeningHours(daycare=daycare, **oh_data))
+                continue
+            changed = False
+            for attr, value in oh_data.items():
+                if getattr(current, attr) != value:
+                    setattr(current, attr, value)
+                    changed = True
+            if changed:
+                to_update.append(current)
+
+        if existing:
+            OpeningHours.objects.filter(id__in=[oh.id for oh in existing.values()]).delete()
+        if to_update:
+            now = timezone.now()
+            for oh in to_update:
+                oh.updated_at = now  # bulk_update doesn't apply auto_now
+            OpeningHours.objects.bulk_update(to_update, OPENING_HOURS_FIELDS + ['updated_at'])
+        if to_create:
+            OpeningHours.objects.bulk_create(to_create)
+
+        if to_create or to_update:
+            # bulk_* skip the post_save signals, bump_daycare_version waits for the commit itself
+            bump_daycare_version(daycare.id)
+
+
+class CustomerDaycareSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     opening_hours = OpeningHoursSerializer(many=True)
 
     class Meta:
@@ -254,7 +402,18 @@ class CustomerDaycareSerializer(serializers.ModelSerializer):
         fields = ['id', 'daycare_name', 'street_address', 'suburb', 'state', 'postcode', 'phone', 'email', 'opening_hours']
 
 
-class RosterSerializer(serializers.ModelSerializer):
+class NearbyDaycareSerializer(CustomerDaycareSerializer):
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta(CustomerDaycareSerializer.Meta):
+        fields = CustomerDaycareSerializer.Meta.fields + ['distance_km']
+
+    def get_distance_km(self, obj):
+        # distance_km is attached by DaycareViewSet.nearby after exact ranking
+        return round(obj.distance_km, 2)
+
+
+class RosterSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     staff_id = serializers.PrimaryKeyRelatedField(queryset=StaffProfile.objects.all(), source='staff', write_only=True)
     staff = BasicRosterStaffProfileSerializer(read_only=True)
     daycare = serializers.PrimaryKeyRelatedField(queryset=Daycare.objects.all())
@@ -326,7 +485,7 @@ class RosterSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class StaffUnavailabilitySerializer(serializers.ModelSerializer):
+class StaffUnavailabilitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     staff = BasicRosterStaffProfileSerializer(read_only=True)
     class Meta:
         model = StaffUnavailability
@@ -341,25 +500,45 @@ class StaffUnavailabilitySerializer(serializers.ModelSerializer):
         return data
 
 
-class PetNameOnlySerializer(serializers.ModelSerializer):
+class PetNameOnlySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Pet
         fields = ['id', 'pet_name', 'pet_bio', 'is_public', 'is_active']
 
 
-class PetSimpleSerializer(serializers.ModelSerializer):
+class PetSimpleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Pet
         fields = ['id', 'pet_name']  # Only include pet ID and pet_name
 
 
-class PetSerializer(serializers.ModelSerializer):
+def thumbnail_urls(photo):
+    return {label: default_storage.url(name) for label, name in photo.thumbnails.items()}
+
+
+class PetPhotoSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    original = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PetPhoto
+        fields = ['id', 'pet', 'status', 'original', 'thumbnails', 'uploaded_at']
+
+    def get_original(self, obj):
+        return default_storage.url(obj.original.name)
+
+    def get_thumbnails(self, obj):
+        return thumbnail_urls(obj)
+
+
+class PetSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     pet_types_display = serializers.SerializerMethodField()
     customers = serializers.SerializerMethodField()
+    photos = serializers.SerializerMethodField()
 
     class Meta:
         model = Pet
-        fields = ['id', 'pet_name', 'pet_types', 'pet_bio', 'is_public', 'is_active', 'invite_token', 'pet_types_display', 'customers']
+        fields = ['id', 'pet_name', 'pet_types', 'pet_bio', 'is_public', 'is_active', 'invite_token', 'pet_types_display', 'customers', 'photos']
         extra_kwargs = {
             'is_active': {'default': True},
             'is_public': {'default': True},
@@ -376,13 +555,26 @@ class PetSerializer(serializers.ModelSerializer):
             'email': customer.user.email
         } for customer in obj.customers.all()]
 
+    def get_photos(self, obj):
+        # Thumbnail URLs only, built from stored names so listing never opens the original files
+        return [{
+            'id': photo.id,
+            'status': photo.status,
+            'thumbnails': thumbnail_urls(photo),
+        } for photo in obj.photos.all() if photo.is_active]
+
+    def is_owner(self, instance, user):
+        # PetViewSet annotates is_owner in SQL, fall back to checking the owners for other callers
+        if hasattr(instance, 'is_owner'):
+            return instance.is_owner
+        return hasattr(user, 'customerprofile') and instance.customers.filter(id=user.customerprofile.id).exists()
+
     def to_representation(self, instance):
         request = self.context.get('request', None)
 
         # If the pet is private and the user is not a customer, return limited information
         if not instance.is_public and request:
-            user = request.user
-            if not hasattr(user, 'customerprofile') or user.customerprofile not in instance.customers.all():
+            if not self.is_owner(instance, request.user):
                 # Use PetNameOnlySerializer to return just the pet name
                 return PetNameOnlySerializer(instance).data
 
@@ -391,20 +583,24 @@ class PetSerializer(serializers.ModelSerializer):
 
 
 
-class PetNoteSerializer(serializers.ModelSerializer):
+class PetNoteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     pet = serializers.PrimaryKeyRelatedField(queryset=Pet.objects.all())
     employee = serializers.PrimaryKeyRelatedField(queryset=StaffProfile.objects.all())
+    # Read from the select_related join in PetNoteViewSet.get_queryset
+    pet_name = serializers.ReadOnlyField(source='pet.pet_name')
+    employee_name = serializers.ReadOnlyField(source='employee.user.get_full_name')
 
     class Meta:
         model = PetNote
-        fields = ['id', 'pet', 'employee', 'note', 'is_private']
+        fields = ['id', 'pet', 'pet_name', 'employee', 'employee_name', 'note', 'is_private', 'created_at']
+        read_only_fields = ['created_at']
 
     def create(self, validated_data):
         return PetNote.objects.create(**validated_data)
 
 
-class BookingSerializer(serializers.ModelSerializer):
-    products = serializers.PrimaryKeyRelatedField(many=True, queryset=Product.objects.all(), required=False)
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    products = BulkPrimaryKeyRelatedField(queryset=Product.objects.all(), required=False)
     customer_details = CustomerBasicProfileSerializer(source='customer', read_only=True)
     pet_details = PetSimpleSerializer(source='pet', read_only=True)
 
@@ -416,6 +612,12 @@ class BookingSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         request = self.context['request']
         user = request.user
+
+        # Partial edits only send what changed, validate the booking as it will be saved
+        if self.instance is not None:
+            for field in ('customer', 'pet', 'daycare', 'start_time', 'end_time'):
+                attrs.setdefault(field, getattr(self.instance, field))
+
         pet = attrs.get('pet')
         daycare = attrs.get('daycare')
 
@@ -439,6 +641,14 @@ class BookingSerializer(serializers.ModelSerializer):
         if blacklisted_pet:
             raise serializers.ValidationError({"pet": "This pet is blacklisted from this daycare."})
 
+        products = attrs.get('products') or []
+        if daycare and any(product.daycare_id != daycare.id for product in products):
+            raise serializers.ValidationError({"products": "Products must belong to the booked daycare."})
+
+        # pet and daycare are already loaded, so compatibility is a bitmask check with no extra query
+        if pet and daycare and not accepts_pet_types(daycare.pet_types_mask, pet.pet_types_mask):
+            raise serializers.ValidationError({"pet": "This daycare does not accept this type of pet."})
+
         start_time = attrs.get('start_time')
         end_time = attrs.get('end_time')
 
@@ -464,9 +674,15 @@ class BookingSerializer(serializers.ModelSerializer):
     def add_warning(self, message):
         print(f"Warning: {message}")
 
+    def _other_bookings(self):
+        """Every booking except the one being edited."""
+        if self.instance is not None:
+            return Booking.objects.exclude(pk=self.instance.pk)
+        return Booking.objects.all()
+
     def has_overlapping_bookings(self, pet, daycare, start_time, end_time):
         """Check if the pet has overlapping bookings at the same daycare or any daycare."""
-        overlapping_bookings = Booking.objects.filter(
+        overlapping_bookings = self._other_bookings().filter(
             pet=pet,
             daycare=daycare,
             start_time__lt=end_time,
@@ -476,7 +692,7 @@ class BookingSerializer(serializers.ModelSerializer):
         if overlapping_bookings:
             return True
         
-        return Booking.objects.filter(
+        return self._other_bookings().filter(
             pet=pet,
             start_time__lt=end_time,
             end_time__gt=start_time
@@ -510,7 +726,7 @@ class BookingSerializer(serializers.ModelSerializer):
         opening_hours = OpeningHours.objects.filter(daycare=daycare, day=day_of_week).first()
 
         if opening_hours and opening_hours.capacity > 0:
-            current_bookings_count = Booking.objects.filter(
+            current_bookings_count = self._other_bookings().filter(
                 daycare=daycare,
                 start_time__lt=end_time,
                 end_time__gt=start_time
@@ -521,14 +737,26 @@ class BookingSerializer(serializers.ModelSerializer):
         return False
     
 
-class BookingWaitlistSerializer(serializers.ModelSerializer):
+class BookingWaitlistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = ['id', 'customer', 'pet', 'daycare', 'start_time', 'end_time', 'status', 'is_active', 'recurrence', 'products', 'customer_details', 'pet_details', 'checked_in', 'is_waitlist', 'waitlist_accepted']
         read_only_fields = ['status']
     
 
-class CustomerNameSerializer(serializers.ModelSerializer):
+
+class CheckInEventSerializer(serializers.Serializer):
+    """One queued tablet check in/out, see utils/check_in_events.py"""
+    id = serializers.UUIDField()
+    booking = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=CheckInEvent.Action.choices)
+    at = serializers.DateTimeField()
+
+
+class CheckInEventBatchSerializer(serializers.Serializer):
+    events = CheckInEventSerializer(many=True, allow_empty=False, max_length=CHECK_IN_BATCH_SIZE)
+
+class CustomerNameSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     first_name = serializers.CharField(source='user.first_name', read_only=True)
     last_name = serializers.CharField(source='user.last_name', read_only=True)
     username = serializers.CharField(source='user.username', read_only=True)
@@ -539,26 +767,33 @@ class CustomerNameSerializer(serializers.ModelSerializer):
         fields = ['id', 'first_name', 'last_name', 'username', 'pets']
 
     def get_pets(self, obj):
-        return BasicPetNameSerializer(obj.pets.all(), many=True).data
+        return BasicPetNameSerializer(obj.pets.all(), many=True, context=self.nested_context('pets')).data
 
 
-class BlacklistedPetSerializer(serializers.ModelSerializer):
+class BlacklistedPetSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = BlacklistedPet
         fields = ['id', 'pet', 'daycare', 'reason', 'date_blacklisted', 'is_active']
 
 
-class WaitlistSerializer(serializers.ModelSerializer):
+class WaitlistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     booking = serializers.SerializerMethodField()
     class Meta:
         model = Waitlist
         fields = ['id', 'booking', 'customer_notified', 'waitlisted_at', 'customer_accepted', 'is_active']
 
     def get_booking(self, obj):
-        return BookingSerializer(obj.booking).data
+        return BookingSerializer(obj.booking, context=self.nested_context('booking')).data
     
     # need to make smaller booking serializer with just daycare name, pet and finer details just for waitlist display
 
+
+class SyncWaitlistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Waitlist entries for /sync/, the booking is synced on its own so it's just an id here"""
+    class Meta:
+        model = Waitlist
+        fields = ['id', 'booking', 'customer_notified', 'waitlisted_at', 'customer_accepted', 'is_active']
+
 # class PostSerializer(serializers.ModelSerializer):
 #     class Meta:
 #         model = Post
@@ -0,0 +1,169 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import (
+    Daycare, OpeningHours, Product, StaffProfile, CustomerProfile, Pet, PetOwnershipEvent,
+    Booking, Roster, BlacklistedPet, Waitlist, SyncChange, PetNote, PetNoteTerm,
+)
+from .utils.conditional import touch
+from .utils.daycare_cache import bump_daycare_version
+from .utils.search import customer_search_fields, note_terms
+from .utils.sync import record_changes, pet_daycares
+
+
+@receiver([post_save, post_delete], sender=Daycare)
+def daycare_changed(sender, instance, **kwargs):
+    bump_daycare_version(instance.id)
+
+
+@receiver([post_save, post_delete], sender=OpeningHours)
+@receiver([post_save, post_delete], sender=Product)
+def daycare_child_changed(sender, instance, signal, **kwargs):
+    bump_daycare_version(instance.daycare_id)
+    if signal is post_delete:
+        # A deleted row can't move the daycare's conditional GET fingerprint itself
+        touch(Daycare.objects.filter(id=instance.daycare_id))
+
+
+@receiver(post_save, sender=StaffProfile)
+def staff_profile_changed(sender, instance, created, **kwargs):
+    # Role / phone changes show up in the nested staff list
+    if not created:
+        bump_daycare_version(*instance.daycares.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=StaffProfile.daycares.through)
+def staff_daycares_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _touch_staff_daycares(instance, reverse, pk_set)
+
+    if reverse:
+        # instance is a Daycare, staff were added/removed from it
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_daycare_version(instance.id)
+        return
+
+    if action == 'pre_clear':
+        # pk_set is None on clear, so remember which daycares are about to lose this staff member
+        instance._cleared_daycare_ids = list(instance.daycares.values_list('id', flat=True))
+    elif action == 'post_clear':
+        bump_daycare_version(*getattr(instance, '_cleared_daycare_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        bump_daycare_version(*(pk_set or []))
+
+
+def _touch_staff_daycares(instance, reverse, pk_set):
+    # Both sides render the other (staff daycares_names, daycare staff), and m2m changes don't save either
+    daycare_ids = [instance.id] if reverse else list(pk_set or getattr(instance, '_cleared_daycare_ids', []))
+    staff_ids = list(pk_set or []) if reverse else [instance.id]
+    touch(Daycare.objects.filter(id__in=daycare_ids))
+    touch(StaffProfile.objects.filter(id__in=staff_ids))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    # Profiles render their user, so their updated_at has to move too. Login only writes last_login
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    touch(StaffProfile.objects.filter(user=instance))
+    touch(CustomerProfile.objects.filter(user=instance))
+
+
+@receiver(post_save, sender=User)
+def user_name_changed(sender, instance, created, update_fields, **kwargs):
+    # Keep the customer autocomplete columns in sync, skipping saves like last_login updates on login
+    if created or (update_fields and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    for customer in CustomerProfile.objects.filter(user=instance).only('id', 'phone'):
+        CustomerProfile.objects.filter(id=customer.id).update(**customer_search_fields(instance, customer.phone))
+
+
+@receiver(post_save, sender=PetNote)
+def pet_note_saved(sender, instance, created, update_fields, **kwargs):
+    # Reindex the words behind the note search (utils/search.py), removed with the note by the cascade
+    if update_fields and 'note' not in update_fields:
+        return
+    terms = note_terms(instance.note)
+    if not created:
+        PetNoteTerm.objects.filter(note=instance).exclude(term__in=terms).delete()
+    PetNoteTerm.objects.bulk_create([PetNoteTerm(note=instance, term=term) for term in terms], ignore_conflicts=True)
+
+
+@receiver(m2m_changed, sender=Pet.customers.through)
+def pet_owners_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Record co-owner changes for the pet timeline."""
+    if action == 'pre_clear':
+        # pk_set is None on clear, remember what is about to be removed
+        related = instance.pets if reverse else instance.customers
+        instance._cleared_owner_ids = set(related.values_list('id', flat=True))
+        return
+    if action == 'post_clear':
+        action, pk_set = 'post_remove', getattr(instance, '_cleared_owner_ids', set())
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    # Pets render their owners and customers their pets
+    pet_ids, customer_ids = (pk_set, [instance.id]) if reverse else ([instance.id], pk_set)
+    touch(Pet.objects.filter(id__in=pet_ids))
+    touch(CustomerProfile.objects.filter(id__in=customer_ids))
+    record_changes(SyncChange.Kind.PET, pet_daycares(pet_ids))
+
+    event_action = PetOwnershipEvent.Action.ADDED if action == 'post_add' else PetOwnershipEvent.Action.REMOVED
+    if reverse:
+        events = [PetOwnershipEvent(pet_id=pet_id, customer=instance, action=event_action) for pet_id in pk_set]
+    else:
+        events = [PetOwnershipEvent(pet=instance, customer_id=customer_id, action=event_action) for customer_id in pk_set]
+    PetOwnershipEvent.objects.bulk_create(events)
+
+
+# Delta sync log (utils/sync.py), one row per daycare that can see the change
+
+@receiver([post_save, post_delete], sender=Booking)
+@receiver([post_save, post_delete], sender=Roster)
+def daycare_row_changed(sender, instance, created=False, **kwargs):
+    kind = SyncChange.Kind.BOOKING if sender is Booking else SyncChange.Kind.ROSTER
+    # A row moved to another daycare becomes a tombstone at the one it left
+    loaded_daycare_id = getattr(instance, '_loaded_daycare_id', None)
+    record_changes(kind, [(instance.id, instance.daycare_id), (instance.id, loaded_daycare_id)])
+    instance._loaded_daycare_id = instance.daycare_id
+    if sender is Booking:
+        # Its pet and waitlist entry are only visible through it, so they come and go with it
+        daycare_ids = {instance.daycare_id, loaded_daycare_id}
+        record_changes(SyncChange.Kind.PET, [(instance.pet_id, daycare_id) for daycare_id in daycare_ids])
+        if not created:
+            waitlist_ids = Waitlist.objects.filter(booking_id=instance.id).values_list('id', flat=True)
+            record_changes(SyncChange.Kind.WAITLIST, [
+                (waitlist_id, daycare_id) for waitlist_id in waitlist_ids for daycare_id in daycare_ids
+            ])
+
+
+@receiver([post_save, post_delete], sender=BlacklistedPet)
+def blacklist_changed(sender, instance, created=False, **kwargs):
+    record_changes(SyncChange.Kind.BLACKLIST, [(instance.id, instance.daycare_id)])
+    if created:
+        record_changes(SyncChange.Kind.PET, [(instance.pet_id, instance.daycare_id)])
+
+
+@receiver([post_save, post_delete], sender=Waitlist)
+def waitlist_changed(sender, instance, **kwargs):
+    daycare_ids = Booking.objects.filter(id=instance.booking_id).values_list('daycare_id', flat=True)
+    record_changes(SyncChange.Kind.WAITLIST, [(instance.id, daycare_id) for daycare_id in daycare_ids])
+
+
+@receiver(post_save, sender=Pet)
+def pet_changed(sender, instance, created, **kwargs):
+    # A new pet has no bookings yet, it is logged when it gets one
+    if not created:
+        record_changes(SyncChange.Kind.PET, pet_daycares([instance.id]))
+
+
+@receiver(pre_delete, sender=Pet)
+def pet_deleting(sender, instance, **kwargs):
+    # Its bookings and blacklistings are deleted with it, so work out who could see it first
+    instance._sync_daycares = pet_daycares([instance.id])
+
+
+@receiver(post_delete, sender=Pet)
+def pet_deleted(sender, instance, **kwargs):
+    record_changes(SyncChange.Kind.PET, getattr(instance, '_sync_daycares', []))
@@ -0,0 +1,65 @@
+"""
+Background tasks, run by `manage.py run_workers` (see utils/jobs.py). Imported by CoreConfig.ready so
+every process knows them before enqueueing or running one.
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Booking
+from .utils import notifications, rollups, sync
+from .utils.jobs import purge_finished, task
+
+
+@task(max_attempts=3)
+def expand_recurring_booking(booking_id):
+    """Books the next 4 weeks of a recurring booking, weeks that already exist are skipped so a retry is safe."""
+    booking = Booking.objects.filter(id=booking_id, is_active=True, recurrence=True).first()
+    if booking is None:
+        return  # Cancelled before we got to it
+
+    with transaction.atomic():
+        for week in range(1, 5):
+            start_time = booking.start_time + timedelta(weeks=week)
+            if Booking.objects.filter(pet_id=booking.pet_id, daycare_id=booking.daycare_id, start_time=start_time).exists():
+                continue
+            recurring = Booking.objects.create(
+                customer_id=booking.customer_id,
+                pet_id=booking.pet_id,
+                daycare_id=booking.daycare_id,
+                start_time=start_time,
+                end_time=booking.end_time + timedelta(weeks=week),
+                status=booking.status,
+                is_active=True,
+                recurrence=False,
+            )
+            rollups.record_booking_change(None, rollups.booking_contribution(recurring))
+
+
+@task()
+def refresh_occupancy(daycare_id, day):
+    rollups.refresh_occupancy(daycare_id, date.fromisoformat(day))
+
+
+@task(cron='* * * * *', max_attempts=1)
+def dispatch_notifications():
+    """Sends the email outbox. Queued with every new notification, and every minute to pick up retries."""
+    notifications.dispatch()
+
+
+@task(cron='15 2 * * *')
+def repair_daily_stats():
+    """Rebuilds yesterday's and today's rollups, in case an incremental update was lost."""
+    today = timezone.localdate()
+    rollups.rebuild_daily_stats(start_date=today - timedelta(days=1), end_date=today)
+
+
+@task(cron='30 2 * * *')
+def prune_sync_changes():
+    sync.prune()
+
+
+@task(cron='45 2 * * *')
+def purge_finished_jobs():
+    purge_finished()
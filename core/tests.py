@@ -1,3 +1,1928 @@
-from django.test import TestCase
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import fast_json
+from core.fast_json import FastJSONParser, FastJSONRenderer
+from core.middleware import QueryInstrumentationMiddleware
+from core.models import *
+from core.serializers import CustomerBasicProfileSerializer
+from core.utils import jobs, notifications, sync
+from core.utils.benchmark import (
+    SCENARIOS, Scenario, build_context, compare_json_codecs, compare_results, percentile, run_benchmark, run_scenario,
+)
+from core.utils.conditional import first_seen, queryset_fingerprint, touch
+from core.utils.cron import CronSchedule
+from core.utils.customer_import import import_customers, read_rows
+from core.utils.geo import bounding_box, haversine_km
+from core.utils.invoicing import generate_invoices
+from core.utils.pet_types import ALL_PET_TYPES_MASK, PET_TYPES, masks_including, pet_types_to_mask
+from core.utils.rollups import COUNT_FIELDS, peak_overlap, rebuild_daily_stats
+from core.utils.search import customer_search_fields, search_notes
+from core.utils.seed_data import DEFAULT_PASSWORD, SeedConfig, seed_dataset
+from core.utils.sparse_fields import Fieldset, parse_paths
+from core.utils.sql_instrumentation import QueryRecorder, RepeatedQueryError, query_shape
+from django_daycare.urls import api_router
+
+SMALL = 2
+LARGE = 5
+
+
+class Fixture:
+    """
+    Everything an owner, an employee and a customer can see, `size` of each kind of row.
+    Built twice per endpoint (SMALL and LARGE) and thrown away after each request.
+    """
+
+    def __init__(self, size):
+        today = timezone.localdate()
+        monday = today + timedelta(days=7 - today.weekday())
+        self.tomorrow = today + timedelta(days=1)
+
+        PostcodeCentroid.objects.create(postcode='2000', suburb='Sydney', state='NSW', latitude=-33.87, longitude=151.21)
+        self.daycare = Daycare.objects.create(
+            daycare_name='Budget Daycare', street_address='1 George St', suburb='Sydney', state='NSW',
+            postcode='2000', phone='0200000000', email='daycare@example.com', capacity=100, pet_types=[1, 2],
+        )
+        for day in range(1, 8):
+            OpeningHours.objects.create(daycare=self.daycare, day=day, from_hour=time(7), to_hour=time(18), capacity=100)
+        self.products = [
+            Product.objects.create(daycare=self.daycare, name=f'Product {i}', description='', price=10)
+            for i in range(size)
+        ]
+
+        self.owner = self._staff('owner', 'O')
+        self.employee = self._staff('employee', 'E')
+        for i in range(size):
+            self._staff(f'staff-{i}', 'E')
+        self.customer = self._customer('customer')
+        self.other_customer = self._customer('other')
+
+        self.rosters = [
+            Roster.objects.create(
+                staff=self.employee, daycare=self.daycare, shift_day=monday + timedelta(days=i),
+                start_shift=self._at(monday + timedelta(days=i), 7), end_shift=self._at(monday + timedelta(days=i), 15),
+            )
+            for i in range(size)
+        ]
+        self.unavailability = [
+            StaffUnavailability.objects.create(staff=self.employee, date=monday + timedelta(days=i))
+            for i in range(size)
+        ]
+
+        self.pets = []
+        for i in range(size):
+            pet = Pet.objects.create(pet_name=f'Pet {i}', pet_types=[1])
+            pet.customers.add(self.customer)
+            self.pets.append(pet)
+        for i in range(size):
+            self.pets[0].customers.add(self._customer(f'co-owner-{i}'))
+        self.pets[0].invite_token = 'budget-invite'
+        self.pets[0].save()
+        self.spare_pet = Pet.objects.create(pet_name='Spare', pet_types=[1])
+        self.spare_pet.customers.add(self.customer)
+
+        self.bookings = []
+        self.waitlists = []
+        for i, pet in enumerate(self.pets):
+            day = monday + timedelta(days=i)
+            booking = Booking.objects.create(
+                customer=self.customer, pet=pet, daycare=self.daycare,
+                start_time=self._at(day, 8), end_time=self._at(day, 12),
+            )
+            booking.products.set(self.products)
+            self.bookings.append(booking)
+            waitlisted = Booking.objects.create(
+                customer=self.customer, pet=pet, daycare=self.daycare,
+                start_time=self._at(day, 13), end_time=self._at(day, 17), is_waitlist=True, waitlist_accepted=True,
+            )
+            waitlisted.products.set(self.products)
+            self.waitlists.append(Waitlist.objects.create(booking=waitlisted, customer_notified=True))
+
+        self.notes = [
+            PetNote.objects.create(pet=self.pets[0], employee=self.employee, note=f'Note {i}') for i in range(size)
+        ]
+        self.blacklists = []
+        for i in range(size):
+            pet = Pet.objects.create(pet_name=f'Banned {i}', pet_types=[1])
+            pet.customers.add(self.other_customer)
+            self.blacklists.append(BlacklistedPet.objects.create(pet=pet, daycare=self.daycare, reason='Bites'))
+
+        rebuild_daily_stats([self.daycare.id])
+
+    def _at(self, day, hour):
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def _staff(self, username, role):
+        user = User.objects.create_user(username, password='pw', first_name=username, last_name='Staff')
+        profile = StaffProfile.objects.create(user=user, role=role, phone='0400000000')
+        profile.daycares.add(self.daycare)
+        return profile
+
+    def _customer(self, username):
+        user = User.objects.create_user(username, password='pw', first_name=username, last_name='Customer')
+        return CustomerProfile.objects.create(user=user, phone='0411111111')
+
+    def slot(self, day_offset=0):
+        start = self._at(self.tomorrow + timedelta(days=60 + day_offset), 9)
+        return start.isoformat(), (start + timedelta(hours=3)).isoformat()
+
+
+def booking_payload(fx):
+    start, end = fx.slot()
+    return {
+        'customer': fx.customer.id, 'pet': fx.spare_pet.id, 'daycare': fx.daycare.id,
+        'start_time': start, 'end_time': end, 'products': [fx.products[0].id],
+    }
+
+
+def check_in_events_payload(fx):
+    at = timezone.now() - timedelta(hours=1)
+    events = [
+        {'id': str(uuid.uuid4()), 'booking': booking.id, 'action': 'check_in', 'at': (at + timedelta(minutes=i)).isoformat()}
+        for i, booking in enumerate(fx.bookings)
+    ]
+    events.append({'id': str(uuid.uuid4()), 'booking': fx.bookings[0].id, 'action': 'check_out', 'at': timezone.now().isoformat()})
+    return {'events': events}
+
+# (router prefix, action, user, method, path, payload)
+# Every router entry's list/retrieve and every custom @action needs a row, see test_every_action_has_a_budget
+QUERY_BUDGETS = [
+    ('users', 'retrieve', 'owner', 'get', lambda fx: f'/api/users/{fx.owner.user_id}/', None),
+    ('users', 'login', None, 'post', lambda fx: '/api/users/login/', lambda fx: {'username': 'customer', 'password': 'pw'}),
+
+    ('staff-profile', 'list', 'owner', 'get', lambda fx: '/api/staff-profile/', None),
+    ('staff-profile', 'retrieve', 'owner', 'get', lambda fx: f'/api/staff-profile/{fx.owner.id}/', None),
+    ('staff-profile', 'current', 'owner', 'get', lambda fx: '/api/staff-profile/current/', None),
+
+    ('customer-profile', 'list', 'owner', 'get', lambda fx: '/api/customer-profile/', None),
+    ('customer-profile', 'retrieve', 'customer', 'get', lambda fx: f'/api/customer-profile/{fx.customer.id}/', None),
+    ('customer-profile', 'autocomplete', 'owner', 'get', lambda fx: '/api/customer-profile/autocomplete/?q=c', None),
+    ('customer-profile', 'current', 'customer', 'get', lambda fx: '/api/customer-profile/current/', None),
+
+    ('daycare', 'list', 'owner', 'get', lambda fx: '/api/daycare/', None),
+    ('daycare', 'list', 'customer', 'get', lambda fx: '/api/daycare/', None),
+    ('daycare', 'retrieve', 'owner', 'get', lambda fx: f'/api/daycare/{fx.daycare.id}/', None),
+    ('daycare', 'generate_invoices', 'owner', 'post', lambda fx: f'/api/daycare/{fx.daycare.id}/generate-invoices/',
+     lambda fx: {'month': fx.bookings[0].start_time.strftime('%Y-%m')}),
+    ('daycare', 'report', 'owner', 'get', lambda fx: f'/api/daycare/{fx.daycare.id}/report/', None),
+    ('daycare', 'nearby', 'customer', 'get', lambda fx: '/api/daycare/nearby/?postcode=2000', None),
+
+    ('product', 'list', 'owner', 'get', lambda fx: '/api/product/', None),
+    ('product', 'retrieve', 'owner', 'get', lambda fx: f'/api/product/{fx.products[0].id}/', None),
+
+    ('roster', 'list', 'owner', 'get', lambda fx: '/api/roster/', None),
+    ('roster', 'retrieve', 'owner', 'get', lambda fx: f'/api/roster/{fx.rosters[0].id}/', None),
+    ('roster', 'deactivate', 'owner', 'patch', lambda fx: f'/api/roster/{fx.rosters[0].id}/deactivate/', None),
+
+    ('unavailability', 'list', 'owner', 'get', lambda fx: '/api/unavailability/', None),
+    ('unavailability', 'retrieve', 'employee', 'get', lambda fx: f'/api/unavailability/{fx.unavailability[0].id}/', None),
+    ('unavailability', 'deactivate', 'employee', 'patch',
+     lambda fx: f'/api/unavailability/{fx.unavailability[0].id}/deactivate/', None),
+
+    ('pet', 'list', 'customer', 'get', lambda fx: '/api/pet/', None),
+    ('pet', 'retrieve', 'customer', 'get', lambda fx: f'/api/pet/{fx.pets[0].id}/', None),
+    ('pet', 'photos', 'customer', 'get', lambda fx: f'/api/pet/{fx.pets[0].id}/photos/', None),
+    ('pet', 'timeline', 'customer', 'get', lambda fx: f'/api/pet/{fx.pets[0].id}/timeline/', None),
+    ('pet', 'generate_invite', 'customer', 'post', lambda fx: f'/api/pet/{fx.pets[0].id}/generate-invite/', None),
+    ('pet', 'accept_invite', 'other', 'post', lambda fx: '/api/pet/invite/budget-invite/', None),
+
+    ('pet-note', 'list', 'employee', 'get', lambda fx: '/api/pet-note/', None),
+    ('pet-note', 'retrieve', 'employee', 'get', lambda fx: f'/api/pet-note/{fx.notes[0].id}/', None),
+
+    ('booking', 'list', 'owner', 'get', lambda fx: '/api/booking/', None),
+    ('booking', 'list', 'customer', 'get', lambda fx: '/api/booking/', None),
+    ('booking', 'retrieve', 'owner', 'get', lambda fx: f'/api/booking/{fx.bookings[0].id}/', None),
+    ('booking', 'create', 'owner', 'post', lambda fx: '/api/booking/', booking_payload),
+    ('booking', 'edit_booking', 'employee', 'patch', lambda fx: f'/api/booking/{fx.bookings[0].id}/edit_booking/',
+     lambda fx: {'products': [product.id for product in fx.products]}),
+    ('booking', 'cancel_booking', 'customer', 'patch', lambda fx: f'/api/booking/{fx.bookings[0].id}/cancel_booking/', None),
+    ('booking', 'check_in', 'employee', 'patch', lambda fx: f'/api/booking/{fx.bookings[0].id}/check_in/', None),
+    ('booking', 'check_out', 'employee', 'patch', lambda fx: f'/api/booking/{fx.bookings[0].id}/check_out/', None),
+    ('booking', 'check_in_events', 'employee', 'post', lambda fx: '/api/booking/check-in-events/', check_in_events_payload),
+    ('booking', 'accept_waitlist', 'customer', 'post',
+     lambda fx: f'/api/booking/{fx.bookings[0].id}/accept-waitlist/', None),
+
+    ('blacklist', 'list', 'employee', 'get', lambda fx: '/api/blacklist/', None),
+    ('blacklist', 'retrieve', 'employee', 'get', lambda fx: f'/api/blacklist/{fx.blacklists[0].id}/', None),
+    ('blacklist', 'unblacklist_pet', 'employee', 'post', lambda fx: f'/api/blacklist/{fx.blacklists[0].id}/unblacklist_pet/', None),
+
+    ('waitlist', 'list', 'employee', 'get', lambda fx: '/api/waitlist/', None),
+    ('waitlist', 'retrieve', 'employee', 'get', lambda fx: f'/api/waitlist/{fx.waitlists[0].id}/', None),
+    ('waitlist', 'notify_customer', 'owner', 'patch', lambda fx: f'/api/waitlist/{fx.waitlists[0].id}/notify_customer/', None),
+    ('waitlist', 'accept_booking', 'customer', 'patch', lambda fx: f'/api/waitlist/{fx.waitlists[0].id}/accept_booking/', None),
+    ('waitlist', 'reject_booking', 'customer', 'patch', lambda fx: f'/api/waitlist/{fx.waitlists[0].id}/reject_booking/', None),
+    ('waitlist', 'uninvite_customer', 'owner', 'patch',
+     lambda fx: f'/api/waitlist/{fx.waitlists[0].id}/uninvite_customer/', None),
+
+    ('sync', 'list', 'employee', 'get', lambda fx: '/api/sync/', None),
+    ('sync', 'list', 'employee', 'get', lambda fx: '/api/sync/?since=0', None),
+]
+
+# Waitlisted bookings are outside the booking queryset, so accept-waitlist can only be refused
+EXPECTED_STATUS = {
+    ('booking', 'accept_waitlist'): 400,
+}
+
+# State a few actions need before they can succeed
+SETUP = {
+    ('booking', 'check_out'): lambda fx: Booking.objects.filter(pk=fx.bookings[0].pk).update(checked_in=True),
+    ('waitlist', 'notify_customer'): lambda fx: Waitlist.objects.filter(pk=fx.waitlists[0].pk).update(customer_notified=False),
+}
+
+
+# Fixtures create a lot of users, real password hashing would dominate the run
+TEST_SETTINGS = {'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher'], 'SQL_LOG_SAMPLE_RATE': 0}
+
+
+@override_settings(**TEST_SETTINGS)
+class QueryBudgetTests(TestCase):
+    """
+    Every endpoint must run the same number of queries whatever the size of the data behind it,
+    i.e no per-row queries. Each one is requested against a SMALL and a LARGE fixture and the counts compared.
+    """
+
+    def measure(self, prefix, action, user, method, path, payload, size):
+        with transaction.atomic():
+            fx = Fixture(size)
+            if (prefix, action) in SETUP:
+                SETUP[(prefix, action)](fx)
+            users = {
+                'owner': fx.owner.user, 'employee': fx.employee.user,
+                'customer': fx.customer.user, 'other': fx.other_customer.user,
+            }
+            client = APIClient()
+            if user:
+                # A fresh instance so nothing is already cached on it, like a real request
+                client.force_authenticate(User.objects.get(pk=users[user].pk))
+            url = path(fx)
+            data = payload(fx) if payload else None
+            cache.clear()
+
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, method)(url, data, format='json')
+            transaction.set_rollback(True)
+
+        expected = EXPECTED_STATUS.get((prefix, action))
+        ok = response.status_code == expected if expected else response.status_code < 400
+        self.assertTrue(
+            ok, f"{method.upper()} {url} as {user} returned {response.status_code}: {getattr(response, 'data', '')}",
+        )
+        return Counter(query_shape(query['sql']) for query in queries.captured_queries)
+
+    def test_query_count_is_constant(self):
+        for prefix, action, user, method, path, payload in QUERY_BUDGETS:
+            with self.subTest(endpoint=prefix, action=action, user=user):
+                small = self.measure(prefix, action, user, method, path, payload, SMALL)
+                large = self.measure(prefix, action, user, method, path, payload, LARGE)
+                if sum(small.values()) != sum(large.values()):
+                    growing = '\n'.join(
+                        f'  {small[shape]} -> {large[shape]}: {shape}'
+                        for shape in large if large[shape] != small[shape]
+                    )
+                    self.fail(
+                        f"{prefix} {action} ran {sum(small.values())} queries with {SMALL} rows "
+                        f"and {sum(large.values())} with {LARGE}:\n{growing}"
+                    )
+
+    def test_every_action_has_a_budget(self):
+        covered = {(prefix, action) for prefix, action, *_ in QUERY_BUDGETS}
+        for prefix, viewset, basename in api_router.registry:
+            actions = [name for name in ('list', 'retrieve') if hasattr(viewset, name)]
+            actions += [extra.__name__ for extra in viewset.get_extra_actions()]
+            for action in actions:
+                self.assertIn((prefix, action), covered, f"No query budget for {prefix} {action}, add one to QUERY_BUDGETS.")
+
+
+@override_settings(**TEST_SETTINGS, EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class NotificationTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        User.objects.filter(pk=self.fx.customer.user.pk).update(email='customer@example.com')
+        self.booking = Booking.objects.get(pk=self.fx.bookings[0].pk)
+
+    def client_for(self, profile):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=profile.user.pk))
+        return client
+
+    def refused(self):
+        return mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('refused'))
+
+    def queue(self, count):
+        for i in range(count):
+            notifications.queue_notification(Notification.Kind.BOOKING_CANCELLED, f'test:{i}', self.booking, 'Subject', 'Body')
+
+    def test_booking_events_queue_emails(self):
+        waitlist = self.fx.waitlists[0]
+        Waitlist.objects.filter(pk=waitlist.pk).update(customer_notified=False)
+        self.assertEqual(self.client_for(self.fx.owner).patch(f'/api/waitlist/{waitlist.id}/notify_customer/').status_code, 200)
+        self.assertEqual(self.client_for(self.fx.customer).patch(f'/api/waitlist/{waitlist.id}/accept_booking/').status_code, 200)
+        self.assertEqual(self.client_for(self.fx.customer).patch(f'/api/booking/{self.booking.id}/cancel_booking/').status_code, 200)
+
+        self.assertEqual(
+            sorted(Notification.objects.values_list('kind', flat=True)),
+            ['booking_accepted', 'booking_cancelled', 'waitlist_offer'],
+        )
+        self.assertEqual(set(Notification.objects.values_list('to_email', flat=True)), {'customer@example.com'})
+
+    def test_same_event_is_queued_once(self):
+        notifications.notify_booking_cancelled(self.booking)
+        notifications.notify_booking_cancelled(self.booking)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_rolled_back_change_queues_nothing(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            notifications.notify_booking_cancelled(self.booking)
+            raise ValueError
+        self.assertFalse(Notification.objects.exists())
+
+    def test_customer_without_email_is_skipped(self):
+        User.objects.filter(pk=self.fx.customer.user.pk).update(email='')
+        notifications.notify_booking_cancelled(Booking.objects.get(pk=self.booking.pk))
+        self.assertFalse(Notification.objects.exists())
+
+    def test_dispatch_sends_in_batches(self):
+        self.queue(5)
+        self.assertEqual(notifications.dispatch(batch_size=2), (5, 0))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].to, ['customer@example.com'])
+        self.assertFalse(Notification.objects.exclude(status=Notification.Status.SENT).exists())
+        self.assertEqual(notifications.dispatch(), (0, 0))
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.queue(1)
+        with self.refused(), self.assertLogs('core.utils.notifications', 'WARNING'):
+            self.assertEqual(notifications.dispatch(), (0, 1))
+        notification = Notification.objects.get()
+        self.assertEqual((notification.status, notification.attempts, notification.last_error), ('pending', 1, 'refused'))
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(notifications.dispatch(), (0, 0))
+
+        Notification.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(notifications.dispatch(), (1, 0))
+        self.assertEqual(Notification.objects.get().status, Notification.Status.SENT)
+
+    def test_gives_up_after_max_attempts(self):
+        self.queue(1)
+        Notification.objects.update(attempts=notifications.MAX_ATTEMPTS - 1)
+        with self.refused(), self.assertLogs('core.utils.notifications', 'WARNING'):
+            notifications.dispatch()
+        self.assertEqual(Notification.objects.get().status, Notification.Status.FAILED)
+
+    def test_stale_claim_is_sent_again(self):
+        self.queue(2)
+        claimed = notifications.claim_batch()
+        self.assertEqual(len(claimed), 2)
+        # Claimed by a dispatcher that is still running
+        self.assertEqual(notifications.dispatch(), (0, 0))
+
+        Notification.objects.update(claimed_at=timezone.now() - timedelta(seconds=notifications.CLAIM_TIMEOUT + 1))
+        self.assertEqual(notifications.dispatch(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+
+@override_settings(**TEST_SETTINGS)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.fx.employee.user.pk))
+
+    def sync(self, cursor=None):
+        response = self.client.get('/api/sync/', {'since': cursor} if cursor is not None else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_snapshot_then_only_changes(self):
+        snapshot = self.sync()
+        self.assertTrue(snapshot['full'])
+        # Waitlisted bookings are active too
+        self.assertEqual(len(snapshot['changes']['booking']), len(self.fx.bookings) + len(self.fx.waitlists))
+
+        delta = self.sync(snapshot['cursor'])
+        self.assertFalse(delta['full'])
+        self.assertEqual(delta['changes']['booking'], [])
+
+        booking = self.fx.bookings[0]
+        booking.checked_in = True
+        booking.save()
+        delta = self.sync(delta['cursor'])
+        self.assertEqual([row['id'] for row in delta['changes']['booking']], [booking.id])
+        self.assertEqual(self.sync(delta['cursor'])['changes']['booking'], [])
+
+    def test_deactivated_booking_is_a_tombstone_with_its_waitlist_entry(self):
+        cursor = self.sync()['cursor']
+        waitlist = self.fx.waitlists[0]
+        waitlisted = waitlist.booking
+        waitlisted.is_active = False
+        waitlisted.save()
+
+        delta = self.sync(cursor)
+        self.assertEqual(delta['deleted']['booking'], [waitlisted.id])
+        self.assertEqual(delta['deleted']['waitlist'], [waitlist.id])
+        # The pet still has another booking here
+        self.assertEqual(delta['deleted']['pet'], [])
+
+    def test_cursor_pages_through_changes(self):
+        cursor = self.sync()['cursor']
+        for booking in self.fx.bookings:
+            booking.save()
+        changed, cursor, has_more = sync.changes_since([self.fx.daycare.id], int(cursor), limit=1)
+        self.assertTrue(has_more)
+        changed, cursor, has_more = sync.changes_since([self.fx.daycare.id], cursor, limit=100)
+        self.assertFalse(has_more)
+
+    def test_cursor_waits_for_uncommitted_change(self):
+        start = SyncChange.objects.latest('id').id
+        sync.record_changes(SyncChange.Kind.BOOKING, [(booking.id, self.fx.daycare.id) for booking in self.fx.bookings])
+        first, second = SyncChange.objects.filter(id__gt=start).order_by('id').values_list('id', flat=True)[:2]
+        # A missing id looks like a transaction that hasn't committed yet
+        SyncChange.objects.filter(id=first).delete()
+        _, cursor, has_more = sync.changes_since([self.fx.daycare.id], start)
+        self.assertEqual((cursor, has_more), (start, False))
+
+        # Long enough ago that it must have been rolled back
+        SyncChange.objects.filter(id=second).update(created_at=timezone.now() - timedelta(seconds=sync.GAP_SECONDS + 1))
+        _, cursor, _ = sync.changes_since([self.fx.daycare.id], start)
+        self.assertEqual(cursor, SyncChange.objects.latest('id').id)
+
+    def test_pruned_cursor_gets_a_snapshot(self):
+        SyncChange.objects.update(created_at=timezone.now() - timedelta(days=sync.RETENTION_DAYS + 1))
+        sync.prune()
+        self.assertTrue(self.sync('1')['full'])
+
+    def test_other_daycare_is_forbidden(self):
+        other = Daycare.objects.create(
+            daycare_name='Other', street_address='2 George St', suburb='Sydney', state='NSW',
+            postcode='2000', phone='0200000001', email='other@example.com', capacity=10,
+        )
+        self.assertEqual(self.client.get('/api/sync/', {'daycare': other.id}).status_code, 403)
+
+
+test_task_calls = []
+
+
+@jobs.task(name='test_task', max_attempts=2)
+def run_test_task(value):
+    if value == 'fail':
+        raise RuntimeError("Task failed")
+    test_task_calls.append(value)
+
+
+class JobTests(TestCase):
+    def setUp(self):
+        test_task_calls.clear()
+
+    def local(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def run_next(self):
+        job = jobs.claim('test-worker')
+        self.assertIsNotNone(job)
+        jobs.run_job(job)
+        job.refresh_from_db()
+        return job
+
+    def test_job_runs_once_claimed(self):
+        jobs.enqueue('test_task', value='done')
+        job = self.run_next()
+        self.assertEqual((job.status, job.attempts), (Job.Status.DONE, 1))
+        self.assertEqual(test_task_calls, ['done'])
+        self.assertIsNone(jobs.claim('test-worker'))
+
+    def test_future_job_waits(self):
+        jobs.enqueue('test_task', run_at=timezone.now() + timedelta(minutes=5), value='later')
+        self.assertIsNone(jobs.claim('test-worker'))
+
+    def test_failed_job_is_retried_with_backoff_then_failed(self):
+        jobs.enqueue('test_task', value='fail')
+        with self.assertLogs('core.utils.jobs', 'ERROR'):
+            job = self.run_next()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertGreaterEqual(job.run_at, timezone.now() + timedelta(seconds=jobs.RETRY_BASE_SECONDS - 1))
+        self.assertIn('Task failed', job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.utils.jobs', 'ERROR'):
+            job = self.run_next()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertLess(jobs.backoff(1), jobs.backoff(3))
+        self.assertLessEqual(jobs.backoff(50), jobs.RETRY_MAX_SECONDS * 1.25)
+
+    def test_keyed_jobs_are_queued_after_commit_and_coalesced(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue('test_task', key='test', value='first')
+            jobs.enqueue('test_task', key='test', value='second')
+            self.assertFalse(Job.objects.exists())
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'value': 'first'}])
+
+    def test_abandoned_job_is_requeued(self):
+        jobs.enqueue('test_task', value='done')
+        jobs.claim('dead-worker')
+        Job.objects.update(locked_at=timezone.now() - timedelta(seconds=jobs.DEFAULT_TIMEOUT + 1))
+        jobs.requeue_abandoned()
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertIn('dead-worker', job.last_error)
+
+    def test_periodic_runs_are_queued_once(self):
+        jobs.schedule_periodic()
+        jobs.schedule_periodic()
+        periodic = Job.objects.filter(periodic=True)
+        self.assertEqual(periodic.count(), len({job.name for job in periodic}))
+        self.assertTrue(periodic.filter(name='repair_daily_stats').exists())
+
+    def test_cron_next_after(self):
+        self.assertEqual(CronSchedule('15 2 * * *').next_after(self.local(2026, 1, 1, 3, 0)), self.local(2026, 1, 2, 2, 15))
+        self.assertEqual(CronSchedule('15 2 * * *').next_after(self.local(2026, 1, 1, 2, 15)), self.local(2026, 1, 2, 2, 15))
+        # Friday evening to Monday morning
+        self.assertEqual(CronSchedule('*/15 7-18 * * 1-5').next_after(self.local(2026, 1, 2, 18, 50)), self.local(2026, 1, 5, 7, 0))
+        self.assertEqual(CronSchedule('* * * * *').next_after(self.local(2026, 1, 1, 0, 0, 30)), self.local(2026, 1, 1, 0, 1))
+        # Both day fields restricted, either one matches: the 1st or a Monday
+        self.assertEqual(CronSchedule('0 0 1 * 1').next_after(self.local(2026, 1, 1, 0, 0)), self.local(2026, 1, 5, 0, 0))
+        self.assertEqual(CronSchedule('0 0 29 2 *').next_after(self.local(2026, 1, 1)), self.local(2028, 2, 29))
+
+    def test_cron_rejects_bad_expressions(self):
+        for expression in ('* * * *', '60 * * * *', '0 0 30 2 *'):
+            with self.subTest(expression=expression), self.assertRaises(ValueError):
+                CronSchedule(expression).next_after(self.local(2026, 1, 1))
+
+
+@override_settings(**TEST_SETTINGS)
+class CheckInEventTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.fx.employee.user.pk))
+        self.now = timezone.now()
+
+    def event(self, booking, action, minutes_ago):
+        return {'id': str(uuid.uuid4()), 'booking': booking.id, 'action': action, 'at': (self.now - timedelta(minutes=minutes_ago)).isoformat()}
+
+    def upload(self, *events):
+        response = self.client.post('/api/booking/check-in-events/', {'events': list(events)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [result['status'] for result in response.json()['results']]
+
+    def test_latest_event_wins_whatever_the_upload_order(self):
+        booking = self.fx.bookings[0]
+        checked_out, checked_in = self.event(booking, 'check_out', 5), self.event(booking, 'check_in', 30)
+        self.assertEqual(self.upload(checked_out, checked_in), ['applied', 'applied'])
+        booking.refresh_from_db()
+        self.assertFalse(booking.checked_in)
+        self.assertEqual(CheckInEvent.objects.filter(booking=booking).count(), 2)
+
+    def test_older_event_than_the_booking_state_is_superseded(self):
+        booking = self.fx.bookings[0]
+        self.assertEqual(self.client.patch(f'/api/booking/{booking.id}/check_in/').status_code, 200)
+        self.assertEqual(self.upload(self.event(booking, 'check_out', 10)), ['superseded'])
+        booking.refresh_from_db()
+        self.assertTrue(booking.checked_in)
+
+    def test_resent_batch_changes_nothing(self):
+        events = [self.event(booking, 'check_in', 10) for booking in self.fx.bookings]
+        self.assertEqual(self.upload(*events), ['applied'] * len(events))
+        stats = list(DaycareDailyStats.objects.values_list('date', 'checked_in'))
+        self.assertEqual(sum(checked_in for _, checked_in in stats), len(events))
+        self.assertEqual(self.upload(*events), ['duplicate'] * len(events))
+        self.assertEqual(list(DaycareDailyStats.objects.values_list('date', 'checked_in')), stats)
+        self.assertEqual(CheckInEvent.objects.count(), len(events))
+
+    def test_event_from_the_future_is_clamped(self):
+        booking = self.fx.bookings[0]
+        self.upload(self.event(booking, 'check_in', -60))
+        booking.refresh_from_db()
+        self.assertLessEqual(booking.check_in_changed_at, timezone.now())
+
+    def test_waitlisted_or_foreign_booking_is_rejected(self):
+        self.assertEqual(self.upload(self.event(self.fx.waitlists[0].booking, 'check_in', 1)), ['rejected'])
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.client.post('/api/booking/check-in-events/', {'events': []}, format='json').status_code, 401,
+        )
+
+
+@override_settings(**TEST_SETTINGS)
+class ProductCapacityTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.product = self.fx.products[0]
+        Product.objects.filter(pk=self.product.pk).update(capacity=1)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.fx.owner.user.pk))
+
+    def book(self, pet, day_offset=0):
+        start, end = self.fx.slot(day_offset)
+        return self.client.post('/api/booking/', {
+            'customer': self.fx.customer.id, 'pet': pet.id, 'daycare': self.fx.daycare.id,
+            'start_time': start, 'end_time': end, 'products': [self.product.id],
+        }, format='json')
+
+    def used(self):
+        return dict(ProductDailyUsage.objects.filter(product=self.product, count__gt=0).values_list('date', 'count'))
+
+    def test_full_product_is_refused(self):
+        self.assertEqual(self.book(self.fx.spare_pet).status_code, 201)
+        response = self.book(self.fx.pets[0])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('products', response.json())
+        self.assertEqual(list(self.used().values()), [1])
+        # The refused booking was rolled back with its reservation
+        self.assertEqual(Booking.objects.filter(pet=self.fx.pets[0], start_time__date=self.fx.tomorrow + timedelta(days=60)).count(), 0)
+
+    def test_cancelling_frees_the_slot(self):
+        booking_id = self.book(self.fx.spare_pet).json()['id']
+        self.assertEqual(self.client.patch(f'/api/booking/{booking_id}/cancel_booking/').status_code, 200)
+        self.assertEqual(self.used(), {})
+        self.assertEqual(self.book(self.fx.pets[0]).status_code, 201)
+
+    def test_update_moves_the_slot(self):
+        booking_id = self.book(self.fx.spare_pet).json()['id']
+        start, end = self.fx.slot(1)
+        response = self.client.patch(f'/api/booking/{booking_id}/', {'start_time': start, 'end_time': end}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(self.used()), [self.fx.tomorrow + timedelta(days=61)])
+
+        response = self.client.patch(f'/api/booking/{booking_id}/', {'is_active': False}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.used(), {})
+
+    def test_update_into_a_full_day_is_refused(self):
+        self.assertEqual(self.book(self.fx.pets[0], day_offset=1).status_code, 201)
+        booking_id = self.book(self.fx.spare_pet).json()['id']
+        start, end = self.fx.slot(1)
+        response = self.client.patch(f'/api/booking/{booking_id}/', {'start_time': start, 'end_time': end}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(self.used().values()), [1, 1])
+
+
+@override_settings(**TEST_SETTINGS)
+class InvoicingTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        Daycare.objects.filter(pk=self.fx.daycare.pk).update(daily_rate=50)
+        self.daycare = Daycare.objects.get(pk=self.fx.daycare.pk)
+        self.product = self.fx.products[0]
+
+    def book(self, customer, pet, start_day, end_day, **fields):
+        booking = Booking.objects.create(
+            customer=customer, pet=pet, daycare=self.daycare,
+            start_time=self.fx._at(start_day, 8), end_time=self.fx._at(end_day, 17), **fields,
+        )
+        booking.products.set([self.product])
+        return booking
+
+    def test_bookings_are_billed_for_every_day_they_span(self):
+        self.book(self.fx.customer, self.fx.pets[0], date(2030, 3, 10), date(2030, 3, 12))
+        self.book(self.fx.customer, self.fx.pets[1], date(2030, 3, 20), date(2030, 3, 20))
+        # Not billed: cancelled, waitlisted, next month
+        self.book(self.fx.customer, self.fx.pets[0], date(2030, 3, 25), date(2030, 3, 25), is_active=False)
+        self.book(self.fx.customer, self.fx.pets[0], date(2030, 3, 26), date(2030, 3, 26), is_waitlist=True)
+        self.book(self.fx.customer, self.fx.pets[0], date(2030, 4, 1), date(2030, 4, 1))
+
+        self.assertEqual(generate_invoices(self.daycare, 2030, 3), (1, 0))
+        invoice = Invoice.objects.get()
+        items = {item.kind: item for item in invoice.line_items.all()}
+        self.assertEqual((items['daycare'].quantity, items['daycare'].amount), (4, Decimal('200.00')))
+        self.assertEqual((items['product'].quantity, items['product'].amount), (2, 2 * self.product.price))
+        self.assertEqual(invoice.total, Decimal('200.00') + 2 * self.product.price)
+
+    def test_rerun_only_invoices_new_customers(self):
+        self.book(self.fx.customer, self.fx.pets[0], date(2030, 3, 10), date(2030, 3, 10))
+        self.assertEqual(generate_invoices(self.daycare, 2030, 3), (1, 0))
+        self.assertEqual(generate_invoices(self.daycare, 2030, 3), (0, 1))
+
+        pet = Pet.objects.create(pet_name='Other', pet_types=[1])
+        pet.customers.add(self.fx.other_customer)
+        self.book(self.fx.other_customer, pet, date(2030, 3, 11), date(2030, 3, 11))
+        self.assertEqual(generate_invoices(self.daycare, 2030, 3), (1, 1))
+        self.assertEqual(Invoice.objects.count(), 2)
+
+    def test_endpoint_validates_the_month(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.fx.owner.user.pk))
+        url = f'/api/daycare/{self.daycare.id}/generate-invoices/'
+        self.assertEqual(client.post(url, {'month': '2030-13'}, format='json').status_code, 400)
+        self.assertEqual(client.post(url, {'month': 'March'}, format='json').status_code, 400)
+        self.assertEqual(client.post(url, {'month': '2030-03'}, format='json').json(), {'created': 0, 'already_invoiced': 0})
+
+
+@override_settings(**TEST_SETTINGS)
+class RollupTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.fx.owner.user.pk))
+
+    def book(self, pet, day_offset=0):
+        start, end = self.fx.slot(day_offset)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/booking/', {
+                'customer': self.fx.customer.id, 'pet': pet.id, 'daycare': self.fx.daycare.id,
+                'start_time': start, 'end_time': end, 'products': [self.fx.products[0].id],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def patch(self, url, data=None, client=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = (client or self.client).patch(url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def settle(self):
+        # active_bookings and peak_occupancy are left to the queued refresh_occupancy jobs
+        while (job := jobs.claim('test-worker')) is not None:
+            jobs.run_job(job)
+
+    def stats(self):
+        # A day a booking moved away from keeps an all zero row, which a rebuild doesn't write
+        rows = DaycareDailyStats.objects.filter(daycare=self.fx.daycare).values(
+            'date', *COUNT_FIELDS, 'active_bookings', 'peak_occupancy', 'product_revenue',
+        )
+        return {row.pop('date'): row for row in rows if any(value for field, value in row.items() if field != 'date')}
+
+    def assert_matches_rebuild(self):
+        self.settle()
+        incremental = self.stats()
+        rebuild_daily_stats([self.fx.daycare.id])
+        self.assertEqual(incremental, self.stats())
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        first = self.book(self.fx.spare_pet)
+        second = self.book(self.fx.pets[1])
+        moved = self.book(self.fx.pets[0], day_offset=1)
+        day = self.fx.tomorrow + timedelta(days=60)
+        self.settle()
+        self.assertEqual((self.stats()[day]['bookings_accepted'], self.stats()[day]['peak_occupancy']), (2, 2))
+
+        self.patch(f'/api/booking/{first}/check_in/')
+        self.patch(f'/api/booking/{second}/cancel_booking/')
+        start, end = self.fx.slot(2)
+        self.patch(f'/api/booking/{moved}/', {'start_time': start, 'end_time': end})
+
+        self.settle()
+        row = self.stats()[day]
+        self.assertEqual(
+            (row['checked_in'], row['bookings_cancelled'], row['active_bookings'], row['peak_occupancy']), (1, 1, 1, 1),
+        )
+        self.assertEqual(row['product_revenue'], self.fx.products[0].price)
+        self.assert_matches_rebuild()
+
+    def test_waitlist_conversion_matches_a_rebuild(self):
+        waitlist = self.fx.waitlists[0]
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.fx.customer.user.pk))
+        self.patch(f'/api/waitlist/{waitlist.id}/accept_booking/', client=client)
+        row = self.stats()[timezone.localdate(waitlist.booking.start_time)]
+        self.assertEqual((row['bookings_waitlisted'], row['waitlist_converted']), (1, 1))
+        self.assert_matches_rebuild()
+
+    def test_peak_overlap_touching_intervals_do_not_overlap(self):
+        at = self.fx._at
+        day = self.fx.tomorrow
+        self.assertEqual(peak_overlap([]), 0)
+        self.assertEqual(peak_overlap([(at(day, 8), at(day, 12)), (at(day, 12), at(day, 17))]), 1)
+        self.assertEqual(peak_overlap([(at(day, 8), at(day, 12)), (at(day, 9), at(day, 10)), (at(day, 11), at(day, 17))]), 2)
+
+    def test_report_reads_the_rollups(self):
+        self.book(self.fx.spare_pet)
+        self.settle()
+        day = (self.fx.tomorrow + timedelta(days=60)).isoformat()
+        url = f'/api/daycare/{self.fx.daycare.id}/report/'
+
+        response = self.client.get(url, {'start': day, 'end': day})
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['totals']['bookings_accepted'], 1)
+        self.assertEqual(report['totals']['occupancy_rate'], 0.01)
+        self.assertEqual(len(report['days']), 1)
+
+        self.assertEqual(self.client.get(url, {'start': 'soon', 'end': day}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': day, 'end': '2000-01-01'}).status_code, 400)
+
+
+@override_settings(**TEST_SETTINGS)
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.zoe = self.customer('zoe', 'Zoë', 'Smith', '+61 400 123 456', pet_name='Biscuit')
+        # Never booked at the staff member's daycare
+        self.stranger = self.customer('zoe-2', 'Zoe', 'Stranger', '0400123999', book=False)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.fx.employee.user.pk))
+
+    def customer(self, username, first_name, last_name, phone, pet_name='Rex', book=True):
+        user = User.objects.create_user(username, password='pw', first_name=first_name, last_name=last_name)
+        customer = CustomerProfile.objects.create(user=user, phone=phone)
+        pet = Pet.objects.create(pet_name=pet_name, pet_types=[1])
+        pet.customers.add(customer)
+        if book:
+            Booking.objects.create(
+                customer=customer, pet=pet, daycare=self.fx.daycare,
+                start_time=self.fx._at(self.fx.tomorrow, 8), end_time=self.fx._at(self.fx.tomorrow, 12),
+            )
+        return customer
+
+    def search(self, q, **params):
+        response = self.client.get('/api/customer-profile/autocomplete/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [customer['id'] for customer in response.json()]
+
+    def test_matches_name_prefixes_either_way_round(self):
+        self.assertEqual(self.search('zo'), [self.zoe.id])
+        self.assertEqual(self.search('ZOE  sm'), [self.zoe.id])
+        self.assertEqual(self.search('smith z'), [self.zoe.id])
+        self.assertEqual(self.search('smithers'), [])
+
+    def test_matches_pet_names_and_phone_numbers(self):
+        self.assertEqual(self.search('bisc'), [self.zoe.id])
+        self.assertEqual(self.search('+61-400 12'), [self.zoe.id])
+        self.assertEqual(self.search('0400123'), [])
+
+    def test_only_customers_booked_at_the_staff_daycares(self):
+        self.assertNotIn(self.stranger.id, self.search('zoe'))
+        Booking.objects.create(
+            customer=self.stranger, pet=self.stranger.pets.get(), daycare=self.fx.daycare,
+            start_time=self.fx._at(self.fx.tomorrow, 8), end_time=self.fx._at(self.fx.tomorrow, 12),
+        )
+        self.assertEqual(self.search('zoe'), [self.zoe.id, self.stranger.id])
+
+    def test_renaming_the_user_updates_the_search(self):
+        user = self.zoe.user
+        user.last_name = 'Jones'
+        user.save()
+        self.assertEqual(self.search('smith'), [])
+        self.assertEqual(self.search('jones'), [self.zoe.id])
+
+    def test_empty_query_and_limits(self):
+        self.assertEqual(self.search('   '), [])
+        self.customer('zoe-3', 'Zoe', 'Third', '0400000003')
+        self.assertEqual(len(self.search('zoe', limit=1)), 1)
+        self.assertEqual(len(self.search('zoe', limit=0)), 1)
+        response = self.client.get('/api/customer-profile/autocomplete/', {'q': 'zoe', 'limit': 'all'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_customers_cannot_search(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.fx.customer.user.pk))
+        self.assertEqual(client.get('/api/customer-profile/autocomplete/', {'q': 'zoe'}).status_code, 403)
+
+
+@override_settings(**TEST_SETTINGS)
+class CustomerImportTests(TestCase):
+    def row(self, username, pets=None, **fields):
+        return {'username': username, 'first_name': 'Jane', 'last_name': 'Smith', 'phone': '0400000000', 'pets': pets or [], **fields}
+
+    def test_creates_customers_and_co_owned_pets_across_chunks(self):
+        rows = [
+            self.row('jane', [{'pet_name': 'Rex', 'pet_types': [1], 'key': 'smith-rex'}, {'pet_name': 'Milo', 'pet_types': ['2']}]),
+            self.row('john', [{'pet_name': 'Rex', 'pet_types': [1], 'key': 'smith-rex'}]),
+            self.row('jill', [{'pet_name': 'Rex', 'pet_types': [1], 'key': 'smith-rex'}]),
+        ]
+        result = import_customers(rows, chunk_size=2)
+        self.assertEqual((result.customers_created, result.pets_created, result.errors), (3, 2, []))
+
+        rex = Pet.objects.get(pet_name='Rex')
+        self.assertEqual(sorted(rex.customers.values_list('user__username', flat=True)), ['jane', 'jill', 'john'])
+        self.assertEqual(Pet.objects.get(pet_name='Milo').pet_types, [2])
+        jane = CustomerProfile.objects.get(user__username='jane')
+        self.assertEqual(jane.search_name, 'jane smith')
+        self.assertFalse(jane.user.has_usable_password())
+
+    def test_usernames_are_unique_ignoring_case(self):
+        User.objects.create_user('Existing', password='pw')
+        result = import_customers([self.row('jane'), self.row('JANE'), self.row('existing')])
+        self.assertEqual(result.customers_created, 1)
+        self.assertEqual(result.errors, [
+            (2, "username appears more than once in the import."),
+            (3, "username existing already exists."),
+        ])
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        rows = [
+            'not a row',
+            self.row('', phone=''),
+            self.row('bad-pets', 'Rex'),
+            self.row('bad-pet', ['Rex', {'pet_name': 'Milo', 'pet_types': [9]}, {'pet_name': 'Tom', 'pet_types': ['cat']}]),
+            self.row('ok'),
+        ]
+        result = import_customers(rows)
+        self.assertEqual(result.customers_created, 1)
+        self.assertEqual(result.errors, [
+            (1, "Row must be an object."),
+            (2, "username is required. phone is required."),
+            (3, "pets must be a list."),
+            (4, "Each pet must be an object. Unknown pet types for Milo: [9]. pet_types for Tom must be pet type IDs."),
+        ])
+        self.assertEqual(list(User.objects.filter(username__in=['bad-pets', 'bad-pet'])), [])
+
+    def test_dry_run_writes_nothing(self):
+        result = import_customers([self.row('jane', [{'pet_name': 'Rex', 'pet_types': [1]}])], dry_run=True)
+        self.assertEqual((result.customers_created, result.pets_created), (1, 1))
+        self.assertFalse(User.objects.filter(username='jane').exists())
+        self.assertFalse(Pet.objects.exists())
+
+    def test_reads_csv_pets_column(self):
+        csv_file = io.StringIO(
+            "username,first_name,last_name,phone,pets\n"
+            "jane,Jane,Smith,0400000000,Rex:1:smith-rex;Milo:2|3\n"
+        )
+        rows = read_rows(csv_file, 'csv')
+        self.assertEqual(rows[0]['pets'], [
+            {'pet_name': 'Rex', 'pet_types': ['1'], 'key': 'smith-rex'},
+            {'pet_name': 'Milo', 'pet_types': ['2', '3'], 'key': None},
+        ])
+        self.assertEqual(import_customers(rows).pets_created, 2)
+        self.assertEqual(Pet.objects.get(pet_name='Milo').pet_types, [2, 3])
+
+
+@override_settings(**TEST_SETTINGS)
+class PetTimelineTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(LARGE)
+        self.pet = self.fx.pets[0]
+        PetNote.objects.create(pet=self.pet, employee=self.fx.employee, note='Staff only', is_private=True)
+        BlacklistedPet.objects.create(pet=self.pet, daycare=self.fx.daycare, reason='Barks')
+
+    def client_for(self, profile):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=profile.user.pk))
+        return client
+
+    def timeline(self, client, **params):
+        return client.get(f'/api/pet/{self.pet.id}/timeline/', params)
+
+    def test_pages_merge_every_source_newest_first(self):
+        client = self.client_for(self.fx.employee)
+        everything = self.timeline(client, page_size=100).json()
+        self.assertIsNone(everything['next'])
+        self.assertEqual({event['type'] for event in everything['results']}, {'booking', 'note', 'ownership', 'blacklist'})
+
+        paged, url = [], f'/api/pet/{self.pet.id}/timeline/?page_size=2'
+        while url:
+            page = client.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            paged += page['results']
+            url = page['next']
+        self.assertEqual(paged, everything['results'])
+        timestamps = [event['timestamp'] for event in paged]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+    def test_owners_do_not_see_private_notes(self):
+        events = self.timeline(self.client_for(self.fx.customer), page_size=100).json()['results']
+        notes = [event['data']['note'] for event in events if event['type'] == 'note']
+        self.assertEqual(len(notes), LARGE)
+        self.assertNotIn('blacklist', {event['type'] for event in events})
+        self.assertNotIn('Staff only', notes)
+
+        self.assertEqual(self.timeline(self.client_for(self.fx.other_customer)).status_code, 403)
+
+    def test_staff_elsewhere_cannot_read_the_timeline(self):
+        other_daycare = Daycare.objects.create(
+            daycare_name='Elsewhere', street_address='2 Pitt St', suburb='Sydney', state='NSW',
+            postcode='2000', phone='0200000001', email='elsewhere@example.com', capacity=10, pet_types=[1],
+        )
+        user = User.objects.create_user('elsewhere', password='pw')
+        staff = StaffProfile.objects.create(user=user, role='E', phone='0400000009')
+        staff.daycares.add(other_daycare)
+
+        response = self.timeline(self.client_for(staff))
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('Staff only', response.content.decode())
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.timeline(self.client_for(self.fx.employee), cursor='nope').status_code, 400)
+
+
+@override_settings(**TEST_SETTINGS)
+class PetNoteTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.pet = self.fx.pets[0]
+        self.walk = self.note('Walked nicely on the lead, then napped.')
+        self.vet = self.note('Vet visit: limping slightly', is_private=True)
+
+        other_daycare = Daycare.objects.create(
+            daycare_name='Elsewhere', street_address='2 Pitt St', suburb='Sydney', state='NSW',
+            postcode='2000', phone='0200000001', email='elsewhere@example.com', capacity=10, pet_types=[1],
+        )
+        self.outsider = StaffProfile.objects.create(
+            user=User.objects.create_user('elsewhere', password='pw'), role='E', phone='0400000009',
+        )
+        self.outsider.daycares.add(other_daycare)
+
+    def note(self, text, is_private=False):
+        return PetNote.objects.create(pet=self.pet, employee=self.fx.employee, note=text, is_private=is_private)
+
+    def client_for(self, profile):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=profile.user.pk))
+        return client
+
+    def note_ids(self, profile, **params):
+        response = self.client_for(profile).get('/api/pet-note/', params)
+        self.assertEqual(response.status_code, 200)
+        return [note['id'] for note in response.json()['results']]
+
+    def test_feed_is_scoped_to_the_reader(self):
+        fixture_notes = [note.id for note in reversed(self.fx.notes)]
+        self.assertEqual(self.note_ids(self.fx.employee), [self.vet.id, self.walk.id, *fixture_notes])
+        self.assertEqual(self.note_ids(self.fx.customer), [self.walk.id, *fixture_notes])
+        self.assertEqual(self.note_ids(self.fx.other_customer), [])
+        self.assertEqual(self.note_ids(self.outsider), [])
+        self.assertEqual(self.note_ids(self.fx.employee, daycare='x'), [])
+
+    def test_cursor_pages_cover_the_feed_once(self):
+        client = self.client_for(self.fx.employee)
+        paged, url = [], '/api/pet-note/?page_size=1'
+        while url:
+            page = client.get(url).json()
+            paged += [note['id'] for note in page['results']]
+            url = page['next']
+        self.assertEqual(paged, self.note_ids(self.fx.employee))
+
+    def test_only_staff_at_the_pet_daycares_write_notes(self):
+        payload = {'pet': self.pet.id, 'employee': self.fx.employee.id, 'note': 'Ate well'}
+        self.assertEqual(self.client_for(self.fx.employee).post('/api/pet-note/', payload, format='json').status_code, 201)
+        self.assertEqual(self.client_for(self.fx.customer).post('/api/pet-note/', payload, format='json').status_code, 403)
+        self.assertEqual(self.client_for(self.outsider).post('/api/pet-note/', payload, format='json').status_code, 403)
+        response = self.client_for(self.fx.customer).patch(f'/api/pet-note/{self.walk.id}/', {'note': 'Mine now'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_search_matches_word_prefixes(self):
+        self.assertEqual(self.note_ids(self.fx.employee, search='walk'), [self.walk.id])
+        self.assertEqual(self.note_ids(self.fx.employee, search='NAPPED walked'), [self.walk.id])
+        self.assertEqual(self.note_ids(self.fx.employee, search='walk limping'), [])
+        self.assertEqual(self.note_ids(self.fx.employee, search='vet'), [self.vet.id])
+        self.assertEqual(self.note_ids(self.fx.customer, search='vet'), [])
+        self.assertEqual(self.note_ids(self.fx.employee, search='?!'), [])
+
+    def test_editing_a_note_reindexes_it(self):
+        response = self.client_for(self.fx.employee).patch(
+            f'/api/pet-note/{self.walk.id}/', {'note': 'Played fetch'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.note_ids(self.fx.employee, search='walk'), [])
+        self.assertEqual(self.note_ids(self.fx.employee, search='fetch'), [self.walk.id])
+        self.assertEqual(sorted(self.walk.terms.values_list('term', flat=True)), ['fetch', 'played'])
+
+        self.walk.delete()
+        self.assertFalse(PetNoteTerm.objects.filter(term='fetch').exists())
+
+    def test_search_reads_the_term_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Checks SQLite's query plan")
+        queryset = search_notes(PetNote.objects.all(), 'walk')
+        with connection.cursor() as cursor:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('petnoteterm_term_idx', plan)
+        self.assertNotIn('SCAN', plan)
+
+
+@override_settings(**TEST_SETTINGS)
+class NearbyDaycareTests(TestCase):
+    def setUp(self):
+        call_command('load_postcodes', stdout=io.StringIO())
+        self.sydney = self.daycare('Sydney', '2000')
+        self.surry_hills = self.daycare('Surry Hills', '2010')
+        self.parramatta = self.daycare('Parramatta', '2150')
+        self.newcastle = self.daycare('Newcastle', '2300')
+        self.daycare('Closed', '2010', is_active=False)
+        self.client = APIClient()
+
+    def daycare(self, name, postcode, **fields):
+        return Daycare.objects.create(
+            daycare_name=name, street_address='1 Main St', suburb=name, state='NSW', postcode=postcode,
+            phone='0200000000', email='daycare@example.com', capacity=10, pet_types=[1], **fields,
+        )
+
+    def nearby(self, **params):
+        return self.client.get('/api/daycare/nearby/', params)
+
+    def test_closest_first_within_the_radius(self):
+        response = self.nearby(postcode='2000', radius_km=5)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        self.assertEqual([daycare['id'] for daycare in results], [self.sydney.id, self.surry_hills.id])
+        self.assertEqual(results[0]['distance_km'], 0)
+        self.assertAlmostEqual(results[1]['distance_km'], 1.8, delta=0.2)
+
+        ids = [daycare['id'] for daycare in self.nearby(postcode='2000', radius_km=25).json()]
+        self.assertEqual(ids, [self.sydney.id, self.surry_hills.id, self.parramatta.id])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.nearby(postcode='9999').status_code, 404)
+        self.assertEqual(self.nearby().status_code, 400)
+        self.assertEqual(self.nearby(postcode='2000', radius_km='far').status_code, 400)
+        self.assertEqual(self.nearby(postcode='2000', radius_km=0).status_code, 400)
+        self.assertEqual(self.nearby(postcode='2000', radius_km=501).status_code, 400)
+
+    def test_haversine_and_bounding_box(self):
+        # Sydney to Melbourne
+        self.assertAlmostEqual(haversine_km(-33.8688, 151.2093, -37.8136, 144.9631), 713.4, delta=1)
+        min_lat, max_lat, min_lng, max_lng = bounding_box(-33.8688, 151.2093, 10)
+        for bearing in range(0, 360, 15):
+            lat = -33.8688 + 10 / 111.32 * math.cos(math.radians(bearing)) * 0.999
+            lng = 151.2093 + 10 / (111.32 * math.cos(math.radians(lat))) * math.sin(math.radians(bearing)) * 0.999
+            self.assertTrue(min_lat <= lat <= max_lat and min_lng <= lng <= max_lng)
+
+    def test_loading_a_postcode_table_refreshes_daycares(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(
+                "POA_CODE,Locality,State,Lat,Long\n"
+                "2000,Sydney,nsw,-33.80,151.20\n"
+                "2000,The Rocks,nsw,-33.90,151.22\n"
+                "2001,PO Boxes,nsw,0,0\n"
+                "abcd,Nowhere,nsw,1,1\n"
+            )
+        self.addCleanup(os.remove, f.name)
+        out = io.StringIO()
+        call_command('load_postcodes', f.name, stdout=out)
+        self.assertIn('Loaded 1 postcodes (2 rows skipped)', out.getvalue())
+
+        centroid = PostcodeCentroid.objects.get(postcode='2000')
+        self.assertEqual((centroid.suburb, centroid.state), ('Sydney', 'NSW'))
+        self.assertAlmostEqual(centroid.latitude, -33.85)
+        self.sydney.refresh_from_db()
+        self.assertAlmostEqual(self.sydney.latitude, -33.85)
+        self.assertAlmostEqual(self.sydney.longitude, 151.21)
+
+
+@override_settings(**TEST_SETTINGS)
+class DaycareDirectoryCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fx = Fixture(SMALL)
+        self.client = APIClient()
+        self.detail_url = f'/api/daycare/{self.fx.daycare.id}/'
+
+    def get(self, url, **headers):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(url, headers=headers)
+
+    def test_one_etag_for_200s_and_304s(self):
+        first = self.get('/api/daycare/')
+        self.assertEqual(first.status_code, 200)
+        etag, last_modified = first['ETag'], first['Last-Modified']
+
+        cached = self.get('/api/daycare/')
+        self.assertEqual((cached['ETag'], cached['Last-Modified']), (etag, last_modified))
+        self.assertEqual(cached.json(), first.json())
+
+        for headers in ({'If-None-Match': etag}, {'If-Modified-Since': last_modified}):
+            response = self.get('/api/daycare/', **headers)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_cached_payload_skips_serializing(self):
+        self.get(self.detail_url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(self.detail_url)
+        self.assertEqual(response.status_code, 200)
+        # The object lookup (object permissions still apply) and the fingerprint aggregate
+        self.assertEqual(len(queries), 2)
+
+    def test_changes_show_up_without_a_version_bump(self):
+        etag = self.get(self.detail_url)['ETag']
+        # e.g another worker's write, this process's cache version never moves
+        Daycare.objects.filter(pk=self.fx.daycare.pk).update(daycare_name='Renamed', updated_at=timezone.now())
+        response = self.get(self.detail_url, **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['daycare_name'], 'Renamed')
+
+    def test_deleting_a_child_row_changes_the_etag(self):
+        etag = self.get(self.detail_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            OpeningHours.objects.filter(daycare=self.fx.daycare, day=7).delete()
+        response = self.get(self.detail_url, **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['opening_hours']), 6)
+
+    def test_staff_are_not_served_the_public_cache(self):
+        self.get(self.detail_url)
+        self.client.force_authenticate(User.objects.get(pk=self.fx.owner.user.pk))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get(self.detail_url).status_code, 200)
+        self.assertGreater(len(queries), 1)
+
+
+@override_settings(**TEST_SETTINGS)
+class OpeningHoursTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.fx.owner.user.pk))
+        self.url = f'/api/daycare/{self.fx.daycare.id}/'
+
+    def hours(self):
+        return {oh.day: oh for oh in OpeningHours.objects.filter(daycare=self.fx.daycare)}
+
+    def payload(self, days):
+        return {'opening_hours': [
+            {'day': day, 'from_hour': '07:00', 'to_hour': '18:00', 'closed': False, 'capacity': 100} for day in days
+        ]}
+
+    def test_only_changed_days_are_written(self):
+        before = self.hours()
+        payload = self.payload(range(1, 7))  # Sunday left out
+        payload['opening_hours'][0].update(from_hour='06:30', capacity=20)
+        response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        after = self.hours()
+        self.assertEqual(sorted(after), [1, 2, 3, 4, 5, 6])
+        # Same rows, only Monday rewritten
+        self.assertEqual({day: oh.id for day, oh in after.items()}, {day: before[day].id for day in after})
+        self.assertEqual((after[1].from_hour, after[1].capacity), (time(6, 30), 20))
+        self.assertGreater(after[1].updated_at, before[1].updated_at)
+        self.assertEqual([after[day].updated_at for day in range(2, 7)], [before[day].updated_at for day in range(2, 7)])
+
+    def test_new_days_are_created(self):
+        OpeningHours.objects.filter(daycare=self.fx.daycare, day__in=[6, 7]).delete()
+        payload = self.payload(range(1, 8))
+        payload['opening_hours'][6].update(from_hour=None, to_hour=None, closed=True, capacity=0)
+        self.assertEqual(self.client.patch(self.url, payload, format='json').status_code, 200)
+        self.assertEqual(sorted(self.hours()), list(range(1, 8)))
+        self.assertTrue(self.hours()[7].closed)
+
+    def test_duplicate_days_are_rejected(self):
+        response = self.client.patch(self.url, self.payload([1, 1]), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('opening_hours', response.json())
+        self.assertEqual(len(self.hours()), 7)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            OpeningHours.objects.create(daycare=self.fx.daycare, day=1, from_hour=time(8), to_hour=time(9))
+
+
+@override_settings(**TEST_SETTINGS)
+class PetTypeCompatibilityTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.fx.owner.user.pk))
+
+    def daycare(self, name, pet_types):
+        return Daycare.objects.create(
+            daycare_name=name, street_address='1 Main St', suburb='Sydney', state='NSW', postcode='2000',
+            phone='0200000000', email='daycare@example.com', capacity=10, pet_types=pet_types,
+        )
+
+    def book(self, pet_types, day_offset=0):
+        Pet.objects.filter(pk=self.fx.spare_pet.pk).update(pet_types=pet_types, pet_types_mask=pet_types_to_mask(pet_types))
+        start, end = self.fx.slot(day_offset)
+        return self.client.post('/api/booking/', {**booking_payload(self.fx), 'start_time': start, 'end_time': end}, format='json')
+
+    def test_masks(self):
+        self.assertEqual(pet_types_to_mask([1, 3]), 0b101)
+        self.assertEqual(pet_types_to_mask(2), 0b10)
+        self.assertEqual(pet_types_to_mask([1, 99]), 0b1)
+        self.assertEqual(masks_including(ALL_PET_TYPES_MASK), [ALL_PET_TYPES_MASK])
+        self.assertTrue(all(mask & 0b10 for mask in masks_including(0b10)))
+        self.assertEqual(len(masks_including(0b10)), 2 ** (len(PET_TYPES) - 1))
+
+        pet = self.fx.spare_pet
+        pet.pet_types = [2, 5]
+        pet.save()
+        pet.refresh_from_db()
+        self.assertEqual(pet.pet_types_mask, 0b10010)
+
+    def test_bookings_need_every_pet_type_accepted(self):
+        # The daycare takes dogs and cats
+        self.assertEqual(self.book([1, 2]).status_code, 201)
+        response = self.book([1, 3])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['pet'], ["This daycare does not accept this type of pet."])
+        # No pet types on either side means no restriction
+        self.assertEqual(self.book([], day_offset=1).status_code, 201)
+        Daycare.objects.filter(pk=self.fx.daycare.pk).update(pet_types=[], pet_types_mask=0)
+        self.assertEqual(self.book([3], day_offset=2).status_code, 201)
+
+    def test_directory_filters_by_pet_type(self):
+        dogs_only = self.daycare('Dogs only', [1])
+        anything = self.daycare('Anything', [])
+        client = APIClient()
+
+        ids = {daycare['id'] for daycare in client.get('/api/daycare/', {'pet_type': 2}).json()}
+        self.assertEqual(ids, {self.fx.daycare.id, anything.id})
+        ids = {daycare['id'] for daycare in client.get('/api/daycare/', {'pet_type': 1}).json()}
+        self.assertEqual(ids, {self.fx.daycare.id, anything.id, dogs_only.id})
+        self.assertEqual(client.get('/api/daycare/', {'pet_type': 'dog'}).json(), [])
+
+
+@override_settings(**TEST_SETTINGS)
+class CustomerDirectoryTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.booked = [self.fx.customer]
+        for i, name in enumerate(['Yara', 'Abe', 'Mia', 'Abe']):
+            user = User.objects.create_user(f'directory-{i}', password='pw', first_name=name, last_name='Booked')
+            customer = CustomerProfile.objects.create(user=user, phone='0400000000')
+            pet = Pet.objects.create(pet_name=f'{name} pet', pet_types=[1])
+            pet.customers.add(customer)
+            Booking.objects.create(
+                customer=customer, pet=pet, daycare=self.fx.daycare,
+                start_time=self.fx._at(self.fx.tomorrow, 8), end_time=self.fx._at(self.fx.tomorrow, 12),
+            )
+            self.booked.append(customer)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.fx.employee.user.pk))
+
+    def expected_order(self):
+        return [customer.id for customer in sorted(self.booked, key=lambda customer: (customer.search_name, customer.id))]
+
+    def test_pages_through_booked_customers_by_name(self):
+        ids, url = [], '/api/customer-profile/?page_size=2'
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            ids += [customer['id'] for customer in page['results']]
+            url = page['next']
+        # Customers who never booked here (co-owners, other_customer) aren't listed
+        self.assertEqual(ids, self.expected_order())
+
+    def test_rows_carry_pets_and_co_owners_but_no_tokens(self):
+        results = self.client.get('/api/customer-profile/', {'page_size': 50}).json()['results']
+        row = next(customer for customer in results if customer['id'] == self.fx.customer.id)
+        self.assertEqual(set(row), {'id', 'user', 'phone', 'pets', 'is_active'})
+        self.assertNotIn('token', json.dumps(row))
+        self.assertEqual(len(row['pets']), len(self.fx.customer.pets.all()))
+
+    def test_page_size_does_not_change_the_query_count(self):
+        self.client.get('/api/customer-profile/')  # Loads the staff profile onto the authenticated user
+        counts = []
+        for page_size in (1, 5):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get('/api/customer-profile/', {'page_size': page_size}).status_code, 200)
+            counts.append(len(queries))
+        # Fingerprint, page, pets, pet co-owners
+        self.assertEqual(counts, [4, 4])
+
+    def test_customers_only_list_themselves(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.fx.customer.user.pk))
+        self.assertEqual([customer['id'] for customer in client.get('/api/customer-profile/').json()], [self.fx.customer.id])
+
+
+@override_settings(**TEST_SETTINGS)
+class PetListingTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.secret = Pet.objects.create(pet_name='Secret', pet_types=[2], is_public=False)
+        self.secret.customers.add(self.fx.customer)
+        Pet.objects.create(pet_name='Retired', pet_types=[1], is_active=False)
+
+    def client_for(self, profile):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=profile.user.pk))
+        return client
+
+    def pets(self, client, **params):
+        response = client.get('/api/pet/', {'page_size': 100, **params})
+        self.assertEqual(response.status_code, 200)
+        return {pet['id']: pet for pet in response.json()['results']}
+
+    def test_private_pets_are_restricted_to_their_owners(self):
+        self.assertIn('customers', self.pets(self.client_for(self.fx.customer))[self.secret.id])
+        for profile in (self.fx.other_customer, self.fx.employee):
+            self.assertEqual(
+                set(self.pets(self.client_for(profile))[self.secret.id]), {'id', 'pet_name', 'pet_bio', 'is_public', 'is_active'},
+            )
+        self.assertIn('customers', self.pets(self.client_for(self.fx.other_customer))[self.fx.pets[0].id])
+
+    def test_filters(self):
+        client = self.client_for(self.fx.employee)
+        active = Pet.objects.filter(is_active=True)
+        self.assertEqual(set(self.pets(client)), set(active.values_list('id', flat=True)))
+        self.assertEqual(
+            set(self.pets(client, owner=self.fx.customer.id)), {*(pet.id for pet in self.fx.pets), self.fx.spare_pet.id, self.secret.id},
+        )
+        self.assertEqual(set(self.pets(client, daycare=self.fx.daycare.id)), {pet.id for pet in self.fx.pets})
+        self.assertEqual(set(self.pets(client, pet_type=2)), {self.secret.id})
+        self.assertEqual(self.pets(client, owner='me'), {})
+
+    def test_pages_are_ordered_by_name_in_constant_queries(self):
+        client = self.client_for(self.fx.customer)
+        self.pets(client)  # Loads the customer profile onto the authenticated user
+        names, url, counts = [], '/api/pet/?page_size=3', []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                page = client.get(url).json()
+            counts.append(len(queries))
+            names += [pet['pet_name'] for pet in page['results']]
+            url = page['next']
+        self.assertEqual(names, sorted(Pet.objects.filter(is_active=True).values_list('pet_name', flat=True), key=str.lower))
+        self.assertEqual(len(set(counts)), 1)
+
+
+def image_upload(name='photo.png', size=(600, 400), color='orange', image_format='PNG'):
+    content = io.BytesIO()
+    Image.new('RGB', size, color).save(content, image_format)
+    return SimpleUploadedFile(name, content.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+@override_settings(**TEST_SETTINGS, PET_PHOTO_ASYNC_THUMBNAILS=False)
+class PetPhotoTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.fx = Fixture(SMALL)
+        self.pet = self.fx.pets[0]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.fx.customer.user.pk))
+
+    def upload(self, pet=None, photo=None, client=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return (client or self.client).post(
+                f'/api/pet/{(pet or self.pet).id}/photos/', {'photo': photo or image_upload()}, format='multipart',
+            )
+
+    def test_upload_renders_thumbnails_after_commit(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 201)
+        photo = PetPhoto.objects.get(id=response.json()['id'])
+        self.assertEqual(photo.status, PetPhoto.Status.READY)
+        self.assertEqual(set(photo.thumbnails), {'small', 'medium', 'large'})
+        with Image.open(default_storage.path(photo.thumbnails['small'])) as thumbnail:
+            self.assertEqual(thumbnail.size, (128, 85))
+        with Image.open(default_storage.path(photo.thumbnails['large'])) as thumbnail:
+            self.assertEqual(thumbnail.size, (600, 400))  # Never upscaled
+
+        listed = self.client.get(f'/api/pet/{self.pet.id}/photos/').json()
+        self.assertEqual([photo['id'] for photo in listed], [photo.id])
+
+    def test_same_image_is_stored_once(self):
+        first = self.upload().json()['id']
+        again = self.upload()
+        self.assertEqual((again.status_code, again.json()['id']), (200, first))
+
+        # Another pet with the same picture reuses the file and the finished thumbnails
+        with mock.patch('core.utils.pet_photos.render_thumbnails') as render:
+            response = self.upload(pet=self.fx.pets[1])
+        self.assertEqual(response.status_code, 201)
+        render.assert_not_called()
+        twin, original = PetPhoto.objects.get(id=response.json()['id']), PetPhoto.objects.get(id=first)
+        self.assertEqual((twin.original.name, twin.thumbnails, twin.status), (original.original.name, original.thumbnails, 'ready'))
+
+    def test_reuploading_a_removed_photo_restores_it(self):
+        photo = PetPhoto.objects.get(id=self.upload().json()['id'])
+        PetPhoto.objects.filter(id=photo.id).update(is_active=False)
+        self.assertEqual(self.upload().status_code, 200)
+        restored = PetPhoto.objects.get(id=photo.id)
+        self.assertTrue(restored.is_active)
+        self.assertGreater(restored.updated_at, photo.updated_at)
+
+    def test_rejected_uploads(self):
+        not_an_image = SimpleUploadedFile('photo.png', b'not an image', content_type='image/png')
+        self.assertEqual(self.upload(photo=not_an_image).json(), {'error': 'Upload is not a supported image.'})
+        gif = image_upload('photo.gif', image_format='GIF')
+        self.assertEqual(self.upload(photo=gif).json(), {'error': 'Photos must be JPEG, PNG or WEBP.'})
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            self.assertEqual(self.upload().json(), {'error': 'Photo dimensions are too large.'})
+        response = self.client.post(f'/api/pet/{self.pet.id}/photos/', {}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+        other = APIClient()
+        other.force_authenticate(User.objects.get(pk=self.fx.other_customer.user.pk))
+        self.assertEqual(self.upload(client=other).status_code, 403)
+        self.assertFalse(PetPhoto.objects.exists())
+
+    def test_failed_rendering_is_recorded(self):
+        with mock.patch('core.utils.pet_photos.render_thumbnails', side_effect=OSError('disk full')), \
+                self.assertLogs('core.utils.pet_photos', 'ERROR'):
+            response = self.upload()
+        self.assertEqual(PetPhoto.objects.get(id=response.json()['id']).status, PetPhoto.Status.FAILED)
+
+
+@override_settings(**TEST_SETTINGS)
+class SqlInstrumentationTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.factory = RequestFactory()
+
+    def n_plus_one(self, request):
+        for pet in Pet.objects.all():
+            Pet.objects.get(pk=pet.pk)
+        return HttpResponse('ok')
+
+    def test_query_shape_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM core_pet WHERE id = 12 AND pet_name = 'Rex''s'"),
+            'SELECT * FROM core_pet WHERE id = ? AND pet_name = ?',
+        )
+        self.assertEqual(query_shape('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'), 'SELECT ? FROM t WHERE id IN (...)')
+        self.assertEqual(query_shape('SAVEPOINT "s123_x1"'), query_shape('SAVEPOINT "s456_x2"'))
+
+    def test_recorder_counts_repeated_shapes(self):
+        pets = Pet.objects.count()
+        with QueryRecorder() as recorder:
+            self.n_plus_one(None)
+        self.assertEqual(recorder.query_count, pets + 1)
+        self.assertGreaterEqual(recorder.total_ms, 0)
+        [(shape, count)] = recorder.top_shapes(3)
+        self.assertEqual(count, pets)
+        self.assertEqual(recorder.repeated_over(pets - 1), [(shape, count)])
+        self.assertEqual(recorder.repeated_over(pets), [])
+
+    @override_settings(SQL_SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.fx.employee.user.pk))
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/pet/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="(\d+) queries", app;dur=-?[\d.]+$')
+        self.assertIn(f'"{len(queries)} queries"', response['Server-Timing'])
+
+        with override_settings(SQL_SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', client.get('/api/pet/'))
+
+    def test_repeated_queries_are_logged_or_raised(self):
+        middleware = QueryInstrumentationMiddleware(self.n_plus_one)
+        request = self.factory.get('/api/pet/')
+        with override_settings(SQL_REPEATED_QUERY_LIMIT=Pet.objects.count()):
+            with self.assertNoLogs('core.sql'):
+                middleware(request)
+        with override_settings(SQL_REPEATED_QUERY_LIMIT=1):
+            with self.assertLogs('core.sql', 'WARNING') as logs:
+                self.assertEqual(middleware(request).status_code, 200)
+            record = json.loads(logs.records[0].getMessage())
+            self.assertEqual(record['path'], '/api/pet/')
+            self.assertEqual(record['query_count'], Pet.objects.count() + 1)
+            self.assertEqual(record['top_repeated'][0]['count'], Pet.objects.count())
+            with override_settings(SQL_RAISE_ON_REPEATED_QUERIES=True):
+                with self.assertRaisesRegex(RepeatedQueryError, r'GET /api/pet/ ran the same query \d+ times \(limit 1\)'):
+                    middleware(request)
+
+
+class FakeTransport:
+    """Answers every request without touching the database, alternating a 200 and a 404."""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, path, token=None, payload=None):
+        with self._lock:
+            self.calls.append((method, path, token, payload))
+            n = len(self.calls)
+        return (200 if n % 2 else 404), f'db;dur=1.0;desc="{n % 2 + 2} queries", app;dur=2.0'
+
+
+@override_settings(**TEST_SETTINGS)
+class BenchmarkTests(TestCase):
+    def test_percentile_and_baseline_comparison(self):
+        latencies = list(range(1, 101))
+        self.assertEqual([percentile(latencies, pct) for pct in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(
+            compare_results({'login': {'p95_ms': 10.0}, 'gone': {'p95_ms': 1.0}}, {'login': {'p95_ms': 12.5}, 'new': {'p95_ms': 3.0}}),
+            {'login': (10.0, 12.5, 25.0)},
+        )
+
+    def test_run_scenario_stats(self):
+        transport = FakeTransport()
+        scenario = Scenario('login', 'POST', lambda context, n: f'/api/thing/{n}/', payload=lambda context, n: {'n': n})
+        stats = run_scenario(scenario, None, transport, 10, 4)
+        self.assertEqual(sorted(call[1] for call in transport.calls), sorted(f'/api/thing/{n}/' for n in range(10)))
+        self.assertEqual({call[3]['n'] for call in transport.calls}, set(range(10)))
+        self.assertEqual(stats['requests'], 10)
+        self.assertEqual(stats['errors'], 5)
+        self.assertEqual(stats['queries_per_request'], 2.5)
+        self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+        self.assertLessEqual(stats['p95_ms'], stats['p99_ms'])
+        self.assertLessEqual(stats['p99_ms'], stats['max_ms'])
+
+        results = run_benchmark(None, FakeTransport(), 4, 2, [scenario], warmup=2)
+        self.assertEqual(list(results), ['login'])
+        self.assertEqual(results['login']['requests'], 4)
+
+    def test_booking_scenario_creates_bookings_on_the_seeded_data(self):
+        seed_dataset(SeedConfig(daycares=1, staff_per_daycare=2, customers_per_daycare=3, years=0.05, bookings_per_pet_per_month=2))
+        context = build_context()
+        self.assertEqual(context.daycare, Daycare.objects.get().id)
+        booking_create = next(scenario for scenario in SCENARIOS if scenario.name == 'booking_create')
+        client = APIClient()
+        slots = set()
+        for n in range(len(context.pets) + 2):
+            payload = booking_create.payload(context, n)
+            slots.add((payload['pet'], payload['start_time']))
+            response = client.post('/api/booking/', payload, format='json', HTTP_AUTHORIZATION=f'Token {context.owner}')
+            self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(slots), len(context.pets) + 2)
+        response = client.get('/api/booking/', HTTP_AUTHORIZATION=f'Token {context.staff}')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(**TEST_SETTINGS)
+class SeedDataTests(TestCase):
+    OPTIONS = {'daycares': 2, 'staff': 3, 'customers': 8, 'years': 0.1, 'bookings_per_month': 6, 'capacity': 3}
+
+    def seed(self, **options):
+        out = io.StringIO()
+        call_command('seed_daycare_data', stdout=out, **{**self.OPTIONS, **options})
+        return out.getvalue()
+
+    def snapshot(self):
+        return (
+            list(Pet.objects.order_by('id').values_list('pet_name', 'pet_types', 'customers__user__username')),
+            list(Booking.objects.order_by('id').values_list('pet__pet_name', 'start_time', 'end_time', 'status', 'is_active')),
+        )
+
+    def test_rows_are_coherent(self):
+        output = self.seed()
+        self.assertIn(f"{Booking.objects.count()} bookings", output)
+        self.assertEqual(Daycare.objects.count(), 2)
+        self.assertEqual(OpeningHours.objects.count(), 14)
+        self.assertEqual(StaffProfile.objects.filter(role='O').count(), 2)
+        self.assertTrue(self.client.login(username='customer-1-0', password=DEFAULT_PASSWORD))
+
+        for pet in Pet.objects.all():
+            self.assertEqual(pet.pet_types_mask, pet_types_to_mask(pet.pet_types))
+            self.assertEqual(pet.search_name, pet.pet_name.lower())
+        for customer in CustomerProfile.objects.select_related('user'):
+            expected = customer_search_fields(customer.user, customer.phone)
+            self.assertEqual({attr: getattr(customer, attr) for attr in expected}, expected)
+        self.assertTrue(Pet.customers.through.objects.values('pet').annotate(owners=Count('id')).filter(owners=2).exists())
+
+        bookings = Booking.objects.select_related('daycare').prefetch_related('pet__customers')
+        per_pet_day = Counter()
+        for booking in bookings:
+            start, end = timezone.localtime(booking.start_time), timezone.localtime(booking.end_time)
+            self.assertNotEqual(start.isoweekday(), 7)
+            self.assertTrue(7 <= start.hour < end.hour <= 18)
+            self.assertIn(booking.customer_id, {customer.id for customer in booking.pet.customers.all()})
+            per_pet_day[booking.pet_id, start.date()] += 1
+        self.assertEqual(set(per_pet_day.values()), {1})
+
+        waitlisted = Booking.objects.filter(is_waitlist=True)
+        self.assertTrue(waitlisted.exists())
+        self.assertEqual(set(Waitlist.objects.values_list('booking', flat=True)), set(waitlisted.values_list('id', flat=True)))
+        for daycare in Daycare.objects.all():
+            accepted = Counter(
+                timezone.localtime(start).date()
+                for start in daycare.booking_set.filter(is_waitlist=False).values_list('start_time', flat=True)
+            )
+            self.assertLessEqual(max(accepted.values()), daycare.capacity)
+
+        stats = list(DaycareDailyStats.objects.order_by('daycare', 'date').values())
+        self.assertTrue(stats)
+        rebuild_daily_stats(list(Daycare.objects.values_list('id', flat=True)))
+        self.assertEqual([{**row, 'id': None} for row in stats],
+                         [{**row, 'id': None} for row in DaycareDailyStats.objects.order_by('daycare', 'date').values()])
+
+    def test_same_seed_same_rows(self):
+        runs = []
+        for _ in range(2):
+            with transaction.atomic():
+                self.seed(daycares=1)
+                runs.append(self.snapshot())
+                transaction.set_rollback(True)
+        self.assertEqual(runs[0], runs[1])
+        with transaction.atomic():
+            self.seed(daycares=1, seed=1)
+            self.assertNotEqual(self.snapshot(), runs[0])
+            transaction.set_rollback(True)
+
+    def test_runs_carry_on_numbering(self):
+        self.seed(daycares=1)
+        self.seed(daycares=1)
+        self.assertEqual(set(User.objects.filter(username__startswith='owner-').values_list('username', flat=True)), {'owner-0', 'owner-1'})
+        with self.assertRaisesMessage(CommandError, 'Daycare 0 has already been seeded'):
+            self.seed(daycares=1, first_index=0)
+
+
+@override_settings(**TEST_SETTINGS)
+class FastJSONTests(TestCase):
+    PAYLOAD = {
+        'when': datetime(2030, 3, 4, 9, 30, 15, 123456, tzinfo=timezone.get_fixed_timezone(600)),
+        'day': date(2030, 3, 4), 'at': time(9, 30), 'length': timedelta(hours=3),
+        'price': Decimal('55.10'), 'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'nested': [{'name': 'Rëx\u2028\u2029', 'ok': True, 'none': None, 'ratio': 0.25}],
+    }
+
+    def assert_same_as_drf(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_renders_exactly_like_drf(self):
+        self.assert_same_as_drf(self.PAYLOAD)
+        # Everything orjson would write differently is handed to the stdlib renderer
+        for data in ({'big': 1e16, 'small': 1e-7}, {1: 'int key'}, {'huge': 2 ** 70}, [], None):
+            with self.subTest(data=data):
+                self.assert_same_as_drf(data)
+        self.assertEqual(FastJSONRenderer().render({'x': math.nan}), b'{"x":null}')
+        with mock.patch.object(fast_json, 'orjson', None):
+            self.assert_same_as_drf(self.PAYLOAD)
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'x': math.nan})
+
+    def test_parses_exactly_like_drf(self):
+        bodies = [
+            JSONRenderer().render(self.PAYLOAD), b'{"long": 12345678901234567890123, "exp": 1e-07}', b'[1, 2.5, "\\u00e9"]',
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(bodies[1]))['long'], 12345678901234567890123)
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"broken": '))
+
+    def test_api_payloads_are_identical(self):
+        fx = Fixture(SMALL)
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=fx.owner.user.pk))
+        for path in ('/api/booking/', '/api/daycare/'):
+            with self.subTest(path=path):
+                response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertIs(type(response.accepted_renderer), JSONRenderer)  # FAST_JSON is off by default
+                self.assertTrue(compare_json_codecs(response.data, repeat=1)['identical'])
+
+
+@override_settings(**TEST_SETTINGS)
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.fx.owner.user.pk))
+        self.client.get('/api/booking/')  # Loads the staff profile onto the authenticated user
+
+    def get(self, path, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), [query['sql'] for query in queries.captured_queries]
+
+    def test_parse_paths(self):
+        self.assertEqual(parse_paths('a, b.c,b.d,,e.'), {'a': None, 'b': {'c': None, 'd': None}, 'e': None})
+        self.assertEqual(parse_paths('a,a.b'), {'a': None})
+        fieldset = Fieldset(parse_paths('id,booking.pet_details'), parse_paths('booking.pet_details.id'))
+        self.assertTrue(fieldset.keeps_path('booking.pet_details.pet_name'))
+        self.assertFalse(fieldset.keeps_path('booking.pet_details.id'))
+        self.assertFalse(fieldset.keeps_path('booking.customer_details'))
+        self.assertTrue(Fieldset().is_everything())
+
+    def test_fields_and_omit_trim_nested_payloads(self):
+        bookings, _ = self.get('/api/booking/', fields='id,pet_details.pet_name,nope')
+        self.assertTrue(bookings)
+        for booking in bookings:
+            self.assertEqual(set(booking), {'id', 'pet_details'})
+            self.assertEqual(set(booking['pet_details']), {'pet_name'})
+
+        full, _ = self.get('/api/booking/')
+        with mock.patch.object(CustomerBasicProfileSerializer, 'get_full_name') as get_full_name:
+            omitted, _ = self.get('/api/booking/', omit='products,customer_details.full_name,nope')
+        get_full_name.assert_not_called()
+        for before, after in zip(full, omitted):
+            self.assertEqual(set(before) - set(after), {'products'})
+            self.assertEqual(after['customer_details'], {'id': before['customer_details']['id'], 'user': before['customer_details']['user']})
+
+        [daycare], _ = self.get('/api/daycare/', fields='id,staff.user.username', omit='staff.id')
+        self.assertEqual(set(daycare), {'id', 'staff'})
+        self.assertEqual(
+            sorted(member['user']['username'] for member in daycare['staff']),
+            sorted(StaffProfile.objects.filter(daycares=self.fx.daycare).values_list('user__username', flat=True)),
+        )
+        self.assertTrue(all(set(member) == {'user'} and set(member['user']) == {'username'} for member in daycare['staff']))
+
+    def test_omitted_relations_are_not_loaded(self):
+        _, full = self.get('/api/booking/')
+        _, trimmed = self.get('/api/booking/', fields='id,start_time')
+        self.assertEqual(len(trimmed), len(full) - 1)  # No products prefetch
+        main = next(sql for sql in trimmed if 'FROM "core_booking"' in sql and 'MAX(' not in sql)
+        self.assertNotIn('"auth_user"', main)
+        self.assertNotIn('"core_pet"', main)
+
+        # The fingerprint aggregate joins every related table whatever is rendered, see ConditionalGetMixin
+        full = [sql for sql in self.get('/api/daycare/')[1] if 'MAX(' not in sql]
+        trimmed = [sql for sql in self.get('/api/daycare/', omit='staff,products,opening_hours')[1] if 'MAX(' not in sql]
+        for table in ('core_openinghours', 'core_product', 'core_staffprofile'):
+            self.assertTrue(any(f'"{table}"' in sql for sql in full))
+            self.assertFalse(any(f'"{table}"' in sql for sql in trimmed), table)
+
+    def test_writes_see_every_field(self):
+        start, end = self.fx.slot(0)
+        response = self.client.post('/api/booking/?fields=id', {
+            'customer': self.fx.customer.id, 'pet': self.fx.spare_pet.id, 'daycare': self.fx.daycare.id,
+            'start_time': start, 'end_time': end, 'products': [self.fx.products[0].id],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(set(response.json()), {'id'})
+        booking = Booking.objects.get(pk=response.json()['id'])
+        self.assertEqual((booking.pet, list(booking.products.all())), (self.fx.spare_pet, [self.fx.products[0]]))
+
+
+@override_settings(**TEST_SETTINGS)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.fx = Fixture(SMALL)
+        cache.clear()
+        self.client = self.client_for(self.fx.employee)
+        self.url = f'/api/booking/?daycare={self.fx.daycare.id}'
+        self.client.get(self.url)  # Loads the staff profile onto the authenticated user
+
+    def client_for(self, profile):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=profile.user.pk))
+        return client
+
+    def get(self, url=None, client=None, **headers):
+        return (client or self.client).get(url or self.url, headers=headers)
+
+    def test_unchanged_list_is_a_304_from_one_query(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Authorization', response['Vary'])
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = self.get(**{'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.get(**{'If-Modified-Since': last_modified}).status_code, 304)
+        self.assertEqual(self.get(**{'If-None-Match': '"stale"'}).status_code, 200)
+
+        # Another user, another page or another fieldset never shares an ETag
+        self.assertNotEqual(self.get(client=self.client_for(self.fx.owner))['ETag'], etag)
+        self.assertNotEqual(self.get(f'{self.url}&fields=id')['ETag'], etag)
+
+    def test_changes_move_the_etag(self):
+        etag = self.get()['ETag']
+        changes = [
+            lambda: Booking.objects.get(pk=self.fx.bookings[0].pk).save(),
+            lambda: Pet.objects.get(pk=self.fx.bookings[0].pet_id).save(),  # Rendered in pet_details
+            lambda: Booking.objects.filter(pk=self.fx.bookings[1].pk).update(is_active=False),  # Leaves the list
+        ]
+        for change in changes:
+            change()
+            response = self.get(**{'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+
+    def test_detail_and_m2m_changes(self):
+        pet = self.fx.pets[0]
+        client = self.client_for(self.fx.customer)
+        url = f'/api/pet/{pet.id}/'
+        etag = self.get(url, client)['ETag']
+        self.assertEqual(self.get(url, client, **{'If-None-Match': etag}).status_code, 304)
+
+        # A new co-owner is an m2m change, the signal touches the pet so its ETag still moves
+        pet.customers.add(self.fx.other_customer)
+        response = self.get(url, client, **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.fx.other_customer.id, [owner['id'] for owner in response.json()['customers']])
+
+        before = Pet.objects.get(pk=pet.pk).updated_at
+        touch(Pet.objects.filter(pk=pet.pk))
+        self.assertGreater(Pet.objects.get(pk=pet.pk).updated_at, before)
+
+    def test_fingerprint_and_first_seen(self):
+        queryset = Booking.objects.filter(daycare=self.fx.daycare)
+        latest, row_count = queryset_fingerprint(queryset)
+        self.assertEqual((latest, row_count), (max(booking.updated_at for booking in queryset), queryset.count()))
+        self.assertEqual(queryset_fingerprint(Booking.objects.none()), (None, 0))
+        seen = first_seen('"etag"')
+        self.assertEqual(first_seen('"etag"'), seen)
+        later = seen + timedelta(hours=1)
+        self.assertEqual(first_seen('"etag"', later), later)
@@ -0,0 +1,267 @@
+"""
+Endpoint latency benchmarks, driven by `manage.py benchmark_endpoints`.
+
+Each scenario is fired `requests` times from a thread pool, either through the Django test client
+(in process) or over HTTP at a server. Query counts come from the Server-Timing header written by
+QueryInstrumentationMiddleware, so they are measured the same way for both transports.
+
+Results are plain dicts so they can be dumped to JSON and compared with compare_results().
+
+compare_json_codecs() times DRF's JSON renderer/parser against core.fast_json on one payload,
+for `manage.py benchmark_json`.
+"""
+import io
+import json
+import math
+import re
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import count
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connection
+from django.test import Client
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from django.utils import timezone
+
+from ..fast_json import FastJSONParser, FastJSONRenderer
+from ..models import Daycare, Pet
+from .seed_data import DEFAULT_PASSWORD, OPEN_FROM
+
+_QUERY_COUNT = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+@contextmanager
+def throwaway_database():
+    """A freshly created test database for the duration of the block, the real one is never touched."""
+    with tempfile.TemporaryDirectory() as tmp:
+        if connection.vendor == 'sqlite':
+            # A file rather than in-memory, so the worker threads each get a working connection
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = str(Path(tmp) / 'benchmark.sqlite3')
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+class Scenario:
+    def __init__(self, name, method, path, user=None, payload=None):
+        """
+        path and payload are callables taking the BenchmarkContext and the request number,
+        user is the context attribute holding the token to send ('owner', 'customer', ...) or None.
+        """
+        self.name = name
+        self.method = method
+        self.path = path
+        self.user = user
+        self.payload = payload
+
+
+class BenchmarkContext:
+    """Ids and tokens scenarios build their requests from, taken from daycare 0 of the seeded data."""
+
+    def __init__(self, daycare, owner_token, staff_token, customer_token, customer_username, pets):
+        self.daycare = daycare
+        self.owner = owner_token
+        self.staff = staff_token
+        self.customer = customer_token
+        self.customer_username = customer_username
+        self.pets = pets  # [(pet id, customer id)] of the daycare's pets
+        # POST /booking/ walks forward through open days past the seeded range so bookings never overlap
+        start = timezone.localdate() + timedelta(days=400)
+        self.first_free_monday = start + timedelta(days=(8 - start.isoweekday()) % 7)
+        self._booking_counter = count()
+        self._lock = threading.Lock()
+
+    def next_booking_slot(self):
+        with self._lock:
+            n = next(self._booking_counter)
+        pet_id, customer_id = self.pets[n % len(self.pets)]
+        open_day = n // len(self.pets)
+        # Six open days a week, Sundays are closed
+        day = self.first_free_monday + timedelta(days=open_day // 6 * 7 + open_day % 6)
+        return pet_id, customer_id, day
+
+
+def build_context():
+    """Context for daycare 0 of seed_dataset(), needs at least one employee and one customer."""
+    daycare = Daycare.objects.order_by('id').first()
+    tokens = {}
+    for name, username in (('owner', 'owner-0'), ('staff', 'staff-0-1'), ('customer', 'customer-0-0')):
+        tokens[name], _ = Token.objects.get_or_create(user=User.objects.get(username=username))
+    # One owner per pet, a co-owned pet showing up twice would double book itself
+    pets = dict(
+        Pet.customers.through.objects
+        .filter(customerprofile__user__username__startswith='customer-0-')
+        .order_by('-customerprofile_id')
+        .values_list('pet_id', 'customerprofile_id')
+    )
+    return BenchmarkContext(
+        daycare.id, tokens['owner'].key, tokens['staff'].key, tokens['customer'].key, 'customer-0-0', list(pets.items()),
+    )
+
+
+def _new_booking(context, n):
+    pet_id, customer_id, day = context.next_booking_slot()
+    return {
+        'pet': pet_id,
+        'customer': customer_id,
+        'daycare': context.daycare,
+        'start_time': f'{day.isoformat()}T{OPEN_FROM + 1:02d}:00:00Z',
+        'end_time': f'{day.isoformat()}T{OPEN_FROM + 5:02d}:00:00Z',
+    }
+
+
+SCENARIOS = [
+    Scenario('login', 'POST', lambda context, n: '/api/users/login/',
+             payload=lambda context, n: {'username': context.customer_username, 'password': DEFAULT_PASSWORD}),
+    Scenario('daycare_list', 'GET', lambda context, n: '/api/daycare/', user='customer'),
+    Scenario('booking_list', 'GET', lambda context, n: '/api/booking/', user='staff'),
+    Scenario('booking_create', 'POST', lambda context, n: '/api/booking/', user='owner', payload=_new_booking),
+    Scenario('roster_list', 'GET', lambda context, n: '/api/roster/', user='owner'),
+    Scenario('waitlist_list', 'GET', lambda context, n: '/api/waitlist/', user='staff'),
+]
+
+
+class ClientTransport:
+    """In-process requests, one test client per worker thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, token=None, payload=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client()
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        try:
+            if method == 'GET':
+                response = client.get(path, **headers)
+            else:
+                response = client.generic(method, path, json.dumps(payload or {}), 'application/json', **headers)
+        finally:
+            close_old_connections()
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+
+class HttpTransport:
+    """Requests against a running server, e.g http://127.0.0.1:8000"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, token=None, payload=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status, response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get('Server-Timing', '')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_scenario(scenario, context, transport, requests, concurrency):
+    def fire(n):
+        path = scenario.path(context, n)
+        payload = scenario.payload(context, n) if scenario.payload else None
+        token = getattr(context, scenario.user) if scenario.user else None
+        started = time.perf_counter()
+        status_code, server_timing = transport.request(scenario.method, path, token, payload)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        match = _QUERY_COUNT.search(server_timing)
+        return elapsed_ms, status_code, int(match.group(1)) if match else None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(fire, range(requests)))
+    wall_seconds = time.perf_counter() - started
+
+    latencies = sorted(sample[0] for sample in samples)
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': sum(1 for sample in samples if sample[1] >= 400),
+        'throughput_rps': round(requests / wall_seconds, 2) if wall_seconds else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(latencies[-1], 2),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def run_benchmark(context, transport, requests, concurrency, scenarios=SCENARIOS, warmup=5):
+    results = {}
+    for scenario in scenarios:
+        if warmup:
+            run_scenario(scenario, context, transport, warmup, 1)
+        results[scenario.name] = run_scenario(scenario, context, transport, requests, concurrency)
+    return results
+
+
+def compare_results(baseline, current, metric='p95_ms'):
+    """{scenario: (baseline value, current value, % change)} for scenarios present in both runs."""
+    comparison = {}
+    for name, stats in current.items():
+        before = baseline.get(name, {}).get(metric)
+        after = stats.get(metric)
+        if before and after is not None:
+            comparison[name] = (before, after, round((after - before) / before * 100, 1))
+    return comparison
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def compare_json_codecs(data, repeat=20):
+    """
+    Median render and parse times of DRF's JSONRenderer/JSONParser against FastJSONRenderer/FastJSONParser
+    for one response payload, and whether both produce exactly the same bytes and data.
+    """
+    renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+    parser, fast_parser = JSONParser(), FastJSONParser()
+    body = renderer.render(data)
+    identical = (
+        fast_renderer.render(data) == body
+        and fast_parser.parse(io.BytesIO(body)) == parser.parse(io.BytesIO(body))
+    )
+    return {
+        'bytes': len(body),
+        'identical': identical,
+        'render_ms': round(median_ms(lambda: renderer.render(data), repeat), 2),
+        'fast_render_ms': round(median_ms(lambda: fast_renderer.render(data), repeat), 2),
+        'parse_ms': round(median_ms(lambda: parser.parse(io.BytesIO(body)), repeat), 2),
+        'fast_parse_ms': round(median_ms(lambda: fast_parser.parse(io.BytesIO(body)), repeat), 2),
+    }
@@ -0,0 +1,80 @@
+"""
+Batch upload of check in/out events from the tablets, POST /api/booking/check-in-events/.
+
+A tablet that has lost its connection keeps checking pets in and out and queues one event per tap:
+    {"id": "<uuid from the tablet>", "booking": 12, "action": "check_in", "at": "2024-10-01T08:02:11+10:00"}
+On reconnect it sends the whole queue at once. Each booking ends up in the state of its latest event by the
+tablet's clock, unless something later (an online check in, another tablet) already changed it, i.e last
+writer wins on Booking.check_in_changed_at. Event ids are kept, so re-sending a batch after a lost response
+changes nothing.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Booking, CheckInEvent, SyncChange
+from .rollups import record_check_ins
+from .sync import record_changes
+
+MAX_BATCH_SIZE = 1000
+
+APPLIED = 'applied'
+SUPERSEDED = 'superseded'  # The booking had already changed later than this event
+DUPLICATE = 'duplicate'  # Uploaded before
+REJECTED = 'rejected'  # Not an active booking at the staff member's daycares
+
+
+def apply_check_in_events(events, staff):
+    """
+    events are validated dicts (id, booking, action, at) in the order the tablet queued them.
+    Returns (a status per event, the bookings they were for).
+    """
+    now = timezone.now()
+    statuses = [None] * len(events)
+
+    with transaction.atomic():
+        bookings = Booking.objects.select_for_update().filter(
+            id__in={event['booking'] for event in events},
+            daycare__in=staff.daycares.all(),
+            is_active=True,
+            is_waitlist=False,
+        ).in_bulk()
+        # Only once the bookings are locked, a concurrent upload of the same batch has then committed its events
+        seen = set(CheckInEvent.objects.filter(event_id__in=[event['id'] for event in events]).values_list('event_id', flat=True))
+
+        pending = []
+        for index, event in enumerate(events):
+            if event['id'] in seen:
+                statuses[index] = DUPLICATE
+            elif event['booking'] not in bookings:
+                statuses[index] = REJECTED
+            else:
+                seen.add(event['id'])
+                # A tablet clock running fast can't make its events beat everything that comes after them
+                pending.append((min(event['at'], now), index))
+        pending.sort()
+
+        was_checked_in = {booking.id: booking.checked_in for booking in bookings.values()}
+        new_events, changed = [], {}
+        for occurred_at, index in pending:
+            event = events[index]
+            booking = bookings[event['booking']]
+            applied = booking.check_in_changed_at is None or occurred_at > booking.check_in_changed_at
+            if applied:
+                booking.checked_in = event['action'] == CheckInEvent.Action.CHECK_IN
+                booking.check_in_changed_at = occurred_at
+                booking.updated_at = now
+                changed[booking.id] = booking
+            statuses[index] = APPLIED if applied else SUPERSEDED
+            new_events.append(CheckInEvent(
+                event_id=event['id'], booking=booking, staff=staff, action=event['action'],
+                occurred_at=occurred_at, applied=applied,
+            ))
+
+        CheckInEvent.objects.bulk_create(new_events, ignore_conflicts=True)
+        if changed:
+            # bulk_update skips save(), so the sync log and rollups are updated here rather than by signals
+            Booking.objects.bulk_update(changed.values(), ['checked_in', 'check_in_changed_at', 'updated_at'])
+            record_check_ins([booking for booking in changed.values() if booking.checked_in != was_checked_in[booking.id]])
+            record_changes(SyncChange.Kind.BOOKING, [(booking.id, booking.daycare_id) for booking in changed.values()])
+
+    return statuses, list(bookings.values())
@@ -0,0 +1,53 @@
+"""
+Conditional GET for list and detail endpoints (ConditionalGetMixin in viewsets.py).
+
+A queryset's fingerprint is (latest updated_at, row count) from one aggregate query, over the
+queryset's own rows and whichever related rows the payload renders. Any save moves updated_at
+and any row leaving the queryset changes the count, so the ETag built from it changes whenever the
+response would. Last-Modified can't see rows leaving, so for lists it is the time a fingerprint was
+first served rather than the latest updated_at.
+
+Writes that skip save() (QuerySet.update, bulk_update) have to set updated_at themselves, touch() does it.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+# Only needs to outlive the clients' polling interval, a miss just means one full response
+FIRST_SEEN_TIMEOUT = 60 * 60 * 24
+
+
+def queryset_fingerprint(queryset, fields=('updated_at',)):
+    """(latest of `fields`, distinct row count), related fields e.g 'pet__updated_at' included."""
+    aggregates = {f'latest_{i}': Max(field) for i, field in enumerate(fields)}
+    result = queryset.order_by().aggregate(row_count=Count('pk', distinct=True), **aggregates)
+    latest = max((result[key] for key in aggregates if result[key] is not None), default=None)
+    return latest, result['row_count']
+
+
+def build_etag(request, latest, row_count):
+    """Varies with the URL (filters, ?fields=, page), the user and the negotiated format as well as the data."""
+    raw = '|'.join([
+        request.get_full_path(),
+        str(request.user.pk),
+        getattr(request, 'accepted_media_type', '') or '',
+        latest.isoformat() if latest else '',
+        str(row_count),
+    ])
+    return f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def first_seen(etag, latest=None):
+    """When this ETag was first handed out, never earlier than `latest`."""
+    now = timezone.now()
+    key = f'conditional:first-seen:{etag}'
+    cache.add(key, now, FIRST_SEEN_TIMEOUT)
+    seen = cache.get(key, now)
+    return max(seen, latest) if latest else seen
+
+
+def touch(queryset):
+    """Move updated_at on rows changed without save(), e.g after an m2m change."""
+    return queryset.update(updated_at=timezone.now())
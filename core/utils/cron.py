@@ -0,0 +1,67 @@
+"""
+Five field cron expressions (minute hour day-of-month month day-of-week) for periodic jobs, see utils/jobs.py.
+Fields take *, numbers, ranges, lists and steps e.g '*/15 7-18 * * 1-5'. Day of week is 0-6 from Sunday (7 is Sunday too).
+As in cron, when both day fields are restricted a day matching either one runs.
+"""
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def parse_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        spec, _, step = part.partition('/')
+        if spec == '*':
+            start, end = low, high
+        elif '-' in spec:
+            start, end = (int(bound) for bound in spec.split('-', 1))
+        else:
+            start = end = int(spec)
+        if step and spec != '*' and '-' not in spec:
+            end = high  # '5/10' means every 10 from 5
+        if not (low <= start <= end <= high):
+            raise ValueError(f"{part!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+class CronSchedule:
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expressions have 5 fields, got {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_field(field, low, high) for field, (low, high) in zip(fields, FIELD_RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def __repr__(self):
+        return f"CronSchedule({self.expression!r})"
+
+    def matches_day(self, day):
+        weekday = (day.weekday() + 1) % 7  # cron counts from Sunday
+        if self.any_day or self.any_weekday:
+            return day.day in self.days and weekday in self.weekdays
+        return day.day in self.days or weekday in self.weekdays
+
+    def next_after(self, moment):
+        """The first run strictly after `moment`, in local time."""
+        local = timezone.localtime(moment).replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+        # A day at a time rather than a minute at a time, a year ahead covers every valid expression but Feb 30
+        for offset in range(366 * 4 + 1):
+            day = (local + timedelta(days=offset)).date()
+            if day.month not in self.months or not self.matches_day(day):
+                continue
+            earliest = local.time() if offset == 0 else None
+            for hour in sorted(self.hours):
+                for minute in sorted(self.minutes):
+                    candidate = datetime(day.year, day.month, day.day, hour, minute)
+                    if earliest is None or candidate.time() >= earliest:
+                        return timezone.make_aware(candidate)
+        raise ValueError(f"{self.expression!r} never runs")
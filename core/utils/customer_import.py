@@ -0,0 +1,283 @@
+"""
+Bulk import of customers and their pets, used by `manage.py import_customers` and the CustomerProfile admin.
+
+Rows are dicts like:
+    {
+        "username": "jsmith", "first_name": "Jane", "last_name": "Smith",
+        "email": "jane@example.com", "phone": "+61-400-000-000", "password": "",
+        "pets": [{"pet_name": "Rex", "pet_types": [1], "pet_bio": "", "is_public": true, "key": "smith-rex"}]
+    }
+Pets sharing the same "key" are created once and co-owned by every customer listing them.
+In CSV the pets column is written as "Rex:1:smith-rex;Milo:2|3", i.e name[:type ids][:key] separated by ';'.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction, DatabaseError
+from django.db.models.functions import Lower
+
+from ..models import CustomerProfile, Pet
+from .conditional import touch
+from .pet_types import PET_TYPES
+
+DEFAULT_CHUNK_SIZE = 1000
+username_validator = UnicodeUsernameValidator()
+
+
+class ImportResult:
+    def __init__(self):
+        self.customers_created = 0
+        self.pets_created = 0
+        self.errors = []  # (row number, message)
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+
+def read_rows(file, file_format):
+    """Parse an uploaded/opened file into row dicts, file_format is 'csv' or 'json'."""
+    content = file.read()
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    if file_format == 'json':
+        rows = json.loads(content)
+        if not isinstance(rows, list):
+            raise ValueError("JSON import must be a list of customers.")
+        return rows
+
+    rows = []
+    for row in csv.DictReader(io.StringIO(content)):
+        row['pets'] = parse_csv_pets(row.get('pets') or '')
+        rows.append(row)
+    return rows
+
+
+def parse_csv_pets(value):
+    pets = []
+    for entry in filter(None, (part.strip() for part in value.split(';'))):
+        name, _, rest = entry.partition(':')
+        types, _, key = rest.partition(':')
+        pets.append({
+            'pet_name': name.strip(),
+            'pet_types': [t.strip() for t in types.split('|') if t.strip()],
+            'key': key.strip() or None,
+        })
+    return pets
+
+
+def clean_row(row):
+    """Returns (cleaned row, list of error messages)."""
+    errors = []
+    if not isinstance(row, dict):
+        return None, ["Row must be an object."]
+
+    cleaned = {
+        'username': str(row.get('username') or '').strip(),
+        'first_name': str(row.get('first_name') or '').strip(),
+        'last_name': str(row.get('last_name') or '').strip(),
+        'email': str(row.get('email') or '').strip(),
+        'phone': str(row.get('phone') or '').strip(),
+        'password': row.get('password') or None,
+        'pets': [],
+    }
+
+    if not cleaned['username']:
+        errors.append("username is required.")
+    elif len(cleaned['username']) > 150:
+        errors.append("username must be at most 150 characters.")
+    else:
+        try:
+            username_validator(cleaned['username'])
+        except ValidationError as e:
+            errors.extend(e.messages)
+
+    for field in ('first_name', 'last_name'):
+        if len(cleaned[field]) > 150:
+            errors.append(f"{field} must be at most 150 characters.")
+
+    if cleaned['email']:
+        try:
+            validate_email(cleaned['email'])
+        except ValidationError:
+            errors.append("email is not valid.")
+
+    if not cleaned['phone']:
+        errors.append("phone is required.")
+    elif len(cleaned['phone']) > 15:
+        errors.append("phone must be at most 15 characters.")
+
+    pets = row.get('pets') or []
+    if not isinstance(pets, list):
+        errors.append("pets must be a list.")
+        pets = []
+    for pet in pets:
+        if not isinstance(pet, dict):
+            errors.append("Each pet must be an object.")
+            continue
+        pet_name = str(pet.get('pet_name') or '').strip()
+        if not pet_name or len(pet_name) > 25:
+            errors.append("pet_name is required and must be at most 25 characters.")
+            continue
+        try:
+            pet_types = [int(pet_type) for pet_type in pet.get('pet_types') or []]
+        except (TypeError, ValueError):
+            errors.append(f"pet_types for {pet_name} must be pet type IDs.")
+            continue
+        unknown = [pet_type for pet_type in pet_types if pet_type not in PET_TYPES]
+        if unknown:
+            errors.append(f"Unknown pet types for {pet_name}: {unknown}.")
+            continue
+        cleaned['pets'].append({
+            'pet_name': pet_name,
+            'pet_types': pet_types,
+            'pet_bio': str(pet.get('pet_bio') or ''),
+            'is_public': bool(pet.get('is_public', True)),
+            'key': pet.get('key') or None,
+        })
+
+    return cleaned, errors
+
+
+def import_customers(rows, chunk_size=DEFAULT_CHUNK_SIZE, hash_passwords=False, dry_run=False):
+    """
+    Validate and insert rows chunk by chunk with bulk_create.
+    Passwords get an unusable hash unless hash_passwords is set, hashing dominates import time otherwise
+    and imported customers are expected to go through a password reset.
+    """
+    result = ImportResult()
+    seen_usernames = set()
+    shared_pets = {}  # pet key -> Pet id, so co-owned pets are only created once across chunks
+
+    numbered_rows = enumerate(rows, start=1)
+    while True:
+        chunk = list(islice(numbered_rows, chunk_size))
+        if not chunk:
+            break
+        _import_chunk(chunk, result, seen_usernames, shared_pets, hash_passwords, dry_run)
+
+    return result
+
+
+def _import_chunk(chunk, result, seen_usernames, shared_pets, hash_passwords, dry_run):
+    valid = []
+    for row_number, row in chunk:
+        cleaned, errors = clean_row(row)
+        if not errors and cleaned['username'].lower() in seen_usernames:
+            errors = ["username appears more than once in the import."]
+        if errors:
+            result.add_error(row_number, ' '.join(errors))
+            continue
+        seen_usernames.add(cleaned['username'].lower())
+        valid.append((row_number, cleaned))
+
+    # Usernames differing only in case count as the same, in the file and against existing users
+    existing = set(
+        User.objects.annotate(username_lower=Lower('username'))
+        .filter(username_lower__in=[cleaned['username'].lower() for _, cleaned in valid])
+        .values_list('username_lower', flat=True)
+    )
+    rows = []
+    for row_number, cleaned in valid:
+        if cleaned['username'].lower() in existing:
+            result.add_error(row_number, f"username {cleaned['username']} already exists.")
+        else:
+            rows.append((row_number, cleaned))
+
+    if dry_run:
+        result.customers_created += len(rows)
+        result.pets_created += sum(len(cleaned['pets']) for _, cleaned in rows)
+        return
+
+    try:
+        with transaction.atomic():
+            customers_created, pets_created, new_shared_pets = _insert_rows(rows, shared_pets, hash_passwords)
+    except DatabaseError as e:
+        for row_number, _ in rows:
+            result.add_error(row_number, f"Chunk failed to import: {e}")
+        return
+
+    shared_pets.update(new_shared_pets)
+    result.customers_created += customers_created
+    result.pets_created += pets_created
+
+
+def _insert_rows(rows, shared_pets, hash_passwords):
+    users = []
+    for _, cleaned in rows:
+        user = User(
+            username=cleaned['username'],
+            first_name=cleaned['first_name'],
+            last_name=cleaned['last_name'],
+            email=cleaned['email'],
+        )
+        if hash_passwords and cleaned['password']:
+            user.password = make_password(cleaned['password'])
+        else:
+            user.set_unusable_password()
+        users.append(user)
+    _bulk_create(User, users)
+
+    profiles = []
+    for user, (_, cleaned) in zip(users, rows):
+        profile = CustomerProfile(user=user, phone=cleaned['phone'])
+        profile.update_search_fields()
+        profiles.append(profile)
+    _bulk_create(CustomerProfile, profiles)
+
+    new_pets = []
+    new_shared_pets = {}
+    owner_links = []  # (pet or pet id, profile)
+    for profile, (_, cleaned) in zip(profiles, rows):
+        for pet_data in cleaned['pets']:
+            key = pet_data['key']
+            if key and key in shared_pets:
+                owner_links.append((shared_pets[key], profile))
+                continue
+            if key and key in new_shared_pets:
+                owner_links.append((new_shared_pets[key], profile))
+                continue
+            pet = Pet(
+                pet_name=pet_data['pet_name'],
+                pet_types=pet_data['pet_types'],
+                pet_bio=pet_data['pet_bio'],
+                is_public=pet_data['is_public'],
+            )
+            pet.update_derived_fields()
+            new_pets.append(pet)
+            if key:
+                new_shared_pets[key] = pet
+            owner_links.append((pet, profile))
+    _bulk_create(Pet, new_pets)
+
+    PetOwner = Pet.customers.through
+    PetOwner.objects.bulk_create(
+        [
+            PetOwner(pet_id=pet if isinstance(pet, int) else pet.id, customerprofile_id=profile.id)
+            for pet, profile in owner_links
+        ],
+        batch_size=DEFAULT_CHUNK_SIZE,
+        ignore_conflicts=True,
+    )
+    # Pets from earlier chunks gained owners without being saved
+    existing_pet_ids = {pet for pet, _ in owner_links if isinstance(pet, int)}
+    if existing_pet_ids:
+        touch(Pet.objects.filter(id__in=existing_pet_ids))
+
+    return len(profiles), len(new_pets), {key: pet.id for key, pet in new_shared_pets.items()}
+
+
+def _bulk_create(model, objs):
+    """bulk_create that still gives us primary keys on backends that can't return them from a bulk insert."""
+    if connection.features.can_return_rows_from_bulk_insert:
+        model.objects.bulk_create(objs, batch_size=DEFAULT_CHUNK_SIZE)
+    else:
+        for obj in objs:
+            obj.save()
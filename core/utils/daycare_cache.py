@@ -0,0 +1,60 @@
+"""
+Versioned cache for the public daycare directory and detail payloads (DaycareViewSet.fresh_response).
+
+Only the serialized data is cached: conditional GET (ETag, Last-Modified, 304) is ConditionalGetMixin's, and the
+payload key includes the same queryset fingerprint the ETag is built from. Versions live in the cache itself, so
+with the default per-process LocMemCache a bump only reaches the worker that made it, but the fingerprint still
+keeps every worker from serving a payload rendered from other rows. A shared backend (Redis, Memcached) just
+gives more hits across workers.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Cached payloads are keyed by version, so a long timeout is safe: a bump makes old entries unreachable
+DAYCARE_CACHE_TIMEOUT = 60 * 60
+DIRECTORY_VERSION_KEY = 'daycare:directory:version'
+
+
+def _version_key(daycare_id):
+    return f'daycare:{daycare_id}:version'
+
+
+def _get_or_init_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Random tokens rather than counters, so an evicted version can never collide with an old payload
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_daycare_version(daycare_id):
+    return _get_or_init_version(_version_key(daycare_id))
+
+
+def get_directory_version():
+    return _get_or_init_version(DIRECTORY_VERSION_KEY)
+
+
+def bump_daycare_version(*daycare_ids):
+    """
+    Invalidate cached payloads for the given daycares and the directory listing, once the current transaction
+    commits. Bumping earlier would let a concurrent request cache the old rows under the new version.
+    """
+    transaction.on_commit(lambda: _bump(daycare_ids))
+
+
+def _bump(daycare_ids):
+    versions = {_version_key(daycare_id): uuid.uuid4().hex for daycare_id in daycare_ids}
+    versions[DIRECTORY_VERSION_KEY] = uuid.uuid4().hex
+    cache.set_many(versions, timeout=None)
+
+
+def build_cache_key(*parts):
+    """Cache key for a payload variant, e.g. ('detail', pk, version, fingerprint, 'DaycareSerializer', role)."""
+    raw = ':'.join(str(part) for part in parts)
+    return f'daycare:payload:{hashlib.md5(raw.encode()).hexdigest()}'
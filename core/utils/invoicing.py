@@ -0,0 +1,118 @@
+"""
+Monthly invoicing: per customer, booked days x the daycare's daily rate plus the price of every product booked.
+A booking is billed in the month it starts, for every day it spans (booking_dates, as product capacity counts it).
+
+Totals are grouped and summed in the database, then invoices and line items are written with bulk_create.
+Invoices are unique per (daycare, customer, month), customers already invoiced for the month are skipped,
+so re-running a month only invoices what is missing.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum, F
+from django.utils import timezone
+
+from ..models import Booking, Daycare, Invoice, InvoiceLineItem
+from .product_capacity import booking_dates
+
+CENTS = Decimal('0.01')
+
+
+def month_bounds(year, month):
+    """(first day of the month, aware start datetime, aware end datetime exclusive)"""
+    period_start = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    start = timezone.make_aware(datetime.combine(period_start, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(next_month, datetime.min.time()))
+    return period_start, start, end
+
+
+def generate_invoices(daycare, year, month):
+    """Invoice every customer with billable bookings at the daycare in the month, returns (created, skipped)."""
+    try:
+        return _generate_invoices(daycare, year, month)
+    except IntegrityError:
+        # Another run invoiced some of the same customers first (only possible without row locks, e.g SQLite).
+        # Going again counts them as already invoiced
+        return _generate_invoices(daycare, year, month)
+
+
+@transaction.atomic
+def _generate_invoices(daycare, year, month):
+    period_start, start, end = month_bounds(year, month)
+    # One run per daycare at a time, a concurrent one waits here and then skips what this one invoiced
+    list(Daycare.objects.select_for_update().filter(pk=daycare.pk).values_list('id', flat=True))
+
+    already_invoiced = set(
+        Invoice.objects.filter(daycare=daycare, period_start=period_start).values_list('customer_id', flat=True)
+    )
+    bookings = Booking.objects.filter(
+        daycare=daycare,
+        is_active=True,
+        is_waitlist=False,
+        start_time__gte=start,
+        start_time__lt=end,
+    ).exclude(customer_id__in=already_invoiced)
+
+    days_by_customer = defaultdict(int)
+    for customer_id, start_time, end_time in bookings.values_list('customer_id', 'start_time', 'end_time'):
+        days_by_customer[customer_id] += len(booking_dates(start_time, end_time))
+    if not days_by_customer:
+        return 0, len(already_invoiced)
+
+    product_rows = (
+        Booking.products.through.objects
+        .filter(booking__in=bookings)
+        .values('booking__customer_id', 'product_id', 'product__name', 'product__price')
+        .annotate(quantity=Count('id'), amount=Sum(F('product__price')))
+        .order_by('booking__customer_id', 'product__name')
+    )
+
+    daily_rate = daycare.daily_rate
+    line_items = {customer_id: [] for customer_id in days_by_customer}
+    for customer_id, days in days_by_customer.items():
+        line_items[customer_id].append(InvoiceLineItem(
+            kind=InvoiceLineItem.Kind.DAYCARE,
+            description=f"Daycare days at {daycare.daycare_name}",
+            quantity=days,
+            unit_price=daily_rate,
+            amount=(daily_rate * days).quantize(CENTS),
+        ))
+    for row in product_rows:
+        line_items[row['booking__customer_id']].append(InvoiceLineItem(
+            kind=InvoiceLineItem.Kind.PRODUCT,
+            product_id=row['product_id'],
+            description=row['product__name'],
+            quantity=row['quantity'],
+            unit_price=row['product__price'],
+            amount=Decimal(row['amount']).quantize(CENTS),
+        ))
+
+    invoices = [
+        Invoice(
+            daycare=daycare,
+            customer_id=customer_id,
+            period_start=period_start,
+            daily_rate=daily_rate,
+            total=sum((item.amount for item in items), Decimal('0')).quantize(CENTS),
+        )
+        for customer_id, items in line_items.items()
+    ]
+
+    Invoice.objects.bulk_create(invoices, batch_size=1000)
+    # Look the ids up rather than relying on bulk_create returning them, not every backend does
+    invoice_ids = dict(
+        Invoice.objects.filter(daycare=daycare, period_start=period_start, customer_id__in=line_items)
+        .values_list('customer_id', 'id')
+    )
+    for customer_id, items in line_items.items():
+        for item in items:
+            item.invoice_id = invoice_ids[customer_id]
+    InvoiceLineItem.objects.bulk_create(
+        [item for items in line_items.values() for item in items],
+        batch_size=1000,
+    )
+
+    return len(invoices), len(already_invoiced)
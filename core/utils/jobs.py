@@ -0,0 +1,227 @@
+"""
+Background jobs backed by the Job table, run by `manage.py run_workers`. No broker, a single box is enough.
+
+Tasks are plain functions registered in core/tasks.py:
+
+    @task(max_attempts=3)
+    def expand_recurring_booking(booking_id): ...
+
+    @task(cron='15 2 * * *')  # also queued every night at 02:15
+    def repair_daily_stats(): ...
+
+    enqueue('expand_recurring_booking', booking_id=booking.id)
+
+enqueue() inserts a row in the caller's transaction (keyed jobs just after it commits), so a job only exists
+once the change it is about is committed. Keyword arguments must be JSON serialisable. Workers claim due jobs
+with SELECT ... FOR UPDATE SKIP LOCKED where the database has it, and with a guarded UPDATE on SQLite (which
+only runs one write at a time). A failed job is retried with exponential backoff until max_attempts, then left as failed with its
+traceback. A job whose worker died is requeued once it has been running longer than its timeout.
+
+JOBS_RUN_INLINE = True runs jobs straight after commit in the calling process instead, handy without a worker.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Job
+from .cron import CronSchedule
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 60 * 60
+DEFAULT_TIMEOUT = 15 * 60
+# How often each worker queues upcoming cron runs and requeues jobs abandoned by dead workers
+HOUSEKEEPING_SECONDS = 30
+
+_registry = {}
+
+
+@dataclass
+class Task:
+    name: str
+    func: object
+    max_attempts: int = 5
+    timeout: int = DEFAULT_TIMEOUT  # Seconds before a running job is presumed abandoned
+    cron: CronSchedule = None
+
+
+def task(name=None, max_attempts=5, timeout=DEFAULT_TIMEOUT, cron=None):
+    def register(func):
+        registered = Task(name or func.__name__, func, max_attempts, timeout, CronSchedule(cron) if cron else None)
+        _registry[registered.name] = registered
+        return func
+    return register
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"No task named {name!r}, is it registered in core/tasks.py?")
+
+
+def enqueue(name, run_at=None, key=None, **kwargs):
+    """
+    Queue a task to run once the current transaction commits (or now outside one).
+    With a key, nothing is added while a job with the same key is still queued, that job covers it. Keyed jobs
+    are only inserted once the transaction commits: folded into a queued job inside it, a worker could claim
+    and finish that job before this change is visible, and the change would never be picked up.
+    """
+    registered = get_task(name)
+    if getattr(settings, 'JOBS_RUN_INLINE', False):
+        transaction.on_commit(lambda: registered.func(**kwargs))
+        return None
+
+    job = Job(name=name, payload=kwargs, key=key, max_attempts=registered.max_attempts, run_at=run_at or timezone.now())
+    if key is None:
+        job.save()
+    else:
+        transaction.on_commit(lambda: Job.objects.bulk_create([job], ignore_conflicts=True))
+    return job
+
+
+def backoff(attempts):
+    """Seconds before retry number `attempts`, doubling each time with some jitter so retries don't bunch up."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(1, 1.25)
+
+
+def claim(worker_id):
+    """Mark the next due job as running for this worker and return it, None if nothing is due."""
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.Status.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+    claimed = {'status': Job.Status.RUNNING, 'locked_by': worker_id, 'locked_at': now}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = due.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            Job.objects.filter(id=job.id).update(attempts=F('attempts') + 1, **claimed)
+    else:
+        # No row locks, but SQLite runs one write at a time so only one worker's UPDATE can match
+        for job_id in due.values_list('id', flat=True)[:10]:
+            if Job.objects.filter(id=job_id, status=Job.Status.QUEUED).update(attempts=F('attempts') + 1, **claimed):
+                break
+        else:
+            return None
+        job = Job(id=job_id)
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    try:
+        get_task(job.name).func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Job %s (%s) failed, attempt %s of %s", job.id, job.name, job.attempts, job.max_attempts)
+        _failed(job, error)
+    else:
+        _release(job, status=Job.Status.DONE, finished_at=timezone.now(), last_error='')
+
+
+def _release(job, **fields):
+    # Only while it is still this worker's, a job requeued as abandoned belongs to whoever claims it next
+    return Job.objects.filter(id=job.id, status=Job.Status.RUNNING, locked_by=job.locked_by).update(**fields)
+
+
+def _failed(job, error):
+    now = timezone.now()
+    if job.attempts >= job.max_attempts:
+        _release(job, status=Job.Status.FAILED, finished_at=now, last_error=error)
+        return
+    retry_at = now + timedelta(seconds=backoff(job.attempts))
+    try:
+        with transaction.atomic():
+            _release(job, status=Job.Status.QUEUED, run_at=retry_at, last_error=error)
+    except IntegrityError:
+        # A job with the same key was queued meanwhile and will do the same work
+        _release(job, status=Job.Status.DONE, finished_at=now, last_error=error)
+
+
+def schedule_periodic(now=None):
+    """Queue the next run of every cron task, a no-op for runs already queued by any worker."""
+    now = now or timezone.now()
+    upcoming = [
+        Job(name=registered.name, periodic=True, run_at=registered.cron.next_after(now), max_attempts=registered.max_attempts)
+        for registered in _registry.values() if registered.cron
+    ]
+    Job.objects.bulk_create(upcoming, ignore_conflicts=True)
+
+
+def requeue_abandoned(now=None):
+    """Running jobs whose worker stopped without finishing them count as a failed attempt."""
+    now = now or timezone.now()
+    shortest = min((registered.timeout for registered in _registry.values()), default=DEFAULT_TIMEOUT)
+    for job in Job.objects.filter(status=Job.Status.RUNNING, locked_at__lt=now - timedelta(seconds=shortest)):
+        timeout = _registry[job.name].timeout if job.name in _registry else DEFAULT_TIMEOUT
+        if job.locked_at < now - timedelta(seconds=timeout):
+            _failed(job, f"Abandoned by worker {job.locked_by} after {timeout}s.")
+
+
+def purge_finished(days=7):
+    """Delete jobs that finished more than `days` ago, failed ones are kept four times as long."""
+    now = timezone.now()
+    done, _ = Job.objects.filter(status=Job.Status.DONE, finished_at__lt=now - timedelta(days=days)).delete()
+    failed, _ = Job.objects.filter(status=Job.Status.FAILED, finished_at__lt=now - timedelta(days=days * 4)).delete()
+    return done + failed
+
+
+def worker_id(index):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def work(index, stop, poll_interval=1.0, burst=False):
+    """
+    One worker loop, run on a thread by run_threads. Stops when `stop` is set, or in burst mode once
+    nothing is due. The job in hand is always finished first.
+    """
+    name = worker_id(index)
+    next_housekeeping = timezone.now()
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                if timezone.now() >= next_housekeeping:
+                    schedule_periodic()
+                    requeue_abandoned()
+                    next_housekeeping = timezone.now() + timedelta(seconds=HOUSEKEEPING_SECONDS)
+                job = claim(name)
+                if job is not None:
+                    run_job(job)
+            except DatabaseError:
+                # e.g SQLite busy with another writer. A job left running is requeued once its timeout passes
+                logger.exception("Job worker %s hit a database error, retrying", name)
+                stop.wait(poll_interval)
+                continue
+
+            if job is None:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+    finally:
+        connection.close()
+
+
+def run_threads(threads, stop, poll_interval=1.0, burst=False, first_index=0):
+    workers = [
+        threading.Thread(target=work, args=(first_index + i, stop, poll_interval, burst), name=f'job-worker-{i}')
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
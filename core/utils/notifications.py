@@ -0,0 +1,166 @@
+"""
+Transactional outbox for customer emails (Notification).
+
+    with transaction.atomic():
+        booking.is_active = False
+        booking.save()
+        notify_booking_cancelled(booking)
+
+The row commits or rolls back with the change, and a dispatch job (tasks.dispatch_notifications) is queued
+once it commits. The dispatcher claims due rows a batch at a time and sends them over one connection of
+Django's email backend (SMTP in production, console or locmem in development and tests). A failed send is
+retried with backoff up to MAX_ATTEMPTS, then left as failed with the error.
+
+Each notification's dedupe key names its event, so the same event can't queue two emails (a double-clicked
+cancel, two staff offering the same waitlist spot at once). Delivery is at least once: rows claimed by a
+dispatcher that died are sent again after CLAIM_TIMEOUT.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Notification
+from .jobs import backoff, enqueue
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+BATCH_SIZE = 50
+MAX_BATCHES = 20  # Per dispatch run, the next run picks up the rest
+CLAIM_TIMEOUT = 10 * 60
+
+
+def _when(booking):
+    start = timezone.localtime(booking.start_time)
+    return f"{start:%A %d %B %Y} at {start:%H:%M}"
+
+
+def queue_notification(kind, dedupe_key, booking, subject, body):
+    """Add an email for the booking's customer to the outbox, nothing if they have no email address."""
+    to_email = booking.customer.user.email
+    if not to_email:
+        return
+    Notification.objects.bulk_create(
+        [Notification(kind=kind, dedupe_key=dedupe_key, booking=booking, to_email=to_email, subject=subject, body=body)],
+        ignore_conflicts=True,
+    )
+    enqueue('dispatch_notifications', key='dispatch_notifications')
+
+
+def notify_waitlist_offer(waitlist):
+    """Call before saving the offer, the key is the entry's state before it so a later re-offer still sends."""
+    booking = waitlist.booking
+    queue_notification(
+        Notification.Kind.WAITLIST_OFFER,
+        f'waitlist_offer:{waitlist.id}:{waitlist.updated_at.isoformat()}',
+        booking,
+        f"A spot has opened up at {booking.daycare.daycare_name}",
+        f"Hi {booking.customer.user.first_name},\n\n"
+        f"A spot has opened up for {booking.pet.pet_name} at {booking.daycare.daycare_name} on {_when(booking)}. "
+        f"Open the app to accept or decline it.",
+    )
+
+
+def notify_booking_accepted(booking):
+    queue_notification(
+        Notification.Kind.BOOKING_ACCEPTED,
+        f'booking_accepted:{booking.id}',
+        booking,
+        f"Your booking at {booking.daycare.daycare_name} is confirmed",
+        f"Hi {booking.customer.user.first_name},\n\n"
+        f"{booking.pet.pet_name} is booked in at {booking.daycare.daycare_name} on {_when(booking)}.",
+    )
+
+
+def notify_booking_cancelled(booking):
+    queue_notification(
+        Notification.Kind.BOOKING_CANCELLED,
+        f'booking_cancelled:{booking.id}',
+        booking,
+        f"Your booking at {booking.daycare.daycare_name} has been cancelled",
+        f"Hi {booking.customer.user.first_name},\n\n"
+        f"{booking.pet.pet_name}'s booking at {booking.daycare.daycare_name} on {_when(booking)} has been cancelled.",
+    )
+
+
+def claim_batch(size=BATCH_SIZE):
+    """Mark up to `size` due notifications as sending for this dispatcher, a concurrent one gets different rows."""
+    now = timezone.now()
+    due = list(
+        Notification.objects.filter(status=Notification.Status.PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id').values_list('id', flat=True)[:size]
+    )
+    if not due:
+        return []
+    token = uuid.uuid4().hex
+    Notification.objects.filter(id__in=due, status=Notification.Status.PENDING).update(
+        status=Notification.Status.SENDING, claimed_by=token, claimed_at=now, attempts=F('attempts') + 1,
+    )
+    return list(Notification.objects.filter(claimed_by=token, status=Notification.Status.SENDING).order_by('id'))
+
+
+def release_stale():
+    """Claims older than CLAIM_TIMEOUT belong to a dispatcher that died, send them again."""
+    cutoff = timezone.now() - timedelta(seconds=CLAIM_TIMEOUT)
+    return Notification.objects.filter(status=Notification.Status.SENDING, claimed_at__lt=cutoff).update(
+        status=Notification.Status.PENDING,
+    )
+
+
+def _failed(notification, error):
+    now = timezone.now()
+    if notification.attempts >= MAX_ATTEMPTS:
+        fields = {'status': Notification.Status.FAILED}
+    else:
+        fields = {'status': Notification.Status.PENDING, 'next_attempt_at': now + timedelta(seconds=backoff(notification.attempts))}
+    Notification.objects.filter(id=notification.id, claimed_by=notification.claimed_by).update(last_error=error, **fields)
+
+
+def dispatch(batch_size=BATCH_SIZE, max_batches=MAX_BATCHES):
+    """Send due notifications over one backend connection, a batch at a time. Returns (sent, failed)."""
+    release_stale()
+    sent = failed = 0
+    connection = None
+    try:
+        for _ in range(max_batches):
+            batch = claim_batch(batch_size)
+            if not batch:
+                break
+            if connection is None:
+                connection = get_connection(fail_silently=False)
+                try:
+                    connection.open()
+                except Exception as e:
+                    # Mail server unreachable, nothing in this batch could go
+                    logger.exception("Could not connect to the email backend")
+                    for notification in batch:
+                        _failed(notification, f"Could not connect: {e}")
+                    return sent, failed + len(batch)
+
+            delivered = []
+            for notification in batch:
+                message = EmailMessage(
+                    notification.subject, notification.body, settings.DEFAULT_FROM_EMAIL, [notification.to_email],
+                    connection=connection,
+                )
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    logger.warning("Sending notification %s failed: %s", notification.id, e)
+                    _failed(notification, str(e))
+                    failed += 1
+                else:
+                    delivered.append(notification.id)
+            Notification.objects.filter(id__in=delivered).update(
+                status=Notification.Status.SENT, sent_at=timezone.now(), last_error='',
+            )
+            sent += len(delivered)
+    finally:
+        if connection is not None:
+            connection.close()
+    return sent, failed
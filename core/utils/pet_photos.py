@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from ..models import PetPhoto
+from .thumbnails import render_thumbnails
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZES = getattr(settings, 'PET_PHOTO_THUMBNAIL_SIZES', {'small': 128, 'medium': 512, 'large': 1024})
+MAX_UPLOAD_SIZE = getattr(settings, 'PET_PHOTO_MAX_UPLOAD_SIZE', 15 * 1024 * 1024)
+# MPO is the multi-picture JPEG some phones produce
+ALLOWED_FORMATS = {'JPEG': 'jpg', 'MPO': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+_executor = None
+
+
+class InvalidPhoto(Exception):
+    pass
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # spawn rather than fork, so workers don't inherit open DB connections or server threads
+        _executor = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'PET_PHOTO_WORKERS', 2),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _executor
+
+
+def hash_upload(upload):
+    """sha256 of an uploaded file, read in chunks so large uploads never sit in memory."""
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def original_name(content_hash, extension):
+    return f'pet_photos/originals/{content_hash[:2]}/{content_hash}.{extension}'
+
+
+def thumbnail_name(content_hash, label):
+    return f'pet_photos/thumbnails/{content_hash[:2]}/{content_hash}_{label}.jpg'
+
+
+def detect_format(upload):
+    """Checks the upload is an image we accept by reading its header only."""
+    if upload.size > MAX_UPLOAD_SIZE:
+        raise InvalidPhoto(f"Photos must be smaller than {MAX_UPLOAD_SIZE // (1024 * 1024)}MB.")
+    try:
+        with Image.open(upload) as image:
+            image_format = image.format
+    except (UnidentifiedImageError, OSError):
+        raise InvalidPhoto("Upload is not a supported image.")
+    except Image.DecompressionBombError:
+        raise InvalidPhoto("Photo dimensions are too large.")
+    finally:
+        upload.seek(0)
+    if image_format not in ALLOWED_FORMATS:
+        raise InvalidPhoto("Photos must be JPEG, PNG or WEBP.")
+    return ALLOWED_FORMATS[image_format]
+
+
+def save_pet_photo(pet, upload, uploaded_by=None):
+    """
+    Store an uploaded photo for a pet, deduplicated by content hash.
+    Returns (photo, created). Thumbnails are rendered after commit, off the request thread.
+    """
+    extension = detect_format(upload)
+    content_hash = hash_upload(upload)
+
+    existing = PetPhoto.objects.filter(pet=pet, content_hash=content_hash).first()
+    if existing:
+        if not existing.is_active:
+            existing.is_active = True
+            existing.save(update_fields=['is_active', 'updated_at'])
+        return existing, False
+
+    # The same image may already be stored for another pet, reuse its file and thumbnails
+    twins = PetPhoto.objects.filter(content_hash=content_hash)
+    twin = twins.filter(status=PetPhoto.Status.READY).first() or twins.first()
+    name = original_name(content_hash, extension)
+    stored = False
+    if twin:
+        name = twin.original.name
+    elif not default_storage.exists(name):
+        name = default_storage.save(name, upload)
+        stored = True
+
+    try:
+        with transaction.atomic():
+            photo = PetPhoto.objects.create(
+                pet=pet,
+                uploaded_by=uploaded_by,
+                original=name,
+                content_hash=content_hash,
+                thumbnails=twin.thumbnails if twin and twin.status == PetPhoto.Status.READY else {},
+                status=PetPhoto.Status.READY if twin and twin.status == PetPhoto.Status.READY else PetPhoto.Status.PENDING,
+            )
+    except IntegrityError:
+        # The same photo uploaded twice at once for this pet, the other upload won
+        existing = PetPhoto.objects.get(pet=pet, content_hash=content_hash)
+        if stored and name != existing.original.name:
+            default_storage.delete(name)
+        return existing, False
+    if photo.status == PetPhoto.Status.PENDING:
+        transaction.on_commit(lambda: schedule_thumbnails(photo))
+    return photo, True
+
+
+def schedule_thumbnails(photo):
+    targets = [(size, default_storage.path(thumbnail_name(photo.content_hash, label)))
+               for label, size in THUMBNAIL_SIZES.items()]
+    source = default_storage.path(photo.original.name)
+
+    if not getattr(settings, 'PET_PHOTO_ASYNC_THUMBNAILS', True):
+        _finish(photo.id, photo.content_hash, lambda: render_thumbnails(source, targets))
+        return
+
+    future = get_executor().submit(render_thumbnails, source, targets)
+    future.add_done_callback(lambda f: _finish_in_callback(photo.id, photo.content_hash, f))
+
+
+def _finish_in_callback(photo_id, content_hash, future):
+    try:
+        _finish(photo_id, content_hash, future.result)
+    finally:
+        # Callbacks run on the executor's thread, don't leak its connection
+        connections.close_all()
+
+
+def _finish(photo_id, content_hash, get_result):
+    try:
+        written = get_result()
+    except Exception:
+        logger.exception("Thumbnail rendering failed for pet photo %s", photo_id)
+        PetPhoto.objects.filter(id=photo_id).update(status=PetPhoto.Status.FAILED, updated_at=timezone.now())
+        return
+
+    size_labels = {size: label for label, size in THUMBNAIL_SIZES.items()}
+    thumbnails = {size_labels[size]: thumbnail_name(content_hash, size_labels[size]) for size in written}
+    # Every pending photo sharing this content is done too
+    PetPhoto.objects.filter(content_hash=content_hash, status=PetPhoto.Status.PENDING).update(
+        thumbnails=thumbnails, status=PetPhoto.Status.READY, updated_at=timezone.now(),
+    )
+    PetPhoto.objects.filter(id=photo_id).update(thumbnails=thumbnails, status=PetPhoto.Status.READY, updated_at=timezone.now())
@@ -5,3 +5,32 @@ PET_TYPES = {
     4: 'Fish',
     5: 'Lizard',
 }
+
+# Each pet type gets one bit, e.g Dog = 0b00001, Cat = 0b00010
+ALL_PET_TYPES_MASK = (1 << max(PET_TYPES)) - 1
+
+
+def pet_types_to_mask(pet_types):
+    """Converts a list of pet type IDs (or a single ID) to a bitmask, ignoring unknown IDs."""
+    if isinstance(pet_types, int):
+        pet_types = [pet_types]
+    mask = 0
+    for pet_type_id in pet_types or []:
+        if pet_type_id in PET_TYPES:
+            mask |= 1 << (pet_type_id - 1)
+    return mask
+
+
+def masks_including(mask):
+    """
+    Every possible mask that contains all bits of `mask`.
+    There are only 2^len(PET_TYPES) masks, so `pet_types_mask__in=masks_including(...)` stays an indexed lookup.
+    """
+    return [candidate for candidate in range(ALL_PET_TYPES_MASK + 1) if candidate & mask == mask]
+
+
+def accepts_pet_types(daycare_mask, pet_mask):
+    """A daycare with no pet types set accepts any pet, otherwise it must accept every type of the pet."""
+    if not daycare_mask or not pet_mask:
+        return True
+    return pet_mask & ~daycare_mask == 0
@@ -0,0 +1,75 @@
+"""
+Per-product, per-day usage counters for Product.capacity.
+
+Reservations lock the day's counters (SELECT ... FOR UPDATE) before checking them, so two concurrent
+bookings can never both take the last slot. Callers run these inside the booking's transaction.
+"""
+from datetime import timedelta
+
+from django.db.models import F
+
+from ..models import ProductDailyUsage
+
+
+class ProductCapacityError(Exception):
+    pass
+
+
+def booking_dates(start_time, end_time):
+    """Every calendar day a booking touches."""
+    day = start_time.date()
+    last_day = end_time.date()
+    dates = [day]
+    while day < last_day:
+        day += timedelta(days=1)
+        dates.append(day)
+    return dates
+
+
+def uses_products(booking):
+    """Only active, accepted bookings hold product slots."""
+    return booking.is_active and not booking.is_waitlist
+
+
+def reserve_products(products, start_time, end_time):
+    """Take one slot of each product on each day, raising ProductCapacityError if any is full."""
+    dates = booking_dates(start_time, end_time)
+    ProductDailyUsage.objects.bulk_create(
+        [ProductDailyUsage(product=product, date=day) for product in products for day in dates],
+        ignore_conflicts=True,
+    )
+    # Lock every counter first, in a fixed order so two bookings sharing products can't deadlock.
+    # A guarded UPDATE over a subquery isn't re-checked after a lock wait on Postgres, this is
+    capacity = {product.id: product for product in products}
+    usage = list(
+        ProductDailyUsage.objects.select_for_update()
+        .filter(product__in=products, date__in=dates).order_by('product_id', 'date')
+    )
+    for row in usage:
+        product = capacity[row.product_id]
+        if product.capacity is not None and row.count >= product.capacity:
+            raise ProductCapacityError(f"{product.name} is fully booked on {row.date}.")
+    ProductDailyUsage.objects.filter(id__in=[row.id for row in usage]).update(count=F('count') + 1)
+
+
+def release_products(product_ids, start_time, end_time):
+    """Give back the slots taken by reserve_products."""
+    if not product_ids:
+        return
+    ProductDailyUsage.objects.filter(
+        product_id__in=product_ids,
+        date__in=booking_dates(start_time, end_time),
+        count__gt=0,
+    ).update(count=F('count') - 1)
+
+
+def reserve_booking(booking):
+    if uses_products(booking):
+        reserve_products(list(booking.products.all()), booking.start_time, booking.end_time)
+
+
+def release_booking(booking, product_ids=None):
+    if uses_products(booking):
+        if product_ids is None:
+            product_ids = list(booking.products.values_list('id', flat=True))
+        release_products(product_ids, booking.start_time, booking.end_time)
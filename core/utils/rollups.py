@@ -0,0 +1,263 @@
+"""
+Daily booking rollups per daycare (DaycareDailyStats).
+
+Every booking contributes a fixed set of counters to the day it starts on, see booking_contribution.
+Lifecycle events (create, cancel, check in/out, waitlist acceptance, edits) take the contribution before
+and after the change and apply the difference, so the incremental path and rebuild_daily_stats always agree.
+active_bookings and peak_occupancy are recomputed by a background job (tasks.refresh_occupancy) shortly after.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum, Q, F, Exists, OuterRef, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from ..models import Booking, DaycareDailyStats, Waitlist
+from .jobs import enqueue
+
+COUNT_FIELDS = [
+    'bookings_accepted',
+    'bookings_waitlisted',
+    'waitlist_converted',
+    'bookings_cancelled',
+    'checked_in',
+]
+
+
+def booking_contribution(booking):
+    """What this booking adds to its day's rollup row."""
+    waitlist = Waitlist.objects.filter(booking=booking).aggregate(
+        entries=Count('id'),
+        accepted=Count('id', filter=Q(customer_accepted=True)),
+    )
+    accepted = not booking.is_waitlist
+    revenue = Decimal('0')
+    if accepted and booking.is_active:
+        revenue = booking.products.aggregate(total=Sum('price'))['total'] or Decimal('0')
+
+    return {
+        'daycare_id': booking.daycare_id,
+        'date': timezone.localdate(booking.start_time),
+        'bookings_accepted': int(accepted),
+        'bookings_waitlisted': int(booking.is_waitlist or waitlist['entries'] > 0),
+        'waitlist_converted': int(waitlist['accepted'] > 0),
+        'bookings_cancelled': int(not booking.is_active),
+        'checked_in': int(booking.checked_in),
+        'product_revenue': revenue,
+    }
+
+
+def record_booking_change(before, after):
+    """
+    Apply the difference between two contributions (either may be None for create/delete).
+    e.g
+        before = booking_contribution(booking)
+        booking.is_active = False; booking.save()
+        record_booking_change(before, booking_contribution(booking))
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for contribution, sign in ((before, -1), (after, 1)):
+        if contribution is None:
+            continue
+        key = (contribution['daycare_id'], contribution['date'])
+        for field in COUNT_FIELDS + ['product_revenue']:
+            deltas[key][field] += sign * contribution[field]
+
+    for (daycare_id, day), delta in deltas.items():
+        DaycareDailyStats.objects.bulk_create(
+            [DaycareDailyStats(daycare_id=daycare_id, date=day)],
+            ignore_conflicts=True,
+        )
+        updates = {
+            field: Greatest(F(field) + value, Value(0))
+            for field, value in delta.items() if value and field != 'product_revenue'
+        }
+        if delta['product_revenue']:
+            updates['product_revenue'] = F('product_revenue') + delta['product_revenue']
+        if updates:
+            DaycareDailyStats.objects.filter(daycare_id=daycare_id, date=day).update(**updates)
+        # Reads every booking that day, so it's left to a worker. One queued refresh per day covers any number of changes
+        enqueue('refresh_occupancy', key=f'occupancy:{daycare_id}:{day}', daycare_id=daycare_id, day=day.isoformat())
+
+
+
+def record_check_ins(bookings):
+    """
+    checked_in counters for bookings flipped in bulk (utils/check_in_events.py) without a contribution each.
+    bookings already hold their new checked_in, and only check in/out changed.
+    """
+    deltas = defaultdict(int)
+    for booking in bookings:
+        deltas[(booking.daycare_id, timezone.localdate(booking.start_time))] += 1 if booking.checked_in else -1
+
+    # One UPDATE per distinct delta (nearly always just +1 or -1) however many days the bookings cover
+    days_by_delta = defaultdict(list)
+    for key, delta in deltas.items():
+        if delta:
+            days_by_delta[delta].append(key)
+    if not days_by_delta:
+        return
+
+    DaycareDailyStats.objects.bulk_create(
+        [DaycareDailyStats(daycare_id=daycare_id, date=day) for keys in days_by_delta.values() for daycare_id, day in keys],
+        ignore_conflicts=True,
+    )
+    for delta, keys in days_by_delta.items():
+        rows = Q()
+        for daycare_id, day in keys:
+            rows |= Q(daycare_id=daycare_id, date=day)
+        DaycareDailyStats.objects.filter(rows).update(checked_in=Greatest(F('checked_in') + delta, Value(0)))
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, start + timedelta(days=1)
+
+
+def peak_overlap(intervals):
+    """Most (start, end) intervals overlapping at any instant, an interval ending as another starts doesn't overlap."""
+    events = []
+    for start, end in intervals:
+        events.append((start, 1))
+        events.append((end, -1))
+    # Ends sort before starts at the same instant
+    events.sort(key=lambda event: (event[0], event[1]))
+    current = peak = 0
+    for _, change in events:
+        current += change
+        peak = max(peak, current)
+    return peak
+
+
+def refresh_occupancy(daycare_id, day):
+    """Recompute active_bookings and peak_occupancy for one daycare day from its bookings."""
+    start, end = _day_bounds(day)
+    intervals = list(Booking.objects.filter(
+        daycare_id=daycare_id,
+        is_active=True,
+        is_waitlist=False,
+        start_time__gte=start,
+        start_time__lt=end,
+    ).values_list('start_time', 'end_time'))
+    DaycareDailyStats.objects.filter(daycare_id=daycare_id, date=day).update(
+        active_bookings=len(intervals),
+        peak_occupancy=peak_overlap(intervals),
+    )
+
+
+def rebuild_daily_stats(daycare_ids=None, start_date=None, end_date=None):
+    """
+    Recompute rollups from raw bookings (backfill / repair), optionally for some daycares and an inclusive date range.
+    Returns the number of rows written.
+    """
+    bookings = Booking.objects.all()
+    stats = DaycareDailyStats.objects.all()
+    if daycare_ids:
+        bookings = bookings.filter(daycare_id__in=daycare_ids)
+        stats = stats.filter(daycare_id__in=daycare_ids)
+    if start_date:
+        bookings = bookings.filter(start_time__gte=_day_bounds(start_date)[0])
+        stats = stats.filter(date__gte=start_date)
+    if end_date:
+        bookings = bookings.filter(start_time__lt=_day_bounds(end_date)[1])
+        stats = stats.filter(date__lte=end_date)
+
+    rows = {}
+    counts = (
+        bookings
+        .annotate(
+            day=TruncDate('start_time'),
+            was_waitlisted=Exists(Waitlist.objects.filter(booking=OuterRef('pk'))),
+            was_converted=Exists(Waitlist.objects.filter(booking=OuterRef('pk'), customer_accepted=True)),
+        )
+        .values('daycare_id', 'day')
+        .annotate(
+            bookings_accepted=Count('id', filter=Q(is_waitlist=False)),
+            bookings_waitlisted=Count('id', filter=Q(is_waitlist=True) | Q(was_waitlisted=True)),
+            waitlist_converted=Count('id', filter=Q(was_converted=True)),
+            bookings_cancelled=Count('id', filter=Q(is_active=False)),
+            checked_in=Count('id', filter=Q(checked_in=True)),
+        )
+    )
+    for row in counts:
+        rows[(row['daycare_id'], row['day'])] = DaycareDailyStats(
+            daycare_id=row['daycare_id'],
+            date=row['day'],
+            **{field: row[field] for field in COUNT_FIELDS},
+        )
+
+    revenue = (
+        Booking.products.through.objects
+        .filter(booking__in=bookings.filter(is_active=True, is_waitlist=False))
+        .annotate(day=TruncDate('booking__start_time'))
+        .values('booking__daycare_id', 'day')
+        .annotate(total=Sum('product__price'))
+    )
+    for row in revenue:
+        rows[(row['booking__daycare_id'], row['day'])].product_revenue = row['total']
+
+    # Occupancy needs the actual intervals, stream them ordered so each day is swept once
+    active = (
+        bookings.filter(is_active=True, is_waitlist=False)
+        .order_by('daycare_id', 'start_time')
+        .values_list('daycare_id', 'start_time', 'end_time')
+    )
+    intervals = defaultdict(list)
+    for daycare_id, start_time, end_time in active.iterator(chunk_size=5000):
+        intervals[(daycare_id, timezone.localdate(start_time))].append((start_time, end_time))
+    for key, day_intervals in intervals.items():
+        rows[key].active_bookings = len(day_intervals)
+        rows[key].peak_occupancy = peak_overlap(day_intervals)
+
+    with transaction.atomic():
+        stats.delete()
+        DaycareDailyStats.objects.bulk_create(rows.values(), batch_size=1000)
+    return len(rows)
+
+
+def daycare_report(daycare, start_date, end_date):
+    """
+    Owner dashboard numbers for an inclusive date range, read from the rollup rows only.
+    Occupancy is peak occupancy over the day's capacity (opening hours capacity, falling back to the daycare's).
+    """
+    capacity_by_day = {
+        hours.day: 0 if hours.closed else (hours.capacity or daycare.capacity)
+        for hours in daycare.opening_hours.all()
+    }
+    rows = list(
+        DaycareDailyStats.objects
+        .filter(daycare=daycare, date__gte=start_date, date__lte=end_date)
+        .order_by('date')
+    )
+
+    totals = {field: 0 for field in COUNT_FIELDS + ['active_bookings']}
+    totals['revenue'] = Decimal('0')
+    days = []
+    capacity_total = occupied_total = 0
+    for row in rows:
+        capacity = capacity_by_day.get(row.date.isoweekday(), daycare.capacity)
+        revenue = row.product_revenue + row.active_bookings * daycare.daily_rate
+        for field in totals:
+            if field != 'revenue':
+                totals[field] += getattr(row, field)
+        totals['revenue'] += revenue
+        capacity_total += capacity
+        occupied_total += row.peak_occupancy
+        days.append({
+            'date': row.date,
+            **{field: getattr(row, field) for field in COUNT_FIELDS},
+            'active_bookings': row.active_bookings,
+            'peak_occupancy': row.peak_occupancy,
+            'capacity': capacity,
+            'occupancy_rate': round(row.peak_occupancy / capacity, 4) if capacity else None,
+            'revenue': revenue,
+        })
+
+    totals['occupancy_rate'] = round(occupied_total / capacity_total, 4) if capacity_total else None
+    totals['waitlist_conversion_rate'] = (
+        round(totals['waitlist_converted'] / totals['bookings_waitlisted'], 4)
+        if totals['bookings_waitlisted'] else None
+    )
+    return {'start': start_date, 'end': end_date, 'totals': totals, 'days': days}
@@ -0,0 +1,74 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+
+# Sorts after any real character, so [prefix, prefix + PREFIX_END) is every string starting with prefix
+PREFIX_END = '\U0010ffff'
+
+NOTE_TERM_MAX_LENGTH = 50  # PetNoteTerm.term
+
+
+def normalize_search_text(value):
+    """Lowercase, strip accents and collapse whitespace, e.g ' Zoë  Smith ' -> 'zoe smith'."""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return ' '.join(value.lower().split())
+
+
+def normalize_phone(value):
+    """Digits only, e.g '+61-400 123 456' -> '61400123456'."""
+    return re.sub(r'\D', '', value or '')
+
+
+def looks_like_phone(value):
+    """True for input made only of digits and phone punctuation, e.g '0400 123' or '+61-4'."""
+    return bool(re.fullmatch(r'[\d\s+()-]+', value)) and any(c.isdigit() for c in value)
+
+
+def customer_search_fields(user, phone):
+    """Values for the CustomerProfile search columns."""
+    first_name = normalize_search_text(user.first_name)
+    last_name = normalize_search_text(user.last_name)
+    return {
+        'search_name': f"{first_name} {last_name}".strip(),
+        'search_name_reversed': f"{last_name} {first_name}".strip(),
+        'search_phone': normalize_phone(phone),
+    }
+
+
+def prefix_q(field, prefix):
+    """
+    Index-friendly prefix match on a normalized column.
+    A range comparison uses a plain b-tree index on every backend, unlike LIKE 'x%'.
+    """
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + PREFIX_END})
+
+
+def note_terms(text):
+    """Distinct normalized words of a note, e.g 'Walked nicely, walked!' -> {'walked', 'nicely'}."""
+    return {word[:NOTE_TERM_MAX_LENGTH] for word in re.findall(r'\w+', normalize_search_text(text))}
+
+
+def search_notes(queryset, text):
+    """
+    Full-text search over PetNote.note, both read off an index.
+    PostgreSQL matches the english tsvector of the note (GIN index petnote_note_fts_idx on the same expression),
+    elsewhere every word must prefix a word of the note, looked up in PetNoteTerm.
+    """
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchVector
+
+        return queryset.annotate(search=SearchVector('note', config='english')).filter(
+            search=SearchQuery(text, config='english', search_type='websearch')
+        )
+
+    from ..models import PetNoteTerm  # models.py imports this module
+
+    words = note_terms(text)
+    if not words:
+        return queryset.none()
+    for word in words:
+        queryset = queryset.filter(id__in=PetNoteTerm.objects.filter(prefix_q('term', word)).values('note_id'))
+    return queryset
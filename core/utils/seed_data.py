@@ -0,0 +1,289 @@
+"""
+Synthetic but coherent data for benchmarks and local load testing (`manage.py seed_daycare_data`).
+
+Each daycare is generated on its own (staff, rosters, customers, pets and bookings all belong to it)
+from a random.Random seeded with (seed, daycare index), so the same arguments always produce the same rows
+and daycares can be generated in parallel worker processes.
+Everything goes in with bulk_create, derived fields (search columns, pet type masks) are filled in by hand
+since save() isn't called. Bookings don't take products, so product usage counters stay consistent.
+
+Every user gets the password DEFAULT_PASSWORD, usernames look like owner-0, staff-0-1, customer-0-17.
+"""
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.utils import timezone
+
+from ..models import (
+    BlacklistedPet, Booking, CustomerProfile, Daycare, OpeningHours, Pet, Product, Roster, StaffProfile,
+    StaffUnavailability, Waitlist,
+)
+from .rollups import rebuild_daily_stats
+
+DEFAULT_PASSWORD = 'benchmark'
+DEFAULT_BATCH_SIZE = 5000
+
+OPEN_FROM = 7
+OPEN_TO = 18
+CLOSED_DAYS = {7}  # Sunday, OpeningHours.day is 1-7
+CANCELLED_RATE = 0.05
+CO_OWNED_RATE = 0.1
+BLACKLISTED_RATE = 0.01
+WAITLIST_ACCEPTED_RATE = 0.3
+
+SUBURBS = [
+    ('Sydney', 'NSW', '2000'), ('Melbourne', 'VIC', '3000'), ('Brisbane', 'QLD', '4000'),
+    ('Adelaide', 'SA', '5000'), ('Perth', 'WA', '6000'), ('Hobart', 'TAS', '7000'),
+    ('Darwin', 'NT', '0800'), ('Canberra', 'ACT', '2600'),
+]
+FIRST_NAMES = ['Olivia', 'Jack', 'Charlotte', 'Noah', 'Amelia', 'William', 'Isla', 'Oliver', 'Mia', 'Leo',
+               'Ava', 'Henry', 'Grace', 'Lucas', 'Chloe', 'Thomas', 'Ruby', 'James', 'Zoe', 'Ethan']
+LAST_NAMES = ['Smith', 'Jones', 'Williams', 'Brown', 'Wilson', 'Taylor', 'Nguyen', 'Johnson', 'Martin', 'White',
+              'Anderson', 'Walker', 'Thompson', 'Harris', 'Lee', 'Ryan', 'Robinson', 'Kelly', 'King', 'Wright']
+PET_NAMES = ['Rex', 'Bella', 'Max', 'Luna', 'Charlie', 'Coco', 'Milo', 'Daisy', 'Buddy', 'Rosie',
+             'Teddy', 'Molly', 'Archie', 'Lola', 'Ollie', 'Ruby', 'Toby', 'Ellie', 'Jasper', 'Maggie']
+PRODUCTS = [('Bath', Decimal('25.00')), ('Nail trim', Decimal('15.00')), ('Walk', Decimal('20.00'))]
+
+
+class SeedConfig:
+    def __init__(self, daycares=2, staff_per_daycare=4, customers_per_daycare=100, pets_per_customer=2,
+                 years=1, bookings_per_pet_per_month=4, capacity=30, seed=0, batch_size=DEFAULT_BATCH_SIZE):
+        self.daycares = daycares
+        self.staff_per_daycare = max(staff_per_daycare, 1)  # The first one is the owner
+        self.customers_per_daycare = customers_per_daycare
+        self.pets_per_customer = pets_per_customer
+        self.years = years
+        self.bookings_per_pet_per_month = bookings_per_pet_per_month
+        self.capacity = capacity
+        self.seed = seed
+        self.batch_size = batch_size
+
+    def date_range(self):
+        """Bookings and rosters run from `years` ago up to two months ahead."""
+        today = timezone.localdate()
+        return today - timedelta(days=round(365 * self.years)), today + timedelta(days=60)
+
+
+def _open_days(start, end):
+    day = start
+    while day <= end:
+        if day.isoweekday() not in CLOSED_DAYS:
+            yield day
+        day += timedelta(days=1)
+
+
+def _at(day, hour, tz):
+    # tzinfo straight onto the datetime, make_aware looks the timezone up on every call
+    return datetime.combine(day, time(hour), tzinfo=tz)
+
+
+def _person(rng):
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+def seed_daycare(index, config, password_hash):
+    """Generate one daycare and everything hanging off it, returns {model name: rows created}."""
+    rng = random.Random(f'{config.seed}-{index}')
+    counts = {}
+    start, end = config.date_range()
+    open_days = list(_open_days(start, end))
+    tz = timezone.get_current_timezone()
+
+    suburb, state, postcode = SUBURBS[index % len(SUBURBS)]
+    daycare = Daycare.objects.create(
+        daycare_name=f'{suburb} Pet Daycare {index}',
+        street_address=f'{rng.randint(1, 300)} George St',
+        suburb=suburb,
+        state=state,
+        postcode=postcode,
+        phone=f'02{rng.randint(10000000, 99999999)}',
+        email=f'daycare{index}@example.com',
+        capacity=config.capacity,
+        daily_rate=Decimal('55.00'),
+        pet_types=[1, 2],
+    )
+    OpeningHours.objects.bulk_create([
+        OpeningHours(
+            daycare=daycare, day=day, from_hour=time(OPEN_FROM), to_hour=time(OPEN_TO),
+            closed=day in CLOSED_DAYS, capacity=config.capacity,
+        )
+        for day in range(1, 8)
+    ])
+    Product.objects.bulk_create([
+        Product(daycare=daycare, name=name, description=name, price=price) for name, price in PRODUCTS
+    ])
+    counts['daycares'] = 1
+
+    # Staff, the first one owns the daycare
+    staff_users = []
+    for n in range(config.staff_per_daycare):
+        first_name, last_name = _person(rng)
+        username = f'owner-{index}' if n == 0 else f'staff-{index}-{n}'
+        staff_users.append(User(username=username, first_name=first_name, last_name=last_name, password=password_hash))
+    User.objects.bulk_create(staff_users, batch_size=config.batch_size)
+    staff = [
+        StaffProfile(user=user, role='O' if n == 0 else 'E', phone=f'04{rng.randint(10000000, 99999999)}')
+        for n, user in enumerate(staff_users)
+    ]
+    StaffProfile.objects.bulk_create(staff, batch_size=config.batch_size)
+    StaffProfile.daycares.through.objects.bulk_create([
+        StaffProfile.daycares.through(staffprofile_id=profile.id, daycare_id=daycare.id) for profile in staff
+    ])
+    counts['staff'] = len(staff)
+
+    # Each employee works an early or late shift on most open days
+    rosters = []
+    for profile in staff[1:]:
+        for day in open_days:
+            if rng.random() < 0.7:
+                shift_start = rng.choice([OPEN_FROM, OPEN_TO - 8])
+                rosters.append(Roster(
+                    staff=profile, daycare=daycare, shift_day=day,
+                    start_shift=_at(day, shift_start, tz), end_shift=_at(day, shift_start + 8, tz),
+                ))
+    Roster.objects.bulk_create(rosters, batch_size=config.batch_size)
+    counts['rosters'] = len(rosters)
+
+    # A recurring day off and a couple of one-off days for every employee
+    unavailability = []
+    for profile in staff[1:]:
+        unavailability.append(StaffUnavailability(staff=profile, day_of_week=rng.randint(0, 6), is_recurring=True))
+        for day in rng.sample(open_days, min(2, len(open_days))):
+            unavailability.append(StaffUnavailability(staff=profile, date=day))
+    StaffUnavailability.objects.bulk_create(unavailability, batch_size=config.batch_size)
+    counts['unavailability'] = len(unavailability)
+
+    # Customers and their pets, some pets are co-owned by the next customer along
+    customer_users = []
+    for n in range(config.customers_per_daycare):
+        first_name, last_name = _person(rng)
+        customer_users.append(User(
+            username=f'customer-{index}-{n}', first_name=first_name, last_name=last_name,
+            email=f'customer-{index}-{n}@example.com', password=password_hash,
+        ))
+    User.objects.bulk_create(customer_users, batch_size=config.batch_size)
+    customers = []
+    for user in customer_users:
+        profile = CustomerProfile(user=user, phone=f'04{rng.randint(10000000, 99999999)}')
+        profile.update_search_fields()
+        customers.append(profile)
+    CustomerProfile.objects.bulk_create(customers, batch_size=config.batch_size)
+    counts['customers'] = len(customers)
+
+    pets, owners = [], []
+    for n, customer in enumerate(customers):
+        for _ in range(max(1, round(rng.gauss(config.pets_per_customer, 0.5)))):
+            pet = Pet(pet_name=rng.choice(PET_NAMES), pet_types=[rng.choice([1, 1, 2])])
+            pet.update_derived_fields()
+            pets.append(pet)
+            owners.append([customer])
+            if len(customers) > 1 and rng.random() < CO_OWNED_RATE:
+                owners[-1].append(customers[(n + 1) % len(customers)])
+    Pet.objects.bulk_create(pets, batch_size=config.batch_size)
+    PetOwner = Pet.customers.through
+    PetOwner.objects.bulk_create(
+        [PetOwner(pet_id=pet.id, customerprofile_id=owner.id) for pet, pet_owners in zip(pets, owners) for owner in pet_owners],
+        batch_size=config.batch_size,
+    )
+    counts['pets'] = len(pets)
+
+    # Blacklisted pets keep their past bookings but get no new ones
+    today = timezone.localdate()
+    blacklisted = {pet.id for pet in pets if rng.random() < BLACKLISTED_RATE}
+    BlacklistedPet.objects.bulk_create([
+        BlacklistedPet(pet_id=pet_id, daycare=daycare, reason='Seeded') for pet_id in sorted(blacklisted)
+    ])
+    counts['blacklisted'] = len(blacklisted)
+    past_days = [day for day in open_days if day < today]
+
+    # At most one booking per pet per day so they never overlap, past capacity goes to the waitlist.
+    # Written out every batch_size rows so memory stays flat however many bookings there are.
+    per_pet = round(config.bookings_per_pet_per_month * 12 * config.years)
+    booked_per_day = {}
+    bookings = []
+    counts['bookings'] = counts['waitlists'] = 0
+    for pet, pet_owners in zip(pets, owners):
+        days = past_days if pet.id in blacklisted else open_days
+        for day in sorted(rng.sample(days, min(per_pet, len(days)))):
+            start_hour = rng.randint(OPEN_FROM, OPEN_FROM + 3)
+            is_waitlist = booked_per_day.get(day, 0) >= config.capacity
+            if not is_waitlist:
+                booked_per_day[day] = booked_per_day.get(day, 0) + 1
+            bookings.append(Booking(
+                customer=rng.choice(pet_owners),
+                pet=pet,
+                daycare=daycare,
+                start_time=_at(day, start_hour, tz),
+                end_time=_at(day, min(start_hour + rng.randint(4, 8), OPEN_TO), tz),
+                status=Booking.Status.WAITLISTED if is_waitlist else Booking.Status.ACCEPTED,
+                is_active=rng.random() >= CANCELLED_RATE,
+                checked_in=day == today and rng.random() < 0.5,
+                is_waitlist=is_waitlist,
+                waitlist_accepted=is_waitlist,
+            ))
+            if len(bookings) >= config.batch_size:
+                _write_bookings(bookings, counts, rng, today, config.batch_size)
+                bookings = []
+    _write_bookings(bookings, counts, rng, today, config.batch_size)
+
+    rebuild_daily_stats([daycare.id])
+    return counts
+
+
+def _write_bookings(bookings, counts, rng, today, batch_size):
+    Booking.objects.bulk_create(bookings, batch_size=batch_size)
+    waitlists = [
+        Waitlist(booking=booking, customer_notified=booking.start_time.date() < today,
+                 customer_accepted=rng.random() < WAITLIST_ACCEPTED_RATE)
+        for booking in bookings if booking.is_waitlist
+    ]
+    Waitlist.objects.bulk_create(waitlists, batch_size=batch_size)
+    counts['bookings'] += len(bookings)
+    counts['waitlists'] += len(waitlists)
+
+
+def _seed_one(index, config, password_hash):
+    with transaction.atomic():
+        counts = seed_daycare(index, config, password_hash)
+    connections.close_all()
+    return counts
+
+
+def seed_dataset(config, first_index=0, workers=1, progress=None):
+    """
+    Seed config.daycares daycares numbered from first_index, returns the total rows created per model.
+    With workers > 1 daycares are generated in parallel processes, one transaction per daycare.
+    progress, if given, is called with (daycare index, counts) as each daycare finishes.
+    """
+    password_hash = make_password(DEFAULT_PASSWORD)  # Hashed once, it's the slow part of creating users
+    indexes = range(first_index, first_index + config.daycares)
+    totals = {}
+
+    def add(index, counts):
+        for name, count in counts.items():
+            totals[name] = totals.get(name, 0) + count
+        if progress:
+            progress(index, counts)
+
+    if workers <= 1:
+        for index in indexes:
+            with transaction.atomic():
+                add(index, seed_daycare(index, config, password_hash))
+        return totals
+
+    # The parent's connections mustn't be shared with the spawned workers, which set Django up themselves
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+    ) as pool:
+        futures = {index: pool.submit(_seed_one, index, config, password_hash) for index in indexes}
+        for index, future in futures.items():
+            add(index, future.result())
+    return totals
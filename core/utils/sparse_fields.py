@@ -0,0 +1,64 @@
+"""
+Sparse fieldsets: ?fields= and ?omit= on any endpoint using SparseFieldsetMixin serializers.
+
+    ?fields=id,start_time,pet_details.pet_name   only these (pet_details keeps just pet_name)
+    ?omit=staff,products.daycare_name            everything but these
+
+Both take comma separated, dot separated paths and can be combined. Unknown names are ignored.
+Fieldset is the parsed form, one level per serializer: child(name) is the Fieldset for a nested one.
+"""
+
+FIELDSET_CONTEXT_KEY = 'fieldset'
+
+
+def parse_paths(value):
+    """'a,b.c,b.d' -> {'a': None, 'b': {'c': None, 'd': None}}, None standing for the whole field."""
+    tree = {}
+    for path in value.split(','):
+        names = [name for name in path.strip().split('.') if name]
+        if not names:
+            continue
+        node = tree
+        for name in names[:-1]:
+            if name in node and node[name] is None:
+                break  # The whole field was already asked for
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return tree
+
+
+class Fieldset:
+    def __init__(self, fields=None, omit=None):
+        self.fields = fields  # {name: subtree}, None keeps every field
+        self.omit = omit or {}  # {name: subtree}, a None subtree drops the whole field
+
+    @classmethod
+    def from_request(cls, request):
+        query_params = getattr(request, 'query_params', request.GET)
+        fields = query_params.get('fields', '').strip()
+        return cls(parse_paths(fields) if fields else None, parse_paths(query_params.get('omit', '')))
+
+    def is_everything(self):
+        return self.fields is None and not self.omit
+
+    def keeps(self, name):
+        if self.fields is not None and name not in self.fields:
+            return False
+        return not (name in self.omit and self.omit[name] is None)
+
+    def child(self, name):
+        fields = self.fields.get(name) if self.fields is not None else None
+        return Fieldset(fields, self.omit.get(name))
+
+    def keeps_path(self, path):
+        """e.g keeps_path('booking.pet_details') for whether a prefetch is worth doing."""
+        fieldset = self
+        for name in path.split('.'):
+            if not fieldset.keeps(name):
+                return False
+            fieldset = fieldset.child(name)
+        return True
+
+
+EVERYTHING = Fieldset()
@@ -0,0 +1,71 @@
+"""
+Per-request SQL accounting, used by core.middleware.QueryInstrumentationMiddleware.
+
+QueryRecorder hooks every database connection with an execute wrapper and keeps the query count,
+total SQL time and how often each query "shape" ran. A shape is the SQL with literals and IN lists
+collapsed, so `SELECT ... WHERE "core_pet"."id" = %s` run once per row shows up as one shape repeated N times.
+
+    with QueryRecorder() as recorder:
+        response = view(request)
+    recorder.query_count, recorder.total_ms, recorder.top_shapes(3)
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.db import connections
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_SAVEPOINT = re.compile(r'(SAVEPOINT)\s+"?\w+"?', re.IGNORECASE)
+
+
+class RepeatedQueryError(AssertionError):
+    """A single request ran the same query shape more times than allowed, usually an N+1."""
+
+
+def query_shape(sql):
+    """SQL with literals and savepoint names replaced by ? and IN (...) lists collapsed."""
+    shape = _SAVEPOINT.sub(r'\1 ?', sql)
+    shape = _STRING.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    shape = shape.replace('%s', '?')
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.query_count = 0
+        self.total_ms = 0.0
+        self.shapes = Counter()
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total_ms += (time.perf_counter() - started) * 1000
+            self.query_count += 1
+            self.shapes[query_shape(sql)] += 1
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        return False
+
+    def top_shapes(self, limit):
+        """The most repeated shapes as (shape, count), only shapes that ran more than once."""
+        return [(shape, count) for shape, count in self.shapes.most_common(limit) if count > 1]
+
+    def repeated_over(self, limit):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > limit]
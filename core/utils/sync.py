@@ -0,0 +1,129 @@
+"""
+Delta sync for the staff check-in tablets, GET /api/sync/?since=<cursor> (SyncViewSet in viewsets.py).
+
+Saves and deletes of bookings, pets, waitlist entries, rosters and blacklistings append a SyncChange row per
+daycare that can see them (signals.py), so the SyncChange id is a monotonic change sequence. A tablet sends
+back the cursor from its last response and gets only what changed since, read at its current state:
+rows it should hold come back in full, rows deleted, deactivated or moved out of its daycares come back
+as tombstones (ids to drop).
+
+Without a cursor, or with one older than the pruned log, the tablet gets a full snapshot from the tables.
+Bookings and shifts that ended before today are left out of both, tablets drop finished days themselves.
+Writes that skip save() (QuerySet.update, bulk_create) have to call record_changes() themselves.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import Exists, Max, Min, OuterRef, Q
+from django.utils import timezone
+
+from ..models import Booking, BlacklistedPet, Pet, Roster, SyncChange, Waitlist
+
+Kind = SyncChange.Kind
+
+DEFAULT_LIMIT = 1000
+# Ids are handed out at insert but only become visible at commit, so a missing id below a visible one is a
+# transaction still writing (or one that rolled back). A cursor never moves past one, unless the change
+# after it is older than this: no request holds a transaction open that long, it was rolled back
+GAP_SECONDS = 10 * 60
+RETENTION_DAYS = 30
+
+
+def record_changes(kind, changes):
+    """changes are (object id, daycare id) pairs, one log row each."""
+    SyncChange.objects.bulk_create([
+        SyncChange(kind=kind, object_id=object_id, daycare_id=daycare_id)
+        for object_id, daycare_id in set(changes) if daycare_id
+    ])
+
+
+def pet_daycares(pet_ids):
+    """(pet id, daycare id) for every daycare the pets were booked at or blacklisted from."""
+    booked = Booking.objects.filter(pet_id__in=pet_ids).order_by().values_list('pet_id', 'daycare_id').distinct()
+    blacklisted = BlacklistedPet.objects.filter(pet_id__in=pet_ids).order_by().values_list('pet_id', 'daycare_id').distinct()
+    return set(booked) | set(blacklisted)
+
+
+def window_start():
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+
+
+def visible(kind, daycare_ids):
+    """The rows of `kind` a tablet for these daycares should be holding."""
+    start = window_start()
+    if kind == Kind.BOOKING:
+        return Booking.objects.filter(daycare_id__in=daycare_ids, is_active=True, end_time__gte=start)
+    if kind == Kind.PET:
+        booked = visible(Kind.BOOKING, daycare_ids).filter(pet_id=OuterRef('pk'))
+        blacklisted = visible(Kind.BLACKLIST, daycare_ids).filter(pet_id=OuterRef('pk'))
+        return Pet.objects.filter(Q(Exists(booked)) | Q(Exists(blacklisted)), is_active=True)
+    if kind == Kind.WAITLIST:
+        return Waitlist.objects.filter(
+            booking__daycare_id__in=daycare_ids, booking__is_active=True, booking__end_time__gte=start, is_active=True,
+        )
+    if kind == Kind.ROSTER:
+        return Roster.objects.filter(daycare_id__in=daycare_ids, is_active=True, end_shift__gte=start)
+    return BlacklistedPet.objects.filter(daycare_id__in=daycare_ids, is_active=True)
+
+
+def committed_upto(since, upto):
+    """The furthest a cursor at `since` can move towards `upto` without passing a change not yet committed."""
+    recent = list(
+        SyncChange.objects.filter(id__gt=since, id__lte=upto, created_at__gt=timezone.now() - timedelta(seconds=GAP_SECONDS))
+        .order_by('id').values_list('id', flat=True)
+    )
+    if not recent:
+        return upto
+    # Only a gap just before a recent change can still be filled, the others are rollbacks
+    present = set(recent) | set(SyncChange.objects.filter(id__in=[seq - 1 for seq in recent]).values_list('id', flat=True))
+    for seq in recent:
+        if seq - 1 > since and seq - 1 not in present:
+            return SyncChange.objects.filter(id__lt=seq).aggregate(last=Max('id'))['last'] or since
+    return upto
+
+
+def settled_cursor():
+    """Cursor for a full snapshot, read before the tables: the newest change with everything before it committed."""
+    latest = SyncChange.objects.aggregate(last=Max('id'))['last']
+    return committed_upto(0, latest) if latest else 0
+
+
+def is_stale(since):
+    """The cursor is from before the pruned log (or from another database), only a full snapshot is safe."""
+    bounds = SyncChange.objects.aggregate(first=Min('id'), last=Max('id'))
+    if bounds['last'] is None:
+        return since > 0
+    return since > bounds['last'] or since < bounds['first'] - 1
+
+
+def changes_since(daycare_ids, since, limit=DEFAULT_LIMIT):
+    """
+    ({kind: changed object ids}, next cursor, has_more) for up to `limit` changes after `since`.
+    A row changed several times is only listed once.
+    """
+    entries = list(
+        SyncChange.objects.filter(daycare_id__in=daycare_ids, id__gt=since)
+        .order_by('id').values_list('id', 'kind', 'object_id')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    changed = defaultdict(set)
+    for _, kind, object_id in entries:
+        changed[kind].add(object_id)
+    if not entries:
+        return changed, since, False
+
+    # Everything on the page is sent now, but the cursor stops short of a change still being written and the
+    # rest is sent again next time. The tablet stops paging there and asks again on its next poll
+    last = entries[-1][0]
+    cursor = committed_upto(since, last)
+    return changed, cursor, has_more and cursor == last
+
+
+def prune(days=RETENTION_DAYS):
+    """Delete changes older than `days`, keeping the newest so is_stale() can still tell cursors apart."""
+    cutoff = timezone.now() - timedelta(days=days)
+    latest = SyncChange.objects.aggregate(last=Max('id'))['last']
+    deleted, _ = SyncChange.objects.filter(created_at__lt=cutoff).exclude(id=latest).delete()
+    return deleted
@@ -0,0 +1,30 @@
+"""
+Thumbnail rendering, run inside a process pool worker.
+Deliberately free of Django imports so spawned workers start quickly and never touch the database.
+"""
+import os
+
+from PIL import Image, ImageOps
+
+
+def render_thumbnails(source_path, targets, quality=85):
+    """
+    Render a JPEG thumbnail per (max edge in px, absolute destination path) in targets.
+    Returns the list of sizes written.
+    """
+    largest = max(size for size, _ in targets)
+    with Image.open(source_path) as image:
+        # Let the JPEG decoder downscale while decoding, much cheaper than decoding a 12MP photo in full
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        written = []
+        # Largest first, each smaller size is resized from the previous result
+        for size, destination in sorted(targets, reverse=True):
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            image.save(destination, 'JPEG', quality=quality, optimize=True)
+            written.append(size)
+    return written
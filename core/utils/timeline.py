@@ -0,0 +1,146 @@
+"""
+Pet timeline: bookings, notes, blacklist events and co-owner changes merged newest first.
+
+Each source is an already ordered queryset, they are k-way merged lazily with heapq.merge and
+paginated by a cursor of (timestamp, source rank, id). Every source is filtered to "before the cursor"
+in SQL and only read in small slices, so a page costs the same for 10 or 10,000 events.
+"""
+import base64
+import heapq
+import json
+from itertools import islice
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from ..models import Booking, PetNote, BlacklistedPet, PetOwnershipEvent
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _booking_event(booking):
+    return {
+        'daycare': booking.daycare_id,
+        'daycare_name': booking.daycare.daycare_name,
+        'start_time': booking.start_time,
+        'end_time': booking.end_time,
+        'status': booking.status,
+        'is_active': booking.is_active,
+        'checked_in': booking.checked_in,
+        'is_waitlist': booking.is_waitlist,
+    }
+
+
+def _note_event(note):
+    return {
+        'note': note.note,
+        'is_private': note.is_private,
+        'employee': note.employee_id,
+        'employee_name': note.employee.user.get_full_name(),
+    }
+
+
+def _blacklist_event(blacklist):
+    return {
+        'daycare': blacklist.daycare_id,
+        'daycare_name': blacklist.daycare.daycare_name,
+        'reason': blacklist.reason,
+        'is_active': blacklist.is_active,
+    }
+
+
+def _ownership_event(event):
+    return {
+        'customer': event.customer_id,
+        'customer_name': event.customer.user.get_full_name(),
+        'action': event.action,
+    }
+
+
+# (event type, rank used to break timestamp ties, timestamp field, queryset builder, payload builder)
+TIMELINE_SOURCES = [
+    ('booking', 4, 'start_time',
+     lambda pet: Booking.objects.filter(pet=pet).select_related('daycare'), _booking_event),
+    ('note', 3, 'created_at',
+     lambda pet: PetNote.objects.filter(pet=pet).select_related('employee__user'), _note_event),
+    ('blacklist', 2, 'date_blacklisted',
+     lambda pet: BlacklistedPet.objects.filter(pet=pet).select_related('daycare'), _blacklist_event),
+    ('ownership', 1, 'created_at',
+     lambda pet: PetOwnershipEvent.objects.filter(pet=pet).select_related('customer__user'), _ownership_event),
+]
+
+
+def encode_cursor(sort_key):
+    timestamp, rank, obj_id = sort_key
+    raw = json.dumps([timestamp.isoformat(), rank, obj_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns (timestamp, rank, id) or raises ValueError."""
+    try:
+        timestamp, rank, obj_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        timestamp = parse_datetime(timestamp)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if timestamp is None:
+        raise ValueError("Invalid cursor.")
+    return timestamp, int(rank), int(obj_id)
+
+
+def _before_cursor(field, rank, cursor):
+    """Rows that sort strictly after the cursor in newest-first (timestamp, rank, id) order."""
+    cursor_time, cursor_rank, cursor_id = cursor
+    if rank < cursor_rank:
+        return Q(**{f'{field}__lte': cursor_time})
+    if rank > cursor_rank:
+        return Q(**{f'{field}__lt': cursor_time})
+    return Q(**{f'{field}__lt': cursor_time}) | Q(**{field: cursor_time, 'id__lt': cursor_id})
+
+
+def _stream(queryset, event_type, rank, field, build, chunk_size):
+    """Lazily yield (sort key, event) from an ordered queryset, fetching chunk_size rows at a time."""
+    offset = 0
+    while True:
+        rows = list(queryset[offset:offset + chunk_size])
+        for row in rows:
+            timestamp = getattr(row, field)
+            yield (timestamp, rank, row.id), {
+                'type': event_type,
+                'id': row.id,
+                'timestamp': timestamp,
+                'data': build(row),
+            }
+        if len(rows) < chunk_size:
+            return
+        offset += chunk_size
+
+
+def build_timeline(pet, cursor=None, page_size=DEFAULT_PAGE_SIZE, source_filters=None):
+    """
+    Returns (events, next cursor or None).
+    source_filters maps an event type to a Q restricting it (e.g staff only see their daycares),
+    or to None to leave that source out entirely.
+    """
+    source_filters = source_filters or {}
+    streams = []
+    for event_type, rank, field, get_queryset, build in TIMELINE_SOURCES:
+        if event_type in source_filters and source_filters[event_type] is None:
+            continue
+        queryset = get_queryset(pet).order_by(f'-{field}', '-id')
+        if source_filters.get(event_type) is not None:
+            queryset = queryset.filter(source_filters[event_type])
+        if cursor:
+            queryset = queryset.filter(_before_cursor(field, rank, cursor))
+        # One extra row per source is enough to know whether another page exists
+        streams.append(_stream(queryset, event_type, rank, field, build, chunk_size=page_size + 1))
+
+    merged = heapq.merge(*streams, key=lambda item: item[0], reverse=True)
+    page = list(islice(merged, page_size + 1))
+
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_cursor(page[-1][0])
+    return [event for _, event in page], next_cursor
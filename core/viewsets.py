@@ -12,9 +12,32 @@ from .permissions import *
 from django.utils.dateparse import parse_date
 from django.utils import timezone
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from django.db.models import Q 
-from datetime import timedelta
+from .utils.geo import haversine_km, bounding_box
+from .utils.pet_types import pet_types_to_mask, masks_including
+from .utils.pet_photos import save_pet_photo, InvalidPhoto
+from rest_framework.parsers import MultiPartParser, FormParser
+from .utils.timeline import build_timeline, decode_cursor, DEFAULT_PAGE_SIZE as TIMELINE_PAGE_SIZE, MAX_PAGE_SIZE as TIMELINE_MAX_PAGE_SIZE
+from rest_framework.utils.urls import replace_query_param
+from .utils.invoicing import generate_invoices
+from .utils.product_capacity import reserve_booking, release_booking, ProductCapacityError
+from .utils.rollups import booking_contribution, record_booking_change, daycare_report
+from django.db import transaction
+from rest_framework import serializers
+from .utils.search import search_notes, normalize_search_text, normalize_phone, looks_like_phone, prefix_q
+from django.db.models import Exists, OuterRef, Prefetch, Value, BooleanField
+from .utils.daycare_cache import *
+from django.core.cache import cache
+from .utils.sparse_fields import EVERYTHING, FIELDSET_CONTEXT_KEY, Fieldset
+from .utils.conditional import queryset_fingerprint, build_etag, first_seen
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.shortcuts import get_object_or_404
+from .utils import sync
+from .utils.jobs import enqueue
+from .utils.notifications import notify_waitlist_offer, notify_booking_accepted, notify_booking_cancelled
+from .utils.check_in_events import apply_check_in_events, REJECTED as CHECK_IN_REJECTED
 
 
 class CustomPagination(PageNumberPagination):
@@ -23,6 +46,83 @@ class CustomPagination(PageNumberPagination):
     max_page_size = 1000
 
 
+class CustomerDirectoryPagination(CursorPagination):
+    """Keyset pagination for the staff customer directory, ordered by name."""
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('search_name', 'id')
+
+
+class PetNotePagination(CursorPagination):
+    """Newest notes first, backed by the (created_at, id) index."""
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-created_at', '-id')
+
+
+class PetPagination(CursorPagination):
+    """Keyset pagination for pets, avoids COUNT/OFFSET over the whole pet table."""
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('search_name', 'id')
+
+
+class SparseFieldsetViewMixin:
+    """Lets get_queryset skip joins and prefetches for fields left out with ?fields= / ?omit=."""
+
+    def wants_field(self, path):
+        # e.g self.wants_field('booking.pet_details')
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = Fieldset.from_request(self.request)
+        return self._fieldset.keeps_path(path)
+
+
+class ConditionalGetMixin:
+    """
+    list and retrieve answer If-None-Match / If-Modified-Since with a 304 before anything is serialized,
+    from one aggregate over the filtered queryset (see utils/conditional.py).
+    fingerprint_fields are the updated_at columns the payload is rendered from, related ones included.
+    """
+    fingerprint_fields = ('updated_at',)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        # Looked up without the prefetches, a 304 never needs them. Object permissions still apply
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        instance = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, instance)
+        return self.conditional_response(
+            queryset.filter(pk=instance.pk),
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+        )
+
+    def conditional_response(self, queryset, build_response):
+        latest, row_count = queryset_fingerprint(queryset, self.fingerprint_fields)
+        etag = build_etag(self.request, latest, row_count)
+        last_modified = int(first_seen(etag, latest).timestamp())
+
+        response = get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self.fresh_response(build_response, latest, row_count)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def fresh_response(self, build_response, latest, row_count):
+        """The full response when the client's copy is out of date, DaycareViewSet serves it from a cache."""
+        return build_response()
+
+
 class UserViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin):
     """
     ViewSet for managing users.
@@ -60,7 +160,8 @@ class UserViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.Retri
             return Response({'error': 'Invalid username or password'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class StaffProfileViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
+class StaffProfileViewSet(SparseFieldsetViewMixin, ConditionalGetMixin, viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
+    fingerprint_fields = ('updated_at', 'daycares__updated_at')
     queryset = StaffProfile.objects.all()
     serializer_class = StaffProfileSerializer
 
@@ -69,6 +170,10 @@ class StaffProfileViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixi
             return StaffProfile.objects.none()
         
         queryset = super().get_queryset()
+        if self.wants_field('user'):
+            queryset = queryset.select_related('user')
+        if self.wants_field('daycares') or self.wants_field('daycares_names'):
+            queryset = queryset.prefetch_related('daycares')
         user = self.request.user
         
         if hasattr(user, 'staffprofile'):
@@ -93,14 +198,44 @@ class StaffProfileViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixi
         return Response({'detail': 'Staff profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
 
-class CustomerProfileViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
+class CustomerProfileViewSet(SparseFieldsetViewMixin, ConditionalGetMixin, viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
+    fingerprint_fields = ('updated_at', 'pets__updated_at', 'pets__customers__updated_at')
     queryset = CustomerProfile.objects.all()
+    pagination_class = CustomerDirectoryPagination
     
     def get_serializer_class(self):
         if self.action == 'list' and 'name' in self.request.query_params:
             return CustomerNameSerializer  
+        if self._is_staff_directory():
+            return CustomerDirectorySerializer
         return CustomerProfileSerializer  
 
+    def _is_staff_directory(self):
+        return (
+            self.action == 'list'
+            and 'name' not in self.request.query_params
+            and hasattr(self.request.user, 'staffprofile')
+        )
+
+    def get_directory_queryset(self, staff_profile):
+        """
+        Customers with bookings at the staff member's daycares, with users, pets and
+        pet co-owners loaded up front so the page renders in a fixed number of queries.
+        """
+        booked_here = Booking.objects.filter(customer=OuterRef('pk'), daycare__in=staff_profile.daycares.all())
+        co_owners = CustomerProfile.objects.select_related('user').only(
+            'id', 'user__id', 'user__first_name', 'user__last_name',
+        )
+        queryset = CustomerProfile.objects.filter(Exists(booked_here))
+        if self.wants_field('user'):
+            queryset = queryset.select_related('user')
+        if self.wants_field('pets'):
+            pets = Pet.objects.all()
+            if self.wants_field('pets.customers'):
+                pets = pets.prefetch_related(Prefetch('customers', queryset=co_owners))
+            queryset = queryset.prefetch_related(Prefetch('pets', queryset=pets))
+        return queryset
+
     def get_queryset(self):
         if not self.request.user.is_authenticated:
             return CustomerProfile.objects.none()
@@ -131,17 +266,64 @@ class CustomerProfileViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, m
         )
 
     def list(self, request, *args, **kwargs):
+        if self._is_staff_directory():
+            queryset = self.get_directory_queryset(request.user.staffprofile)
+            return self.conditional_response(queryset, lambda: self._directory_page(queryset))
+
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.conditional_response(queryset, lambda: Response(self.get_serializer(queryset, many=True).data))
+
+    def _directory_page(self, queryset):
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         if instance.user != request.user:
             return Response({'error': 'You do not have permission to view this customer profile.'}, 
                             status=status.HTTP_403_FORBIDDEN)
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        return self.conditional_response(
+            self.get_queryset().filter(pk=instance.pk),
+            lambda: Response(self.get_serializer(instance).data),
+        )
+
+    @action(detail=False, methods=['get'], url_path='autocomplete', permission_classes=[IsStaff])
+    def autocomplete(self, request):
+        """
+        Prefix search over customer names, phone numbers and pet names for the booking form.
+        Only customers who have booked at the staff member's daycares are returned.
+        e.g /customer-profile/autocomplete/?q=jo&limit=10
+        """
+        query = normalize_search_text(request.query_params.get('q', ''))
+        if not query:
+            return Response([])
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'error': 'limit must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = (
+            prefix_q('search_name', query)
+            | prefix_q('search_name_reversed', query)
+            | Exists(Pet.objects.filter(prefix_q('search_name', query), customers=OuterRef('pk'), is_active=True))
+        )
+        if looks_like_phone(query):
+            matches |= prefix_q('search_phone', normalize_phone(query))
+
+        booked_here = Booking.objects.filter(
+            customer=OuterRef('pk'),
+            daycare__in=request.user.staffprofile.daycares.all(),
+        )
+        customers = (
+            CustomerProfile.objects
+            .filter(matches, Exists(booked_here), is_active=True)
+            .select_related('user')
+            .prefetch_related(Prefetch('pets', queryset=Pet.objects.filter(is_active=True).only('id', 'pet_name')))
+            .order_by('search_name', 'id')[:limit]
+        )
+        return Response(CustomerNameSerializer(customers, many=True).data)
 
     @action(detail=False, methods=['get'], url_path='current', permission_classes=[IsCustomer])
     def current(self, request):
@@ -155,7 +337,11 @@ class CustomerProfileViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, m
         return Response({'detail': 'Customer profile not found'}, status=status.HTTP_404_NOT_FOUND)
     
 
-class DaycareViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
+MAX_REPORT_DAYS = 366
+
+
+class DaycareViewSet(SparseFieldsetViewMixin, ConditionalGetMixin, viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
+    fingerprint_fields = ('updated_at', 'opening_hours__updated_at', 'products__updated_at', 'staffprofile__updated_at')
     queryset = Daycare.objects.all()
     serializer_class = DaycareSerializer
 
@@ -177,6 +363,23 @@ class DaycareViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.Re
         if search_term:
             queryset = queryset.filter(daycare_name__icontains=search_term)
 
+        # e.g ?pet_type=1 -> daycares accepting dogs (or with no pet types set)
+        pet_type = self.request.query_params.get('pet_type')
+        if pet_type:
+            try:
+                mask = pet_types_to_mask(int(pet_type))
+            except ValueError:
+                return Daycare.objects.none()
+            if mask:
+                queryset = queryset.filter(pet_types_mask__in=[0] + masks_including(mask))
+
+        if self.wants_field('opening_hours'):
+            queryset = queryset.prefetch_related('opening_hours')
+        if self.wants_field('products'):
+            queryset = queryset.prefetch_related(Prefetch('products', queryset=Product.objects.select_related('daycare')))
+        if self.wants_field('staff'):
+            staff = StaffProfile.objects.select_related('user')
+            queryset = queryset.prefetch_related(Prefetch('staffprofile_set', queryset=staff, to_attr='prefetched_staff'))
         return queryset
 
     def get_serializer_class(self):
@@ -189,12 +392,135 @@ class DaycareViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.Re
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
+
+    def _is_cacheable(self):
+        # Staff get a per-user queryset (their own daycares), so only the public directory is cached
+        return not hasattr(self.request.user, 'staffprofile')
+
+    def fresh_response(self, build_response, latest, row_count):
+        """
+        Serve the payload for this version + fingerprint + serializer variant from the cache.
+        ETag, Last-Modified and 304s all come from ConditionalGetMixin, the cache only saves the serializing.
+        Keyed by the fingerprint as well, so a worker that hasn't seen a version bump yet still can't serve
+        a payload rendered from other rows (see utils/daycare_cache.py).
+        """
+        if not self._is_cacheable() or self.action not in ('list', 'retrieve'):
+            return build_response()
+
+        if self.action == 'list':
+            version_parts = ('list', get_directory_version())
+        else:
+            pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            version_parts = ('detail', pk, get_daycare_version(pk))
+        query_params = self.request.query_params
+        cache_key = build_cache_key(
+            *version_parts,
+            latest.isoformat() if latest else '',
+            row_count,
+            self.get_serializer_class().__name__,
+            query_params.get('search', ''),
+            query_params.get('role', ''),
+            query_params.get('pet_type', ''),
+            query_params.get('fields', ''),
+            query_params.get('omit', ''),
+        )
+
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+        response = build_response()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, DAYCARE_CACHE_TIMEOUT)
+        return response
+
+    @action(detail=True, methods=['post'], url_path='generate-invoices', permission_classes=[IsOwner])
+    def generate_invoices(self, request, pk=None):
+        """
+        Invoice every customer of the daycare for a month, e.g {"month": "2024-10"}
+        Customers already invoiced for that month are skipped, so this is safe to repeat.
+        """
+        daycare = self.get_object()
+        check_daycare_association(request.user, daycare)
+
+        try:
+            year, month = (int(part) for part in str(request.data.get('month', '')).split('-'))
+            if not 1 <= month <= 12:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'month must look like 2024-10.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        created, skipped = generate_invoices(daycare, year, month)
+        return Response({'created': created, 'already_invoiced': skipped})
+
+    @action(detail=True, methods=['get'], permission_classes=[IsOwner])
+    def report(self, request, pk=None):
+        """
+        Bookings, waitlist, occupancy and revenue for a date range, e.g ?start=2024-10-01&end=2024-10-31
+        Defaults to month to date. Served from the daily rollups so it doesn't scan bookings.
+        """
+        daycare = self.get_object()
+        check_daycare_association(request.user, daycare)
+
+        today = timezone.localdate()
+        try:
+            start = parse_date(request.query_params['start']) if request.query_params.get('start') else today.replace(day=1)
+            end = parse_date(request.query_params['end']) if request.query_params.get('end') else today
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return Response({'error': 'start and end must be dates like 2024-10-01.'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'error': 'start must be before end.'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days >= MAX_REPORT_DAYS:
+            return Response({'error': f'Reports cover at most {MAX_REPORT_DAYS} days.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(daycare_report(daycare, start, end))
+
+    @action(detail=False, methods=['get'], url_path='nearby')
+    def nearby(self, request):
+        """
+        Active daycares within radius_km of a postcode, closest first.
+        e.g /daycare/nearby/?postcode=2000&radius_km=10
+        """
+        postcode = request.query_params.get('postcode', '').strip()
+        if not postcode:
+            return Response({'error': 'postcode is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            radius_km = float(request.query_params.get('radius_km', 10))
+        except ValueError:
+            return Response({'error': 'radius_km must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+        if radius_km <= 0 or radius_km > 500:
+            return Response({'error': 'radius_km must be between 0 and 500.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        origin = PostcodeCentroid.objects.filter(postcode=postcode.zfill(4)).first()
+        if not origin:
+            return Response({'error': 'Unknown postcode.'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Prune with the (latitude, longitude) index, then rank the survivors exactly
+        min_lat, max_lat, min_lng, max_lng = bounding_box(origin.latitude, origin.longitude, radius_km)
+        candidates = Daycare.objects.filter(
+            is_active=True,
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lng, max_lng),
+        ).prefetch_related('opening_hours')
+
+        daycares = []
+        for daycare in candidates:
+            daycare.distance_km = haversine_km(origin.latitude, origin.longitude, daycare.latitude, daycare.longitude)
+            if daycare.distance_km <= radius_km:
+                daycares.append(daycare)
+        daycares.sort(key=lambda d: d.distance_km)
+
+        serializer = NearbyDaycareSerializer(daycares, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
     
 
-class ProductViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
+class ProductViewSet(SparseFieldsetViewMixin, ConditionalGetMixin, viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
     """
     A viewset for viewing and editing product instances.
     """
+    fingerprint_fields = ('updated_at', 'daycare__updated_at')
     serializer_class = ProductSerializer
     queryset = Product.objects.all()
     permission_classes = [permissions.IsAuthenticated]
@@ -225,7 +551,9 @@ class ProductViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.Re
 
         # If the user is making a GET request, both staff and customers can view products
         if request.method == 'GET':
-            queryset = Product.objects.all() 
+            queryset = Product.objects.all()
+            if self.wants_field('daycare_name'):
+                queryset = queryset.select_related('daycare')
 
             # Optionally filter by daycare if a daycare ID is provided in the query params
             daycare_id = request.query_params.get('daycare')
@@ -246,6 +574,8 @@ class ProductViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.Re
         # Restrict to products that belong to daycares the staff member is associated with
         user_daycare_ids = staff_profile.daycares.values_list('id', flat=True)
         queryset = Product.objects.filter(daycare__id__in=user_daycare_ids)
+        if self.wants_field('daycare_name'):
+            queryset = queryset.select_related('daycare')
 
         # Further filter by daycare if a specific one is requested
         daycare_id = request.query_params.get('daycare')
@@ -306,7 +636,8 @@ class ProductViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.Re
         return super().create(request, *args, **kwargs)
 
 
-class RosterViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
+class RosterViewSet(SparseFieldsetViewMixin, ConditionalGetMixin, viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
+    fingerprint_fields = ('updated_at', 'staff__updated_at')
     queryset = Roster.objects.all()
     serializer_class = RosterSerializer
     permission_classes = [IsOwner | IsStaff]
@@ -355,6 +686,8 @@ class RosterViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.Ret
             except ValueError:
                 return Roster.objects.none()  
 
+        if self.wants_field('staff'):
+            queryset = queryset.select_related('staff__user')
         return queryset.distinct()
 
     @action(detail=True, methods=['patch'], url_path='deactivate')
@@ -368,7 +701,8 @@ class RosterViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.Ret
             return Response({"detail": "Roster not found."}, status=status.HTTP_404_NOT_FOUND)
 
 
-class UnavailabilityViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
+class UnavailabilityViewSet(SparseFieldsetViewMixin, ConditionalGetMixin, viewsets.GenericViewSet, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, mixins.CreateModelMixin):
+    fingerprint_fields = ('updated_at', 'staff__updated_at')
     serializer_class = StaffUnavailabilitySerializer
 
     def get_queryset(self):
@@ -381,10 +715,13 @@ class UnavailabilityViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mi
             # If the user is an owner, show unavailability for all active staff in the owner's daycares
             if staff_profile.role == 'O':
                 owned_daycares = staff_profile.daycares.all()  # Fetch all daycares the owner is associated with
-                return StaffUnavailability.objects.filter(staff__daycares__in=owned_daycares, is_active=True).distinct()
+                queryset = StaffUnavailability.objects.filter(staff__daycares__in=owned_daycares, is_active=True).distinct()
             else:
                 # If the user is not an owner, only show their own active unavailability
-                return StaffUnavailability.objects.filter(staff=staff_profile, is_active=True)
+                queryset = StaffUnavailability.objects.filter(staff=staff_profile, is_active=True)
+            if self.wants_field('staff'):
+                queryset = queryset.select_related('staff__user')
+            return queryset
         
         # Return an empty queryset if the user does not have a staff profile
         return StaffUnavailability.objects.none()
@@ -404,23 +741,59 @@ class UnavailabilityViewSet(viewsets.GenericViewSet, mixins.UpdateModelMixin, mi
         staff_profile = request.user.staffprofile
         serializer.save(staff=staff_profile)
 
-class PetViewSet(viewsets.GenericViewSet,
+class PetViewSet(ConditionalGetMixin, viewsets.GenericViewSet,
                  mixins.CreateModelMixin,
                  mixins.UpdateModelMixin,
                  mixins.RetrieveModelMixin,
                  mixins.ListModelMixin):
+    fingerprint_fields = ('updated_at', 'customers__updated_at', 'photos__updated_at')
     queryset = Pet.objects.all()
     serializer_class = PetSerializer
+    pagination_class = PetPagination
 
     def get_queryset(self):
+        """
+        All active pets, private pets are restricted later by PetSerializer.
+        is_owner is computed in SQL so the serializer never has to load owners to decide visibility.
+        Filters: ?owner=<customer id>, ?daycare=<id> (has booked there), ?pet_type=<id>
+        """
         user = self.request.user
+        owners = CustomerProfile.objects.select_related('user').only(
+            'id', 'phone', 'user__id', 'user__first_name', 'user__last_name', 'user__email',
+        )
+        photos = PetPhoto.objects.filter(is_active=True).only('id', 'pet_id', 'status', 'thumbnails', 'is_active')
+        queryset = Pet.objects.filter(is_active=True).prefetch_related(
+            Prefetch('customers', queryset=owners),
+            Prefetch('photos', queryset=photos),
+        )
 
         if hasattr(user, 'customerprofile'):
-            # Show all active pets to customers, including private ones
-            return Pet.objects.filter(is_active=True).distinct()
+            queryset = queryset.annotate(is_owner=Exists(
+                Pet.customers.through.objects.filter(pet_id=OuterRef('pk'), customerprofile_id=user.customerprofile.id)
+            ))
         else:
-            # Allow non-customers to see all pets (public and private) but restrict the details later
-            return Pet.objects.filter(is_active=True).distinct()
+            queryset = queryset.annotate(is_owner=Value(False, output_field=BooleanField()))
+
+        params = self.request.query_params
+        try:
+            owner_id = params.get('owner')
+            if owner_id:
+                queryset = queryset.filter(customers__id=int(owner_id))
+
+            daycare_id = params.get('daycare')
+            if daycare_id:
+                queryset = queryset.filter(Exists(
+                    Booking.objects.filter(pet_id=OuterRef('pk'), daycare_id=int(daycare_id))
+                ))
+
+            pet_type = params.get('pet_type')
+            if pet_type:
+                mask = pet_types_to_mask(int(pet_type))
+                queryset = queryset.filter(pet_types_mask__in=masks_including(mask)) if mask else queryset.none()
+        except ValueError:
+            return Pet.objects.none()
+
+        return queryset
 
     def perform_create(self, serializer):
         self._check_customer_permissions()
@@ -439,6 +812,70 @@ class PetViewSet(viewsets.GenericViewSet,
         if pet_instance and user.customerprofile not in pet_instance.customers.all():
             raise PermissionDenied("You do not have permission to edit this pet.")
 
+    @action(detail=True, methods=['get', 'post'], url_path='photos', parser_classes=[MultiPartParser, FormParser])
+    def photos(self, request, pk=None):
+        """
+        GET lists the pet's photos, POST uploads one as multipart field "photo" (owners only).
+        Uploads return straight away, thumbnails are rendered in the background.
+        """
+        pet = self.get_object()
+
+        if request.method == 'GET':
+            if not pet.is_public and not pet.is_owner:
+                return Response([])
+            photos = pet.photos.filter(is_active=True).order_by('-uploaded_at')
+            return Response(PetPhotoSerializer(photos, many=True).data)
+
+        self._check_customer_permissions(pet)
+        upload = request.FILES.get('photo')
+        if not upload:
+            return Response({'error': 'photo is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            photo, created = save_pet_photo(pet, upload, uploaded_by=request.user.customerprofile)
+        except InvalidPhoto as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            PetPhotoSerializer(photo).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    @action(detail=True, methods=['get'], url_path='timeline', permission_classes=[IsStaff | IsCustomer])
+    def timeline(self, request, pk=None):
+        """
+        Bookings, notes, blacklist events and co-owner changes for a pet, newest first.
+        Paginate with the returned next link (?cursor=), page size via ?page_size=
+        Staff see bookings/blacklists at their daycares (only for pets booked there), owners see everything
+        but private notes and blacklists.
+        """
+        pet = self.get_object()
+        user = request.user
+
+        if hasattr(user, 'staffprofile'):
+            # Same rule as the pet-note feed, notes and co-owner history are only for daycares the pet has booked at
+            if not staff_can_see_pet(user.staffprofile, pet.id):
+                raise PermissionDenied("This pet has no bookings at your daycares.")
+            daycares = user.staffprofile.daycares.all()
+            source_filters = {'booking': Q(daycare__in=daycares), 'blacklist': Q(daycare__in=daycares)}
+        elif pet.is_owner:
+            source_filters = {'note': Q(is_private=False), 'blacklist': None}
+        else:
+            raise PermissionDenied("You can only view the timeline of your own pets.")
+
+        cursor = request.query_params.get('cursor')
+        try:
+            cursor = decode_cursor(cursor) if cursor else None
+            page_size = min(max(int(request.query_params.get('page_size', TIMELINE_PAGE_SIZE)), 1), TIMELINE_MAX_PAGE_SIZE)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        events, next_cursor = build_timeline(pet, cursor=cursor, page_size=page_size, source_filters=source_filters)
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        return Response({'next': next_url, 'results': events})
+
     @action(detail=True, methods=['post'], url_path='generate-invite')
     def generate_invite(self, request, pk=None):
         pet = self.get_object()
@@ -467,18 +904,92 @@ class PetViewSet(viewsets.GenericViewSet,
             return Response({"detail": "You are already a co-owner of this pet."}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PetNoteViewSet(viewsets.ModelViewSet):
+class PetNoteViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    fingerprint_fields = ('updated_at', 'pet__updated_at', 'employee__updated_at')
     queryset = PetNote.objects.all()
     serializer_class = PetNoteSerializer
+    pagination_class = PetNotePagination
 
     def get_queryset(self):
+        """
+        Staff: notes (including private ones) for pets booked at their daycares.
+        Customers: public notes about their own pets.
+        Filters: ?daycare=<id>, ?pet=<id>, ?search=<text>
+        """
         user = self.request.user
-        if hasattr(user, 'customerprofile'):
-            return PetNote.objects.filter(customers=user.customerprofile)
-        return PetNote.objects.none()
+        params = self.request.query_params
+        queryset = PetNote.objects.select_related('pet', 'employee__user')
+
+        if hasattr(user, 'staffprofile'):
+            daycares = user.staffprofile.daycares.all()
+            daycare_id = params.get('daycare')
+            if daycare_id:
+                if not daycare_id.isdigit():
+                    return PetNote.objects.none()
+                daycares = daycares.filter(id=daycare_id)
+            queryset = queryset.filter(Exists(
+                Booking.objects.filter(pet_id=OuterRef('pet_id'), daycare__in=daycares)
+            ))
+        elif hasattr(user, 'customerprofile'):
+            queryset = queryset.filter(
+                Exists(Pet.customers.through.objects.filter(pet_id=OuterRef('pet_id'), customerprofile_id=user.customerprofile.id)),
+                is_private=False,
+            )
+        else:
+            return PetNote.objects.none()
+
+        pet_id = params.get('pet')
+        if pet_id:
+            if not pet_id.isdigit():
+                return PetNote.objects.none()
+            queryset = queryset.filter(pet_id=pet_id)
 
+        search = params.get('search', '').strip()
+        if search:
+            queryset = search_notes(queryset, search)
 
-class BookingViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+        return queryset
+
+    def get_permissions(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            permission_classes = [IsStaff | IsCustomer]
+        else:
+            # Customers can read the public notes on their pets but only staff write them
+            permission_classes = [IsPetStaff]
+        return [permission() for permission in permission_classes]
+
+    def perform_create(self, serializer):
+        self._check_pet_association(serializer.validated_data['pet'])
+        serializer.save()
+
+    def perform_update(self, serializer):
+        if 'pet' in serializer.validated_data:
+            self._check_pet_association(serializer.validated_data['pet'])
+        serializer.save()
+
+    def _check_pet_association(self, pet):
+        if not staff_can_see_pet(self.request.user.staffprofile, pet.id):
+            raise PermissionDenied("This pet has no bookings at your daycares.")
+
+
+def with_booking_relations(queryset, wants_field, through=None):
+    """
+    Joins and prefetches for the BookingSerializer fields the request renders.
+    through is the relation the booking hangs off, e.g 'booking' for waitlist entries.
+    """
+    path = f'{through}.' if through else ''
+    lookup = f'{through}__' if through else ''
+    if wants_field(path + 'customer_details'):
+        queryset = queryset.select_related(lookup + 'customer__user')
+    if wants_field(path + 'pet_details'):
+        queryset = queryset.select_related(lookup + 'pet')
+    if wants_field(path + 'products'):
+        queryset = queryset.prefetch_related(lookup + 'products')
+    return queryset
+
+
+class BookingViewSet(SparseFieldsetViewMixin, ConditionalGetMixin, mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    fingerprint_fields = ('updated_at', 'customer__updated_at', 'pet__updated_at')
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
     # pagination_class = CustomPagination 
@@ -506,7 +1017,7 @@ class BookingViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.Re
         if end_date is not None:
             queryset = queryset.filter(end_time__date__lte=end_date)
 
-        return queryset  
+        return with_booking_relations(queryset, self.wants_field)
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -519,38 +1030,31 @@ class BookingViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.Re
         # self._check_daycare_association(user, daycare)
         check_daycare_association(user, daycare)
 
-        booking = serializer.save(pet=pet, daycare=daycare, customer=customer)
+        # Products (set by the serializer) are reserved in the same transaction as the booking
+        with transaction.atomic():
+            booking = serializer.save(pet=pet, daycare=daycare, customer=customer)
+            self._reserve_products(booking)
+
+            if booking.is_waitlist and booking.waitlist_accepted:
+                Waitlist.objects.create(
+                    booking=booking,
+                    customer_notified=False 
+                )
+            record_booking_change(None, booking_contribution(booking))
+            # TODO: need To add Recurring booking to Frontend Button
+            if booking.recurrence:
+                enqueue('expand_recurring_booking', booking_id=booking.id)
 
-        products = self.request.data.get('products', [])
-        if products:
-            booking.products.set(products)
-
-        if booking.is_waitlist and booking.waitlist_accepted:
-            Waitlist.objects.create(
-                booking=booking,
-                customer_notified=False 
-            )
-
-        if booking.recurrence:
-            self.create_recurring_bookings(booking)
-
-    # TODO: need To add Recurring booking to Frontend Button
-    def create_recurring_bookings(self, booking):
-        for week in range(1, 5):  # 4 weeks
-            new_start_time = booking.start_time + timedelta(weeks=week)
-            new_end_time = booking.end_time + timedelta(weeks=week)
-
-            # Create a new booking for the next occurrence
-            Booking.objects.create(
-                customer=booking.customer,
-                pet=booking.pet,
-                daycare=booking.daycare,
-                start_time=new_start_time,
-                end_time=new_end_time,
-                status=booking.status,
-                is_active=True,
-                recurrence=False  
-            )
+    def perform_update(self, serializer):
+        """PUT/PATCH and edit_booking, the product slots and rollups follow the new dates, products and status."""
+        booking = serializer.instance
+        with transaction.atomic():
+            before = booking_contribution(booking)
+            # Swap the old product slots for the new ones, rolled back if the new ones are full
+            release_booking(booking)
+            booking = serializer.save()
+            self._reserve_products(booking)
+            record_booking_change(before, booking_contribution(booking))
 
     def _get_customer(self, user):
         if hasattr(user, 'customerprofile'):
@@ -561,6 +1065,12 @@ class BookingViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.Re
         else:
             raise PermissionDenied("User must be either a customer or staff.")
 
+    def _reserve_products(self, booking):
+        try:
+            reserve_booking(booking)
+        except ProductCapacityError as e:
+            raise serializers.ValidationError({'products': [str(e)]})
+
     def _check_pet_ownership(self, customer, pet):
         if not pet.customers.filter(id=customer.id).exists():
             raise PermissionDenied("You do not own this pet.")
@@ -582,15 +1092,20 @@ class BookingViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.Re
 
         serializer = self.get_serializer(booking, data=request_data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        self.perform_update(serializer)
         return Response(serializer.data)
 
     @action(detail=True, methods=['patch'], permission_classes=[IsStaff | IsCustomer])
     def cancel_booking(self, request, pk=None):
         """Allows both staff and customers to cancel their booking."""
         booking = self.get_object()
-        booking.is_active = False
-        booking.save()
+        with transaction.atomic():
+            before = booking_contribution(booking)
+            release_booking(booking)
+            booking.is_active = False
+            booking.save()
+            record_booking_change(before, booking_contribution(booking))
+            notify_booking_cancelled(booking)
         return Response({'status': 'Booking canceled.'})
     
     @action(detail=True, methods=['patch'], permission_classes=[IsStaff])
@@ -615,17 +1130,46 @@ class BookingViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.Re
             status = 'checked in' if checked_in else 'checked out'
             return Response({'error': f'Pet is already {status}.'}, status=400)
 
-        booking.checked_in = checked_in
-        booking.save()
+        with transaction.atomic():
+            before = booking_contribution(booking)
+            booking.checked_in = checked_in
+            booking.check_in_changed_at = timezone.now()
+            booking.save()
+            record_booking_change(before, booking_contribution(booking))
         return Response({'status': f'Pet {"checked in" if checked_in else "checked out"} successfully.'})
     
+    @action(detail=False, methods=['post'], url_path='check-in-events', permission_classes=[IsStaff])
+    def check_in_events(self, request):
+        """
+        Check ins/outs a tablet queued while offline, applied in one go (see utils/check_in_events.py).
+        Safe to re-send, every event comes back as applied, superseded, duplicate or rejected.
+        """
+        serializer = CheckInEventBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        events = serializer.validated_data['events']
+        statuses, bookings = apply_check_in_events(events, request.user.staffprofile)
+
+        results = []
+        for event, event_status in zip(events, statuses):
+            result = {'id': event['id'], 'status': event_status}
+            if event_status == CHECK_IN_REJECTED:
+                result['error'] = 'No active booking with this ID at your daycares.'
+            results.append(result)
+        return Response({
+            'results': results,
+            'bookings': [{'id': booking.id, 'checked_in': booking.checked_in} for booking in sorted(bookings, key=lambda b: b.id)],
+        })
+
     @action(detail=True, methods=['post'], url_path='accept-waitlist')
     def accept_waitlist(self, request, pk=None):
         booking = self.get_object()
         if booking.is_waitlist and not booking.waitlist_accepted:
-            booking.waitlist_accepted = True
-            booking.save()
-            Waitlist.objects.create(booking=booking)
+            with transaction.atomic():
+                before = booking_contribution(booking)
+                booking.waitlist_accepted = True
+                booking.save()
+                Waitlist.objects.create(booking=booking)
+                record_booking_change(before, booking_contribution(booking))
             return Response({"message": "You have been added to the waitlist."}, status=status.HTTP_200_OK)
         return Response({"message": "You cannot join the waitlist for this booking."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -638,7 +1182,7 @@ class BookingViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.Re
             raise PermissionDenied(f"Invalid {model.__name__.lower()} ID.")
 
 
-class BlacklistedPetViewSet(viewsets.ModelViewSet):
+class BlacklistedPetViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = BlacklistedPetSerializer
     permission_classes = [IsStaff]
 
@@ -693,7 +1237,8 @@ class BlacklistedPetViewSet(viewsets.ModelViewSet):
             return Response({'error': f'Invalid {model.__name__.lower()} ID.'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class WaitlistViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+class WaitlistViewSet(SparseFieldsetViewMixin, ConditionalGetMixin, mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    fingerprint_fields = ('updated_at', 'booking__updated_at', 'booking__customer__updated_at', 'booking__pet__updated_at')
     serializer_class = WaitlistSerializer
     permission_classes = [IsStaff | IsCustomer]
 
@@ -712,6 +1257,8 @@ class WaitlistViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.R
         if daycare_id:
             queryset = queryset.filter(booking__daycare=daycare_id, is_active=True)
         
+        if self.wants_field('booking'):
+            queryset = with_booking_relations(queryset.select_related('booking'), self.wants_field, 'booking')
         return queryset
 
     # def _check_daycare_association(self, user, daycare):
@@ -732,8 +1279,10 @@ class WaitlistViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.R
         except Waitlist.DoesNotExist:
             return Response({"detail": "No Waitlist entry matches the given query."}, status=status.HTTP_404_NOT_FOUND)
 
-        waitlist.customer_notified = True
-        waitlist.save()
+        with transaction.atomic():
+            notify_waitlist_offer(waitlist)
+            waitlist.customer_notified = True
+            waitlist.save()
         return Response({"message": "Customer has been notified."}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['patch'], permission_classes=[IsCustomer])  
@@ -751,13 +1300,25 @@ class WaitlistViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.R
         except Waitlist.DoesNotExist:
             return Response({"detail": "No Waitlist entry matches the given query."}, status=status.HTTP_404_NOT_FOUND)
 
-        waitlist.customer_accepted = True
-        waitlist.save()
+        with transaction.atomic():
+            booking = waitlist.booking
+            before = booking_contribution(booking)
+
+            waitlist.customer_accepted = True
+            waitlist.save()
 
-        booking = waitlist.booking
-        booking.is_waitlist = False
-        booking.waitlist_accepted = True  
-        booking.save()
+            booking.is_waitlist = False
+            booking.waitlist_accepted = True  
+            booking.save()
+
+            # The booking now holds its product slots
+            try:
+                reserve_booking(booking)
+            except ProductCapacityError as e:
+                transaction.set_rollback(True)
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            record_booking_change(before, booking_contribution(booking))
+            notify_booking_accepted(booking)
 
         return Response({"message": "Booking has been accepted."}, status=status.HTTP_200_OK)
 
@@ -797,6 +1358,65 @@ class WaitlistViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, mixins.R
         return Response({"message": "Customer has been uninvited."}, status=status.HTTP_200_OK)
 
 
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Delta sync for the offline check-in tablets, see utils/sync.py.
+
+    GET /api/sync/                 everything at the staff member's daycares, `full` is true
+    GET /api/sync/?since=<cursor>  only what changed after the cursor, with tombstones under `deleted`
+    ?daycare=<id> narrows it to one of their daycares. Keep the returned cursor and ask again while has_more.
+    """
+    permission_classes = [IsStaff]
+
+    # kind -> (serializer, joins and prefetches for what it renders)
+    payloads = {
+        SyncChange.Kind.BOOKING: (BookingSerializer, lambda queryset: with_booking_relations(queryset, lambda path: True)),
+        SyncChange.Kind.PET: (BasicPetSerializer, lambda queryset: queryset.prefetch_related('customers__user')),
+        SyncChange.Kind.WAITLIST: (SyncWaitlistSerializer, lambda queryset: queryset),
+        SyncChange.Kind.ROSTER: (RosterSerializer, lambda queryset: queryset.select_related('staff__user')),
+        SyncChange.Kind.BLACKLIST: (BlacklistedPetSerializer, lambda queryset: queryset),
+    }
+
+    def list(self, request):
+        daycare_ids = list(request.user.staffprofile.daycares.values_list('id', flat=True))
+        daycare_id = request.query_params.get('daycare')
+        if daycare_id:
+            if not daycare_id.isdigit() or int(daycare_id) not in daycare_ids:
+                return Response({'error': 'You are not associated with this daycare.'}, status=status.HTTP_403_FORBIDDEN)
+            daycare_ids = [int(daycare_id)]
+
+        since = request.query_params.get('since')
+        if since is not None and not since.isdigit():
+            return Response({'error': 'Invalid cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if since is None or sync.is_stale(int(since)):
+            # Cursor first, anything changing while the snapshot is read is sent again next time
+            changed, cursor, has_more = None, sync.settled_cursor(), False
+        else:
+            changed, cursor, has_more = sync.changes_since(daycare_ids, int(since))
+
+        context = {'request': request, FIELDSET_CONTEXT_KEY: EVERYTHING}
+        changes, deleted = {}, {}
+        for kind, (serializer_class, with_relations) in self.payloads.items():
+            queryset = with_relations(sync.visible(kind, daycare_ids))
+            if changed is None:
+                rows, deleted[kind] = queryset.order_by('id'), []
+            else:
+                # Changed rows that are no longer visible are the tombstones
+                ids = changed.get(kind, set())
+                rows = list(queryset.filter(id__in=ids)) if ids else []
+                deleted[kind] = sorted(ids - {row.id for row in rows})
+            changes[kind] = serializer_class(rows, many=True, context=context).data
+
+        return Response({
+            'cursor': str(cursor),
+            'full': changed is None,
+            'has_more': has_more,
+            'changes': changes,
+            'deleted': deleted,
+        })
+
 # TODO
 # Reusing staff.profile.role == "O"  alot -> make a function for this
 # Check Pet Ownership -> I have a _checke_pet_ownership and _check_customer_permission -> make a helper function to do just one
\ No newline at end of file
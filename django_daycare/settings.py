@@ -47,6 +47,10 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:8080",
 ]
 
+# orjson backed JSON renderer/parser (core/fast_json.py), off by default. Output matches DRF's own except that
+# NaN/Infinity render as null instead of raising, see `manage.py benchmark_json` for what it saves
+FAST_JSON = False
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.TokenAuthentication',
@@ -54,9 +58,19 @@ REST_FRAMEWORK = {
     # 'DEFAULT_PERMISSION_CLASSES': (
         # 'rest_framework.permissions.IsAuthenticated',
     # ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.fast_json.FastJSONRenderer' if FAST_JSON else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.fast_json.FastJSONParser' if FAST_JSON else 'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 MIDDLEWARE = [
+    'core.middleware.QueryInstrumentationMiddleware',  # first, so it sees the queries of every other middleware
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -99,6 +113,19 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Used for the versioned daycare directory cache (core/utils/daycare_cache.py). LocMemCache is per process, so
+# each worker caches its own copy, use Redis/Memcached to share hits between workers
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'daycare',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -135,6 +162,46 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (pet photos)
+
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Pet photos are capped at 15MB, thumbnails are rendered by a background process pool
+PET_PHOTO_MAX_UPLOAD_SIZE = 15 * 1024 * 1024
+PET_PHOTO_THUMBNAIL_SIZES = {'small': 128, 'medium': 512, 'large': 1024}
+PET_PHOTO_WORKERS = 2
+
+# Background jobs (core/tasks.py) are run by `manage.py run_workers`. True runs them in the request process
+# straight after commit instead, for development without a worker running
+JOBS_RUN_INLINE = False
+
+# Customer emails are written to an outbox and sent by the job workers (core/utils/notifications.py).
+# Printed to the console in development, use the SMTP backend (EMAIL_HOST etc) in production
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'Daycare <no-reply@localhost>'
+
+# SQL instrumentation (core.middleware.QueryInstrumentationMiddleware)
+# Server-Timing exposes query counts to clients, so it's only on in development
+SQL_SERVER_TIMING = DEBUG
+SQL_LOG_SAMPLE_RATE = 0.05
+SQL_TOP_QUERY_SHAPES = 3
+# A query shape repeated more than this in one request is logged as a likely N+1, and raised when
+# SQL_RAISE_ON_REPEATED_QUERIES is on (tests can flip it with override_settings)
+SQL_REPEATED_QUERY_LIMIT = 10
+SQL_RAISE_ON_REPEATED_QUERIES = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.sql': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -2,6 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from core import viewsets
 from django.contrib import admin
+from django.conf import settings
+from django.conf.urls.static import static
 
 # Define the router for standard CRUD endpoints
 api_router = DefaultRouter()
@@ -17,6 +19,7 @@ api_router.register(r'pet-note', viewsets.PetNoteViewSet, basename='pet-note')
 api_router.register(r'booking', viewsets.BookingViewSet, basename='booking')
 api_router.register(r'blacklist', viewsets.BlacklistedPetViewSet, basename='blacklist')
 api_router.register(r'waitlist', viewsets.WaitlistViewSet, basename='waitlist')
+api_router.register(r'sync', viewsets.SyncViewSet, basename='sync')
 
 
 urlpatterns = [
@@ -24,4 +27,7 @@ urlpatterns = [
     path('api/', include(api_router.urls)),
 ]
 
-urlpatterns += api_router.urls
\ No newline at end of file
+urlpatterns += api_router.urls
+
+# Serve uploaded pet photos in development
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)